@@ -0,0 +1,261 @@
+# aggregation.py
+"""
+One-pass summaries of the acquired sources.
+
+Every statistic the report, the graphs and the Extract tab show about a
+source (direction counts, top callers and senders, volume per day, device
+information) is accumulated in a single scan: the call log and SMS are
+streamed from the record store, the logcat once from its file. Summaries are
+cached against the source file's size and mtime, so the report, the graphs
+and the GUI share one scan per acquisition.
+"""
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import tee
+import record_store
+import evidence
+import sharded_scan
+from timestamps import OFFSET_STEP_MS, PLAUSIBLE_MIN_MS, PLAUSIBLE_MAX_MS, local_ms
+from config import LOG_FILES, RECORD_STORE_PATH
+
+# Content-row type codes
+CALL_TYPES = {1: "incoming", 2: "outgoing", 3: "missed"}
+SMS_TYPES = {1: "incoming", 2: "outgoing"}
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+_MODEL_RE = re.compile(r'model=([^,\s]+)')
+_ANDROID_RE = re.compile(r'Android\s+(\d+(?:\.\d+)?)')
+_KERNEL_RE = re.compile(r'Linux\s+version\s+([^\s]+)')
+
+
+class SourceSummary:
+    """Counts shared by every source: records, timestamp span and records per local day."""
+
+    def __init__(self, source):
+        self.source = source
+        self.total = 0
+        self.first_ms = None
+        self.last_ms = None
+        # Quarter hours since the epoch -> records. Local days start on a quarter hour,
+        # so these map to local days (with the offset in effect then) when read
+        self._steps = Counter()
+
+    def _add_ts(self, ts):
+        # Implausible timestamps (date=0 rows) would stretch the span back to 1970
+        if ts is None or not PLAUSIBLE_MIN_MS <= ts <= PLAUSIBLE_MAX_MS:
+            return
+        if self.first_ms is None or ts < self.first_ms:
+            self.first_ms = ts
+        if self.last_ms is None or ts > self.last_ms:
+            self.last_ms = ts
+        self._steps[ts // OFFSET_STEP_MS] += 1
+
+    def merge(self, other):
+        """Adds the counts of a summary of a later part of the same source."""
+        self.total += other.total
+        if other.first_ms is not None and (self.first_ms is None or other.first_ms < self.first_ms):
+            self.first_ms = other.first_ms
+        if other.last_ms is not None and (self.last_ms is None or other.last_ms > self.last_ms):
+            self.last_ms = other.last_ms
+        self._steps.update(other._steps)
+
+    def _days(self):
+        """Local day number (days since the epoch) -> records."""
+        days = Counter()
+        for step, count in self._steps.items():
+            days[local_ms(step * OFFSET_STEP_MS) // DAY_MS] += count
+        return days
+
+    @property
+    def per_day(self):
+        """Records per local date, oldest first."""
+        epoch = datetime(1970, 1, 1).date()
+        return {epoch + timedelta(days=day): count for day, count in sorted(self._days().items())}
+
+    def busiest_day(self):
+        """Returns (date, count) of the day with the most records, or None."""
+        days = self._days()
+        if not days:
+            return None
+        day, count = max(days.items(), key=lambda item: (item[1], -item[0]))
+        return datetime(1970, 1, 1).date() + timedelta(days=day), count
+
+
+class ContentSummary(SourceSummary):
+    """Call log or SMS statistics: counts per type code and per address."""
+
+    def __init__(self, source):
+        super().__init__(source)
+        self.by_type = Counter()
+        self.addresses = Counter()
+        # Addresses of received (type 1) rows: callers that called in, SMS senders
+        self.received_from = Counter()
+
+    def add(self, ts, row_type, address):
+        self.total += 1
+        self._add_ts(ts)
+        self.by_type[row_type] += 1
+        if address and address != "NULL":
+            self.addresses[address] += 1
+            if row_type == 1:
+                self.received_from[address] += 1
+
+    @property
+    def incoming(self):
+        return self.by_type.get(1, 0)
+
+    @property
+    def outgoing(self):
+        return self.by_type.get(2, 0)
+
+    @property
+    def missed(self):
+        return self.by_type.get(3, 0)
+
+    def top_addresses(self, limit=10, received_only=False):
+        """The most frequent (address, count) pairs, ties broken by address like the record store."""
+        counts = self.received_from if received_only else self.addresses
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+class LogcatSummary(SourceSummary):
+    """Logcat statistics: entries per level and the device details found in the log."""
+
+    def __init__(self, source="logcat"):
+        super().__init__(source)
+        self.levels = Counter()
+        self.device_info = {
+            "Device Model": "Unknown",
+            "Android Version": "Unknown",
+            "Kernel Version": "Unknown"
+        }
+        self._missing = set(self.device_info)
+
+    def add(self, ts, level, line):
+        self.total += 1
+        self._add_ts(ts)
+        if level is not None:
+            self.levels[level] += 1
+        if self._missing:
+            self._scan_device_info(line)
+
+    def merge(self, other):
+        super().merge(other)
+        self.levels.update(other.levels)
+        # A detail found earlier in the log wins, as in a serial scan
+        for key in sorted(self._missing - other._missing):
+            self.device_info[key] = other.device_info[key]
+            self._missing.discard(key)
+
+    def _scan_device_info(self, line):
+        if "Device Model" in self._missing and "model=" in line:
+            match = _MODEL_RE.search(line)
+            if match:
+                self.device_info["Device Model"] = match.group(1)
+                self._missing.discard("Device Model")
+        if "Android Version" in self._missing and "Android" in line:
+            for ver in _ANDROID_RE.findall(line):
+                try:
+                    if float(ver) < 15:
+                        self.device_info["Android Version"] = ver
+                        self._missing.discard("Android Version")
+                        break
+                except ValueError:
+                    continue
+        if "Kernel Version" in self._missing and "Linux" in line:
+            match = _KERNEL_RE.search(line)
+            if match:
+                self.device_info["Kernel Version"] = match.group(1)
+                self._missing.discard("Kernel Version")
+
+# -------------------------------------------------------------------
+# Scans
+# -------------------------------------------------------------------
+def summarize_content(source, db_path=RECORD_STORE_PATH):
+    """Builds the ContentSummary of "calls" or "sms" in one pass over its parsed records."""
+    summary = ContentSummary(source)
+    record_store.ensure_ingested(source, db_path)
+    conn = record_store.connect(db_path)
+    try:
+        for ts, row_type, address in conn.execute(f"SELECT ts, type, address FROM {source}"):
+            summary.add(ts, row_type, address)
+    finally:
+        conn.close()
+    return summary
+
+
+def _add_logcat_lines(summary, lines, start_offset=0):
+    parsed, raws = tee(lines)
+    for record, raw in zip(record_store.parse_logcat(parsed, 0, start_offset), raws):
+        summary.add(record[1], record[2], raw.decode("utf-8", "replace"))
+
+
+def _summarize_logcat_range(path, start, end):
+    """Sharded scan worker: the LogcatSummary of path[start:end]."""
+    summary = LogcatSummary()
+    with sharded_scan.mapped(path) as mm:
+        _add_logcat_lines(summary, sharded_scan.iter_lines(mm, start, end), start)
+    return summary
+
+
+def summarize_logcat(path=LOG_FILES["logcat"]):
+    """Builds the LogcatSummary in one pass over the logcat file (or its evidence container)."""
+    summary = LogcatSummary()
+    if not evidence.log_exists(path):
+        return summary
+    if sharded_scan.should_shard(path):
+        for part in sharded_scan.map_ranges(path, _summarize_logcat_range):
+            summary.merge(part)
+        return summary
+    with evidence.open_log(path) as f:
+        _add_logcat_lines(summary, f)
+    return summary
+
+
+_summary_cache = {}
+# One lock per source: concurrent callers share a scan, different sources scan in parallel
+_summary_locks = {source: threading.Lock() for source in LOG_FILES}
+
+
+def get_summary(source):
+    """
+    Returns the summary of a source ("logcat", "calls" or "sms"), rebuilding it only when
+    the source file changed since the last scan. Safe to call from worker threads.
+    """
+    signature = evidence.log_signature(LOG_FILES[source])
+    with _summary_locks[source]:
+        cached = _summary_cache.get(source)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        summary = summarize_logcat() if source == "logcat" else summarize_content(source)
+        _summary_cache[source] = (signature, summary)
+        return summary
+
+
+def clear_cache():
+    """Forgets every cached summary, so the next get_summary() rescans."""
+    for source, lock in _summary_locks.items():
+        with lock:
+            _summary_cache.pop(source, None)
+
+
+def get_summaries(sources=None):
+    """Returns {source: summary} for the given sources (default: every acquired source)."""
+    return {source: get_summary(source) for source in (sources or LOG_FILES)}
+
+
+def describe(summary):
+    """One-line description of a summary for the Extract tab."""
+    if isinstance(summary, ContentSummary):
+        directions = CALL_TYPES if summary.source == "calls" else SMS_TYPES
+        parts = ", ".join(f"{summary.by_type.get(code, 0)} {name}" for code, name in directions.items())
+        text = f"{summary.source}: {summary.total} records ({parts})"
+    else:
+        text = f"{summary.source}: {summary.total} lines"
+    busiest = summary.busiest_day()
+    if busiest:
+        text += f", busiest day {busiest[0]:%Y-%m-%d} ({busiest[1]})"
+    return text
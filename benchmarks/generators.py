@@ -0,0 +1,107 @@
+# benchmarks/generators.py
+"""
+Deterministic synthetic cases for the benchmarks.
+
+The files have the formats the tool acquires: logcat in `-v time` format
+(spread over the 24 hours before the anchor time) and `content query` Row
+output for the call log and SMS (spread over the 7 days before it). Lines
+are built with the same helpers as scripts/fake_adb.py; a fixed seed gives
+byte-identical content for a given size and anchor, and every 97th SMS body
+spans two lines like real multi-line messages do.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from config import LOG_FILES, CONTENT_QUERY_PROJECTIONS
+from scripts.fake_adb import logcat_line, content_fields
+
+DEFAULT_SEED = 42
+# Lines are written in batches of this many
+WRITE_BATCH = 10000
+
+SIZE_SUFFIXES = {"k": 1000, "m": 1000 * 1000}
+
+
+def parse_size(text):
+    """Parses a size such as "10000", "10k" or "10M"."""
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for suffix, factor in (("M", 1000 * 1000), ("k", 1000)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return str(size)
+
+
+def _write_batched(path, lines):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as out:
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH:
+                out.writelines(batch)
+                written += len(batch)
+                batch = []
+        out.writelines(batch)
+        written += len(batch)
+    return written
+
+
+def iter_logcat_lines(count, anchor, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield logcat_line(anchor - timedelta(seconds=(count - i) * 86400 / count), rng)
+
+
+def _content_row(row_no, fields, columns):
+    return f"Row: {row_no} " + ", ".join(f"{c}={fields.get(c, 'NULL')}" for c in columns) + "\n"
+
+
+def iter_content_rows(count, anchor, sms, seed=DEFAULT_SEED):
+    columns = CONTENT_QUERY_PROJECTIONS["sms" if sms else "calls"]
+    for row_no in range(count):
+        row_id = row_no + 1
+        when = anchor - timedelta(seconds=(count - row_id) * 7 * 86400 / count)
+        fields = content_fields(row_id + seed, when, sms)
+        fields["_id"] = row_id
+        if sms and row_id % 97 == 0:
+            fields["body"] += "\nsent from my phone"
+        yield _content_row(row_no, fields, columns)
+
+
+def write_logcat(path, count, anchor, seed=DEFAULT_SEED):
+    """Writes count logcat lines to path. Returns the number of lines."""
+    return _write_batched(path, iter_logcat_lines(count, anchor, seed))
+
+
+def write_calls(path, count, anchor, seed=DEFAULT_SEED):
+    """Writes count call log rows to path. Returns the number of rows."""
+    return _write_batched(path, iter_content_rows(count, anchor, False, seed))
+
+
+def write_sms(path, count, anchor, seed=DEFAULT_SEED):
+    """Writes count SMS rows to path. Returns the number of rows."""
+    return _write_batched(path, iter_content_rows(count, anchor, True, seed))
+
+
+def generate_case(case_dir, count, anchor=None, seed=DEFAULT_SEED):
+    """
+    Writes a complete case (logcat, calls and SMS, count lines/rows each) under
+    case_dir/logs. Returns {source: path}.
+    """
+    anchor = anchor or datetime.now().replace(microsecond=0)
+    writers = {"logcat": write_logcat, "calls": write_calls, "sms": write_sms}
+    paths = {}
+    for source, writer in writers.items():
+        path = os.path.join(case_dir, LOG_FILES[source])
+        writer(path, count, anchor, seed)
+        paths[source] = path
+    return paths
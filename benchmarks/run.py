@@ -0,0 +1,227 @@
+# benchmarks/run.py
+"""
+Benchmarks of the hot paths on synthetic cases.
+
+    python -m benchmarks.run --sizes 10k,100k,1M --repeat 3 --out bench.json
+    python -m benchmarks.run --sizes 100k --compare bench.json
+    python -m benchmarks.run --sizes 1M --only filter_logcat_1h_error --scan-processes 1
+
+For every size a case with that many logcat lines, call rows and SMS rows
+is generated into a temporary directory (see benchmarks/generators.py) and
+each benchmark is run --repeat times with the case as working directory.
+Module imports and, unless "ingest" is selected, the record store are set
+up before timing starts; the filter_* benchmarks scan, and the token index
+the search_* ones use is built untimed unless "token_index_build" runs.
+Caches that would make later repetitions warm (aggregation summaries, the
+graph timestamp arrays, loaded token indexes, cached filter results) are
+cleared before every run. Results are written as JSON; --compare prints the ratio to an
+earlier result file and exits with status 1 when a benchmark got slower
+than --threshold allows. --scan-processes sets the worker processes of the
+sharded scans (see sharded_scan); 1 measures the serial scan.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from config import LOG_FILES
+from cli import reset_caches
+from benchmarks.generators import DEFAULT_SEED, generate_case, parse_size, format_size
+
+RESULTS_FORMAT = 1
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_OUTPUT = "logs/bench_filtered.txt"
+
+
+def _ingest():
+    from record_store import ingest_logs
+    return ingest_logs()
+
+def _filter(input_file, **criteria):
+    from filtering import filter_logs
+    return filter_logs(input_file, output_file=BENCH_OUTPUT, **criteria)
+
+def _build_token_index():
+    from token_index import build_indexes
+    return {source: len(index.terms) for source, index in build_indexes().items() if index}
+
+def _categorize():
+    from scripts.incremental_logcat import categorize_logcat
+    return categorize_logcat()
+
+def _timestamps(path, time_range=None):
+    from graphing import get_timestamps_from_file
+    return len(get_timestamps_from_file(path, time_range)[1])
+
+def _frequent_callers():
+    from graphing import compute_frequent_callers
+    return compute_frequent_callers("All Time").get("labels", [])[:3]
+
+def _report():
+    from reporting import generate_full_report
+    return generate_full_report()
+
+
+# name -> (function, arguments, keyword arguments); run in this order, ingest first
+BENCHMARKS = [
+    ("ingest", _ingest, (), {}),
+    ("filter_logcat_keyword", _filter, (LOG_FILES["logcat"],), {"keyword": "fatal"}),
+    ("filter_logcat_1h_error", _filter, (LOG_FILES["logcat"],), {"time_range": "Past 1 Hour", "severity": "Error"}),
+    ("filter_sms_keyword", _filter, (LOG_FILES["sms"],), {"keyword": "see you"}),
+    ("filter_calls_24h", _filter, (LOG_FILES["calls"],), {"time_range": "Past 24 Hours"}),
+    ("query_logcat_combined", _filter, (LOG_FILES["logcat"],),
+     {"query": "(exception OR fatal) severity:Error NOT tag:ActivityManager time:24h"}),
+    # The same keyword searches once the token index exists
+    ("token_index_build", _build_token_index, (), {}),
+    ("search_logcat_keyword", _filter, (LOG_FILES["logcat"],), {"keyword": "fatal"}),
+    ("search_sms_keyword", _filter, (LOG_FILES["sms"],), {"keyword": "see you"}),
+    ("search_calls_number", _filter, (LOG_FILES["calls"],), {"keyword": "5550000042"}),
+    ("categorize_logcat", _categorize, (), {}),
+    ("timestamps_calls", _timestamps, (LOG_FILES["calls"],), {}),
+    ("timestamps_logcat_24h", _timestamps, (LOG_FILES["logcat"], "Past 24 Hours"), {}),
+    ("frequent_callers", _frequent_callers, (), {}),
+    ("full_report", _report, (), {}),
+]
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _describe(value):
+    text = repr(value)
+    return text if len(text) <= 120 else text[:117] + "..."
+
+
+def run_size(size, names, repeat, seed, workdir=None, keep=False, log=print):
+    """Generates a case of the given size and runs the selected benchmarks on it. Returns the result dicts."""
+    case_dir = tempfile.mkdtemp(prefix=f"bench_{format_size(size)}_", dir=workdir)
+    cwd = os.getcwd()
+    results = []
+    try:
+        started = time.perf_counter()
+        generate_case(case_dir, size, seed=seed)
+        log(f"[{format_size(size)}] case generated in {time.perf_counter() - started:.1f}s: {case_dir}")
+        os.chdir(case_dir)
+        # Untimed setup: module imports, and the record store when "ingest" is not measured
+        for module in ("filtering", "graphing", "reporting", "scripts.incremental_logcat"):
+            __import__(module)
+        if "ingest" not in names:
+            _ingest()
+        indexed = False
+        for name, fn, args, kwargs in BENCHMARKS:
+            if name not in names:
+                continue
+            if name.startswith("search_") and not indexed:
+                _build_token_index()
+            indexed = indexed or name.startswith("search_") or name == "token_index_build"
+            runs = []
+            value = None
+            for _ in range(repeat):
+                reset_caches()
+                run_started = time.perf_counter()
+                value = fn(*args, **kwargs)
+                runs.append(time.perf_counter() - run_started)
+            median = statistics.median(runs)
+            results.append({"name": name, "size": size, "runs": [round(r, 4) for r in runs],
+                            "min": round(min(runs), 4), "median": round(median, 4),
+                            "lines_per_second": round(size / median) if median else None,
+                            "result": _describe(value)})
+            throughput = f" ({size / median / 1000:.0f}k lines/s)" if median else ""
+            log(f"[{format_size(size)}] {name}: median {median:.3f}s, min {min(runs):.3f}s{throughput}")
+    finally:
+        os.chdir(cwd)
+        if not keep:
+            shutil.rmtree(case_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold, log=print):
+    """Prints each benchmark's median against the baseline's. Returns the regressed (name, size) pairs."""
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    log(f"Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('created', '?')}):")
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before is None or not before["median"]:
+            continue
+        ratio = result["median"] / before["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append((result["name"], result["size"]))
+        log(f"  {result['name']:<24} {format_size(result['size']):>5}  {before['median']:8.3f}s -> "
+            f"{result['median']:8.3f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", default="10k,100k", help="comma-separated case sizes, e.g. 10k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (the median is reported)")
+    parser.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown against --compare before failing (0.15 = 15%%)")
+    parser.add_argument("--scan-processes", type=int,
+                        help="worker processes for sharded scans of large files (default: one per CPU)")
+    parser.add_argument("--workdir", help="directory for the generated cases (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated cases")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    all_names = [name for name, _, _, _ in BENCHMARKS]
+    if args.list:
+        print("\n".join(all_names))
+        return 0
+    names = set(args.only.split(",")) if args.only else set(all_names)
+    unknown = names - set(all_names)
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    import sharded_scan
+    if args.scan_processes:
+        sharded_scan.SCAN_PROCESSES = args.scan_processes
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scan_processes": sharded_scan.SCAN_PROCESSES,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": [],
+    }
+    for size in (parse_size(s) for s in args.sizes.split(",")):
+        report["results"].extend(run_size(size, names, args.repeat, args.seed, args.workdir, args.keep))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report["results"], baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# classifier.py
+"""
+Shared, precompiled pattern classifiers for log lines.
+
+Every named pattern set (LOG_TYPES categories, Filter tab severities and
+sub-types) is compiled once. classify() tries the patterns in declaration
+order and stops at the first match ("first matching category wins").
+
+The sets are case-insensitive, and re's IGNORECASE matching is several times
+slower than a case-sensitive search, which can skip ahead to the literal
+parts of a pattern. So each pattern is also compiled lowercased and without
+IGNORECASE, and is searched in the line lowercased once per classify() call.
+Patterns whose escapes would change meaning when lowercased (e.g. \x41) are
+searched in the original line with IGNORECASE instead. A single alternation
+of all patterns is slower still: it tries every alternative at every
+position of the line.
+"""
+import re
+import instrumentation
+from config import LOG_TYPES, SEVERITY_PATTERNS, SUBTYPE_PATTERNS
+
+# Escapes that mean the same after lowercasing the rest of the pattern
+_FOLDABLE_ESCAPES = set("dDsSwWbB")
+# An escape, a group name (kept as written), or a run of other characters
+_PATTERN_PARTS_RE = re.compile(r"\\(.)|\(\?P<\w+>|\(\?P=\w+\)|(?:(?!\(\?P[<=])[^\\])+", re.DOTALL)
+# Inline flags, which may switch case-insensitivity off for part of a pattern
+_INLINE_FLAGS_RE = re.compile(r"(?<!\\)\(\?[a-zA-OQ-Z-]")
+
+
+def _casefolded(pattern):
+    """pattern with its literal parts lowercased, or None if that could change its meaning."""
+    if _INLINE_FLAGS_RE.search(pattern):
+        return None
+    parts = []
+    for match in _PATTERN_PARTS_RE.finditer(pattern):
+        escaped = match.group(1)
+        if match.group().startswith("(?P"):
+            parts.append(match.group())
+        elif escaped is None:
+            parts.append(match.group().lower())
+        elif escaped.isalnum() and escaped not in _FOLDABLE_ESCAPES:
+            return None
+        else:
+            parts.append(match.group())
+    return "".join(parts)
+
+
+class PatternClassifier:
+    """Classifies lines against an ordered mapping of name -> regex pattern."""
+
+    def __init__(self, patterns, flags=re.IGNORECASE):
+        self.names = list(patterns)
+        self.flags = flags
+        self._compiled = {name: re.compile(pattern, flags) for name, pattern in patterns.items()}
+        # (name, search, searches the lowercased line) in declaration order
+        self._tests = []
+        for name, pattern in patterns.items():
+            folded = _casefolded(pattern) if flags & re.IGNORECASE else None
+            if folded is None:
+                self._tests.append((name, self._compiled[name].search, False))
+            else:
+                self._tests.append((name, re.compile(folded, flags & ~re.IGNORECASE).search, True))
+
+    def classify(self, line):
+        """Returns the name of the first matching pattern, or None."""
+        lower = line.lower()
+        for name, search, folded in self._tests:
+            if search(lower if folded else line):
+                return name
+        return None
+
+    def matches(self, name, line):
+        """Returns True if the single named pattern matches the line."""
+        return self.matcher(name)(line) is not None
+
+    def matcher(self, name):
+        """
+        Returns the compiled search function for one named pattern.
+        Unknown names match every line, like re.search("") used to.
+        """
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            return lambda line: True
+        return compiled.search
+
+    def classify_lines(self, lines):
+        """Groups lines by their first matching name; unmatched lines are dropped."""
+        groups = {name: [] for name in self.names}
+        classify = self.classify
+        lines = instrumentation.counted(lines, "regex.classify_lines", counter=True)
+        for line in lines:
+            name = classify(line)
+            if name is not None:
+                groups[name].append(line)
+        return groups
+
+
+# Module-level classifiers, compiled once at import
+logcat_classifier = PatternClassifier({name: info["pattern"] for name, info in LOG_TYPES.items()})
+severity_classifier = PatternClassifier(SEVERITY_PATTERNS)
+subtype_classifier = PatternClassifier(SUBTYPE_PATTERNS)
+
+
+def classify_logcat_line(line):
+    """Returns the first LOG_TYPES category matching the line, or None."""
+    return logcat_classifier.classify(line)
@@ -0,0 +1,257 @@
+# cli.py
+"""
+Headless batch processing of acquired cases.
+
+A case is a directory holding the `logs/` folder written by an extraction
+(plain dumps and/or evidence containers). For each case the logs are
+parsed into the record store, the logcat is categorized, the optional
+filter is applied and the graphs and the PDF report are exported into the
+case's logs/exports, exactly as the GUI would. Cases run in a process pool,
+each in a fresh process whose working directory is the case, since every
+path in the tool is relative to it. The sharded scans inside a case share
+the SCAN_PROCESSES budget with the other cases, so a batch never runs more
+scan processes than a single case would.
+
+    python -m cli /cases/phone-01 /cases/phone-02
+    python -m cli /cases --workers 8 --keyword FATAL --time-range "Past 24 Hours"
+    python -m cli /cases/phone-01 --pack --archive
+
+--archive packs the logs into evidence containers, verifies them and then
+deletes the plain dumps (see evidence.archive_logs); later runs read the
+containers.
+
+A directory that is not itself a case is searched one level down for cases.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import LOG_FILES, TIME_RANGE_HOURS, GRAPH_BUCKETS, SCAN_PROCESSES
+
+FILTER_INPUTS = {"Logcat": LOG_FILES["logcat"], "Calls": LOG_FILES["calls"], "SMS": LOG_FILES["sms"]}
+GRAPHS = [("Call Logs", "graph_calls"), ("SMS Logs", "graph_sms"), ("Logcat Activity", "graph_logcat"),
+          ("Top SMS Senders", "graph_sms_senders")]
+
+
+def is_case(path):
+    """True if path holds an acquired log (plain or packed) under logs/."""
+    from evidence import container_path
+    return any(os.path.exists(os.path.join(path, LOG_FILES[source])) or
+               os.path.exists(os.path.join(path, container_path(source))) for source in LOG_FILES)
+
+
+def find_cases(paths):
+    """Expands the command-line paths into case directories, in order and without duplicates."""
+    cases = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if is_case(path):
+            candidates = [path]
+        elif os.path.isdir(path):
+            candidates = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                          if os.path.isdir(os.path.join(path, name)) and is_case(os.path.join(path, name))]
+        else:
+            candidates = []
+        if not candidates:
+            print(f"⚠️ No case found in {path}", file=sys.stderr)
+        cases.extend(c for c in candidates if c not in cases)
+    return cases
+
+
+def _export_graphs(options):
+    # Agg must be selected before anything imports pyplot; no display is needed
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from graphing import compute_graph, compute_frequent_callers, render_graph, save_chart
+    specs = [(compute_graph(log_type, options["time_range"], options["bucket"]), name)
+             for log_type, name in GRAPHS]
+    specs.append((compute_frequent_callers(options["time_range"]), "graph_callers"))
+    paths = []
+    for spec, name in specs:
+        fig = Figure(figsize=(7, 4))
+        ax = fig.add_subplot()
+        render_graph(ax, fig.canvas, spec)
+        paths.append(save_chart(fig, f"{name}.png"))
+    return paths
+
+
+def process_case(case_dir, options):
+    """
+    Runs the analysis of one case with case_dir as the working directory.
+    Returns a JSON-serializable dict: case, ok, seconds, steps (name -> seconds), outputs, error.
+    """
+    started = time.perf_counter()
+    result = {"case": case_dir, "ok": False, "seconds": 0.0, "steps": {}, "outputs": {}, "error": None}
+
+    def step(name, fn, *args):
+        step_started = time.perf_counter()
+        value = fn(*args)
+        result["steps"][name] = round(time.perf_counter() - step_started, 3)
+        return value
+
+    try:
+        os.chdir(case_dir)
+        from record_store import ensure_ingested
+        from evidence import archive_logs, log_exists, pack_logs
+        from scripts.incremental_logcat import categorize_logcat
+        from filtering import filter_logs
+        from reporting import generate_full_report
+
+        step("ingest", lambda: [ensure_ingested(source) for source in LOG_FILES])
+        if log_exists(LOG_FILES["logcat"]):
+            result["outputs"]["categories"] = step("categorize", categorize_logcat)
+        if options["filter"]:
+            matches = step("filter", lambda: filter_logs(
+                FILTER_INPUTS[options["log_type"]], keyword=options["keyword"], time_range=options["time_range"],
+                severity=options["severity"], subtype=options["subtype"], query=options["query"]))
+            result["outputs"]["filtered"] = {"path": "logs/filtered_logs.txt", "matches": matches}
+        if options["graphs"]:
+            result["outputs"]["graphs"] = step("graphs", _export_graphs, options)
+        if options["report"]:
+            result["outputs"]["report"] = step("report", generate_full_report)
+        if options["pack"] or options["archive"]:
+            # Last: archiving removes the plain dumps the steps above may read faster
+            packed = step("archive", archive_logs) if options["archive"] else step("pack", pack_logs)
+            result["outputs"]["evidence"] = {source: len(index.chunks) for source, index in packed.items() if index}
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def reset_caches():
+    """
+    Clears the module-level caches (summaries, graph timestamps, viewer line offsets, token indexes,
+    filter results). They are keyed by the relative logs/ paths, so a case processed in the same
+    process as another could otherwise be served the other case's results.
+    """
+    import aggregation
+    import filter_cache
+    import token_index
+    aggregation.clear_cache()
+    filter_cache.clear()
+    token_index.clear_cache()
+    if "graphing" in sys.modules:
+        sys.modules["graphing"].clear_timestamp_cache()
+    if "gui" in sys.modules:
+        sys.modules["gui"].clear_offsets_cache()
+
+
+def scan_processes_per_case(workers):
+    """The sharded-scan processes each of workers concurrent cases may start."""
+    return max(1, SCAN_PROCESSES // workers)
+
+
+def _init_case_process(scan_processes):
+    import sharded_scan
+    sharded_scan.SCAN_PROCESSES = scan_processes
+
+
+def run_cases(cases, options, workers=None, on_result=None):
+    """
+    Processes the cases on up to workers processes (default: one per core) and returns
+    their results in case order. on_result(result) is called as each case finishes.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(cases)))
+    results = {}
+    if workers == 1:
+        # Run in-process, but keep the caller's working directory and start every case cold
+        cwd = os.getcwd()
+        try:
+            for case in cases:
+                reset_caches()
+                results[case] = process_case(case, options)
+                if on_result:
+                    on_result(results[case])
+        finally:
+            os.chdir(cwd)
+            reset_caches()
+    else:
+        # A fresh process per case: the module-level caches never mix two cases
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1, initializer=_init_case_process,
+                                 initargs=(scan_processes_per_case(workers),)) as executor:
+            futures = {executor.submit(process_case, case, options): case for case in cases}
+            for future in as_completed(futures):
+                case = futures[future]
+                try:
+                    results[case] = future.result()
+                except Exception as e:
+                    results[case] = {"case": case, "ok": False, "seconds": 0.0, "steps": {}, "outputs": {},
+                                     "error": f"{type(e).__name__}: {e}"}
+                if on_result:
+                    on_result(results[case])
+    return [results[case] for case in cases]
+
+
+def _print_result(result):
+    name = os.path.basename(result["case"])
+    if result["ok"]:
+        steps = ", ".join(f"{step} {seconds:.1f}s" for step, seconds in result["steps"].items())
+        print(f"✅ {name}: {result['seconds']:.1f}s ({steps})")
+        if "report" in result["outputs"]:
+            print(f"   report: {os.path.join(result['case'], result['outputs']['report'])}")
+        if "filtered" in result["outputs"]:
+            print(f"   filter: {result['outputs']['filtered']['matches']} matches")
+    else:
+        print(f"❌ {name}: {result['error']}")
+    sys.stdout.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Analyse acquired Android log cases without the GUI.")
+    parser.add_argument("paths", nargs="+", help="case directories, or directories containing cases")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="parallel cases (default: number of cores)")
+    parser.add_argument("--no-graphs", dest="graphs", action="store_false", help="skip the PNG graph exports")
+    parser.add_argument("--no-report", dest="report", action="store_false", help="skip the PDF report")
+    parser.add_argument("--pack", action="store_true", help="pack the logs into evidence containers")
+    parser.add_argument("--archive", action="store_true",
+                        help="pack, verify the containers and delete the plain dumps (implies --pack)")
+    parser.add_argument("--time-range", default="All Time", choices=list(TIME_RANGE_HOURS) + ["All Time"],
+                        help="time range of the filter and graphs")
+    parser.add_argument("--bucket", default="Hour", choices=list(GRAPH_BUCKETS), help="graph bucket size")
+    filters = parser.add_argument_group("filter (runs when a keyword, severity, subtype or query is given)")
+    filters.add_argument("--log-type", default="Logcat", choices=list(FILTER_INPUTS))
+    filters.add_argument("--keyword")
+    filters.add_argument("--severity")
+    filters.add_argument("--subtype")
+    filters.add_argument("--query", help="filter expression, e.g. 'fatal level:E NOT tag:ActivityManager time:24h'")
+    parser.add_argument("--json", metavar="PATH", help="also write the per-case results as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.query:
+        from filter_query import parse, QueryError
+        try:
+            parse(args.query)
+        except QueryError as e:
+            print(f"Invalid --query: {e}", file=sys.stderr)
+            return 2
+    cases = find_cases(args.paths)
+    if not cases:
+        return 2
+    options = {
+        "graphs": args.graphs, "report": args.report, "pack": args.pack or args.archive, "archive": args.archive,
+        "time_range": args.time_range, "bucket": args.bucket, "log_type": args.log_type,
+        "keyword": args.keyword, "severity": args.severity, "subtype": args.subtype, "query": args.query,
+        "filter": any((args.keyword, args.severity, args.subtype, args.query)),
+    }
+    started = time.perf_counter()
+    results = run_cases(cases, options, args.workers, on_result=_print_result)
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"{len(results) - failed}/{len(results)} cases processed in {time.perf_counter() - started:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
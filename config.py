@@ -1,4 +1,6 @@
 # config.py
+import os
+import shlex
 
 # Global configuration and constants
 BG_COLOR = "black"
@@ -8,6 +10,10 @@ TEXT_FG_COLOR = "lime"
 BUTTON_COLOR = "gray"
 BUTTON_TEXT_COLOR = "black"
 FONT = ("Consolas", 10)
+# Lines of in-memory text (e.g. filter matches streamed while the scan runs) a log
+# viewer keeps; the rest are counted in its status bar, and the full results are
+# shown from disk once they are written
+VIEWER_MAX_TEXT_LINES = 5000
 
 # Log types and corresponding regex patterns and colors
 LOG_TYPES = {
@@ -53,6 +59,148 @@ LOG_TYPES = {
     }
 }
 
+# Severity and sub-type patterns used by the Filter tab
+SEVERITY_PATTERNS = {
+    "Error": r'E/|ERROR|Exception|FATAL',
+    "Warning": r'W/|WARN|WARNING',
+    "Info": r'I/|INFO',
+    "Debug": r'D/|DEBUG',
+    "Verbose": r'V/|VERBOSE'
+}
+
+SUBTYPE_PATTERNS = {
+    "Activity": r'Activity|startActivity',
+    "Fragment": r'Fragment',
+    "View": r'View|Inflate',
+    "Lifecycle": r'onCreate|onStart|onResume|onPause|onStop|onDestroy',
+
+    "Boot": r'boot|start up|startup|starting',
+    "Memory": r'memory|heap|ram',
+    "CPU": r'cpu|processor',
+    "Battery": r'battery|power',
+
+    "NullPointer": r'NullPointerException',
+    "OutOfMemory": r'OutOfMemoryError',
+    "IllegalState": r'IllegalStateException',
+    "ANR": r'ANR|Not Responding',
+
+    "WiFi": r'wifi|wlan',
+    "Mobile": r'mobile|cellular|data connection',
+    "HTTP": r'http|https|URL',
+    "Socket": r'socket|tcp|udp',
+
+    "Dalvik GC": r'dalvikvm.*GC',
+    "ART GC": r'art.*GC',
+    "Explicit GC": r'Explicit GC',
+    "Concurrent GC": r'Concurrent GC',
+
+    "System": r'android\.intent\.action|system broadcast',
+    "App": r'com\.',
+    "Sticky": r'sticky|registerReceiver',
+    "Ordered": r'ordered broadcast',
+
+    "Start": r'startService',
+    "Stop": r'stopService',
+    "Bind": r'bindService|onBind',
+    "Unbind": r'unbindService|onUnbind',
+
+    "Power": r'power|PowerManager|wake|sleep',
+    "Sensor": r'sensor|Sensor',
+    "Camera": r'camera|Camera',
+    "Location": r'location|LocationManager|GPS'
+}
+
 # Monitoring flag and queue (used by live-monitor module)
 monitoring_active = False
 log_queue = None  # Will be initialized in the main module
+# Lines the Live Monitoring view and each Logcat Types tab keep from live batches,
+# and batches waiting for the live classifier before new ones are dropped (and counted)
+LIVE_MAX_LINES = 1000
+LIVE_CLASSIFY_QUEUE_BATCHES = 100
+
+# Acquired log files, keyed by source name
+LOG_FILES = {
+    "logcat": "logs/android_logcat.txt",
+    "calls": "logs/call_logs.txt",
+    "sms": "logs/sms_logs.txt",
+}
+
+# Length of each relative time range offered in the UI, in hours
+TIME_RANGE_HOURS = {
+    "Past 1 Hour": 1,
+    "Past 24 Hours": 24,
+    "Past 7 Days": 24 * 7,
+}
+
+# Bucket sizes offered for activity graphs, in milliseconds
+GRAPH_BUCKETS = {
+    "Minute": 60 * 1000,
+    "Hour": 60 * 60 * 1000,
+    "Day": 24 * 60 * 60 * 1000,
+}
+
+# Parsed record store shared by the Graphs, Filter and Export features
+RECORD_STORE_PATH = "logs/records.db"
+
+# Filter results kept in memory so re-running a filter skips the scan, bounded by
+# the encoded size of their match locations (a few bytes per match)
+FILTER_CACHE_BYTES = 16 * 1024 * 1024
+# Entries a filter reads between checks for a newer filter superseding it
+FILTER_CANCEL_CHECK_ENTRIES = 2000
+
+# Multi-process scans of large plain files (filter, logcat categories, logcat
+# summary): worker processes (ANDROID_FORENSIC_SCAN_PROCESSES, default one per
+# CPU), the size below which a file is scanned in-process, and byte ranges per
+# worker so uneven ranges still keep every worker busy
+SCAN_PROCESSES = int(os.environ.get("ANDROID_FORENSIC_SCAN_PROCESSES", "0")) or os.cpu_count() or 1
+SHARDED_SCAN_MIN_BYTES = 64 * 1024 * 1024
+SHARDS_PER_PROCESS = 4
+
+# Background worker pool used by the GUI, and how often/how much the UI thread
+# drains the updates those workers post
+WORKER_THREADS = 4
+UI_DISPATCH_INTERVAL_MS = 50
+UI_DISPATCH_BATCH = 200
+
+# adb command used for acquisition and live monitoring. Set ANDROID_FORENSIC_ADB
+# to another binary or command line (e.g. "python scripts/fake_adb.py") to run
+# without a device.
+ADB_COMMAND = shlex.split(os.environ.get("ANDROID_FORENSIC_ADB", "adb"), posix=os.name != "nt")
+
+# Incremental logcat acquisition: resume cursor, staging file for each pull, and
+# where the logcat file is rolled once a pull would grow it past LOGCAT_SEGMENT_BYTES.
+# The segments and the current file are read as one log (see evidence.py).
+LOGCAT_CURSOR_PATH = "logs/logcat_cursor.json"
+LOGCAT_INCOMING_PATH = "logs/logcat_incoming.txt"
+LOGCAT_SEGMENT_DIR = "logs/logcat_segments"
+LOGCAT_SEGMENT_BYTES = 256 * 1024 * 1024
+# Per-category logcat files written during extraction
+LOGCAT_TYPES_DIR = "logs/logcat_types"
+
+# Paged `content query` acquisition of the call log and SMS providers: rows per
+# page, retries of a failed page, and the columns fetched from each provider
+CONTENT_QUERY_PAGE_SIZE = 500
+CONTENT_QUERY_PAGE_RETRIES = 3
+CONTENT_QUERY_PROJECTIONS = {
+    "calls": ["_id", "number", "date", "duration", "type", "name"],
+    "sms": ["_id", "thread_id", "address", "date", "date_sent", "type", "read", "body"],
+}
+
+# Compressed, hashed evidence containers packed from the acquired files after
+# extraction, kept next to the plain files as a sealed archive copy
+EVIDENCE_DIR = "logs/evidence"
+EVIDENCE_CHUNK_BYTES = 1024 * 1024
+EVIDENCE_COMPRESSION_LEVEL = 6
+
+# PDF report: threads collecting the section statistics, how many of today's
+# entries each logcat category lists, and whether the complete listings are
+# written next to the PDF as a gzip-compressed text attachment
+REPORT_SECTION_WORKERS = 4
+REPORT_APPENDIX_MAX_LINES = 200
+REPORT_APPENDIX_ATTACHMENT = True
+
+# Opt-in timers/counters for the hot paths (also switchable in the Diagnostics
+# tab), where metric and profile dumps are written, and how often the tab refreshes
+INSTRUMENTATION_ENABLED = os.environ.get("ANDROID_FORENSIC_INSTRUMENT", "") == "1"
+DIAGNOSTICS_DIR = "logs/diagnostics"
+DIAGNOSTICS_REFRESH_MS = 1000
@@ -0,0 +1,141 @@
+# content_rows.py
+"""
+Streaming parser for `adb shell content query` output.
+
+Each record is printed as "Row: N key=value, key=value, ..." but values
+(SMS bodies in particular) may contain commas and newlines, so a physical
+line is not a record. iter_rows() groups continuation lines with the row
+they belong to and tokenizes the fields with a single forward scan: a
+", " only separates two fields when it is followed by an identifier and
+"=" that has not been seen yet in the row.
+"""
+import re
+
+ROW_PREFIX = b"Row: "
+
+# Longest column name we accept when deciding whether ", " starts a new field
+MAX_KEY_LENGTH = 64
+
+
+class ContentRow:
+    """One `content query` row: its index, byte span in the dump and parsed fields."""
+
+    __slots__ = ("row_no", "offset", "length", "text", "fields", "starts")
+
+    def __init__(self, row_no, offset, length, text, fields, starts):
+        self.row_no = row_no
+        self.offset = offset
+        self.length = length
+        self.text = text
+        self.fields = fields
+        self.starts = starts
+
+    def get(self, key, default=None):
+        value = self.fields.get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def get_int(self, key, default=None):
+        """Returns a field as an int, or default if it is missing, NULL or not numeric."""
+        value = self.fields.get(key)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            return default
+
+    def byte_offset(self, key):
+        """Returns the absolute byte offset of a field's value in the dump, or None."""
+        start = self.starts.get(key)
+        if start is None:
+            return None
+        return self.offset + len(self.text[:start].encode("utf-8"))
+
+    def __repr__(self):
+        return f"ContentRow({self.row_no}, {self.fields!r})"
+
+
+# Candidate field separator: ", " followed by a column name and "=". The
+# bounded, anchored-by-literal pattern cannot backtrack across the value.
+_FIELD_SEPARATOR_RE = re.compile(r', ([A-Za-z_][A-Za-z0-9_]{0,%d})=' % (MAX_KEY_LENGTH - 1))
+
+
+def parse_row_fields(text, start=0, columns=None):
+    """
+    Tokenizes "key=value, key=value, ..." starting at text[start].
+    Returns (fields, starts) where starts maps each key to the index of its value.
+    NULL values become None. If columns is given, only those names can start a field.
+    """
+    fields = {}
+    starts = {}
+    end = len(text)
+    while end > start and text[end - 1] in "\r\n":
+        end -= 1
+    eq = text.find("=", start, end)
+    if eq < 0:
+        return fields, starts
+    key = text[start:eq]
+    value_start = eq + 1
+    for match in _FIELD_SEPARATOR_RE.finditer(text, value_start, end):
+        candidate = match.group(1)
+        # A repeated or unknown name is part of the current value (e.g. ", x=" in an SMS body)
+        if candidate in fields or candidate == key or (columns is not None and candidate not in columns):
+            continue
+        value = text[value_start:match.start()]
+        fields[key] = None if value == "NULL" else value
+        starts[key] = value_start
+        key = candidate
+        value_start = match.end()
+    value = text[value_start:end]
+    fields[key] = None if value == "NULL" else value
+    starts[key] = value_start
+    return fields, starts
+
+
+def _make_row(row_no, offset, data, columns):
+    text = data.decode("utf-8", "replace")
+    # Skip the "Row: N " header
+    header_end = text.find(" ", len("Row: "))
+    if header_end < 0:
+        header_end = len(text)
+    fields, starts = parse_row_fields(text, header_end + 1, columns)
+    return ContentRow(row_no, offset, len(data), text, fields, starts)
+
+
+def iter_rows(f, columns=None):
+    """
+    Yields a ContentRow for every row of a binary `content query` dump, in a single pass.
+    Lines before the first "Row:" (e.g. an error message) are ignored.
+    """
+    row_no = 0
+    start = None
+    parts = []
+    offset = 0
+    for raw in f:
+        if raw.startswith(ROW_PREFIX):
+            if start is not None:
+                yield _make_row(row_no, start, b"".join(parts), columns)
+                row_no += 1
+            start = offset
+            parts = [raw]
+        elif start is not None:
+            parts.append(raw)
+        offset += len(raw)
+    if start is not None:
+        yield _make_row(row_no, start, b"".join(parts), columns)
+
+
+def read_rows(path, columns=None):
+    """Yields the rows of a `content query` dump file; yields nothing if it does not exist."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from iter_rows(f, columns)
@@ -0,0 +1,680 @@
+# evidence.py
+"""
+Compressed, chunked evidence containers for the acquired logs.
+
+A container ("<source>.evd" under EVIDENCE_DIR) holds the exact bytes of one
+acquired file split into chunks at record boundaries. Every chunk is
+compressed on its own (zlib) and described in an index at the end of the
+file: its position, raw byte range, record range, oldest/newest timestamp
+and the SHA-256 of its raw bytes. Readers therefore decompress only the
+chunks they touch, time-range scans skip chunks whose newest entry is too
+old, and verify() re-hashes chunks for chain of custody.
+
+Packing keeps the plain files, which the tool reads while they exist and
+which incremental acquisition appends to. archive_logs() then makes the
+containers the store: it verifies each container against its plain file
+and deletes the plain file, cutting a case's storage to the compressed
+chunks. open_log() and map_log() return the plain file while it exists and
+fall back to the container, so an archived case is still filtered, graphed,
+reported on and viewed, decompressing only the chunks each reader touches
+(time-range scans skip older chunks, indexed reads seek to their records).
+The scans that need a plain file (sharded scans, the timestamp index) are
+not used for it. An archived case is read-only: a later extraction starts
+new plain files, and packing them replaces the containers.
+
+Layout: header, compressed chunks, chunk index, trailer.
+
+The plain logcat may also be segmented: incremental acquisition rolls the
+file into LOGCAT_SEGMENT_DIR once it would grow past LOGCAT_SEGMENT_BYTES
+and starts a new one. The segments, oldest first, and then the current file
+make up the log: open_log(), map_log() and log_signature() treat them as one
+file, so offsets in the sidecar indexes, the record store and the container
+run across segments, and rolling a segment moves no offset.
+"""
+import hashlib
+import io
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+from config import (LOG_FILES, EVIDENCE_DIR, EVIDENCE_CHUNK_BYTES, EVIDENCE_COMPRESSION_LEVEL,
+                    LOGCAT_SEGMENT_DIR)
+
+CONTAINER_SUFFIX = ".evd"
+
+_MAGIC = b"AFEV"
+_TRAILER_MAGIC = b"AFEX"
+_VERSION = 1
+_CODEC_ZLIB = 1
+# magic, version, codec
+_HEADER = struct.Struct("<4sHH")
+# file offset, compressed size, raw size, raw offset, first record, record count, min ts, max ts, sha256
+_CHUNK = struct.Struct("<QIIQQIqq32s")
+# index offset, chunk count, source size, source mtime_ns, magic
+_TRAILER = struct.Struct("<QIQq4s")
+_NO_TIMESTAMP = -(2 ** 63)
+
+
+class Chunk:
+    """Index entry of one compressed chunk."""
+
+    __slots__ = ("offset", "compressed_size", "raw_size", "raw_offset", "first_record",
+                 "record_count", "min_ts", "max_ts", "sha256")
+
+    def __init__(self, offset, compressed_size, raw_size, raw_offset, first_record,
+                 record_count, min_ts, max_ts, sha256):
+        self.offset = offset
+        self.compressed_size = compressed_size
+        self.raw_size = raw_size
+        self.raw_offset = raw_offset
+        self.first_record = first_record
+        self.record_count = record_count
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.sha256 = sha256
+
+    def pack(self):
+        return _CHUNK.pack(self.offset, self.compressed_size, self.raw_size, self.raw_offset,
+                           self.first_record, self.record_count, self.min_ts, self.max_ts, self.sha256)
+
+    def has_timestamps(self):
+        return self.max_ts != _NO_TIMESTAMP
+
+
+class ContainerIndex:
+    """The chunk index and trailer fields of a container."""
+
+    def __init__(self, chunks, index_offset, source_size, source_mtime_ns):
+        self.chunks = chunks
+        self.index_offset = index_offset
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+        self.raw_offsets = array("q", (chunk.raw_offset for chunk in chunks))
+
+    @property
+    def record_count(self):
+        return sum(chunk.record_count for chunk in self.chunks)
+
+    @property
+    def compressed_size(self):
+        return sum(chunk.compressed_size for chunk in self.chunks)
+
+
+def container_path(source):
+    return os.path.join(EVIDENCE_DIR, source + CONTAINER_SUFFIX)
+
+
+def read_index(path):
+    """Reads the chunk index of a container. Raises ValueError if the file is not a valid container."""
+    with open(path, "rb") as f:
+        magic, version, codec = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION or codec != _CODEC_ZLIB:
+            raise ValueError(f"{path} is not an evidence container")
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        index_offset, count, source_size, source_mtime_ns, trailer_magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if trailer_magic != _TRAILER_MAGIC:
+            raise ValueError(f"{path} has no chunk index (incomplete write?)")
+        f.seek(index_offset)
+        data = f.read(count * _CHUNK.size)
+    chunks = [Chunk(*_CHUNK.unpack_from(data, i * _CHUNK.size)) for i in range(count)]
+    return ContainerIndex(chunks, index_offset, source_size, source_mtime_ns)
+
+# -------------------------------------------------------------------
+# Writing
+# -------------------------------------------------------------------
+def _source_records(source, f, start_record=0, start_offset=0):
+    """Yields (offset, length, ts) for each record of an acquired file, from start_offset."""
+    from record_store import parse_logcat, parse_content_rows
+    if source == "logcat":
+        for _, ts, _, _, _, offset, length in parse_logcat(f, start_record, start_offset):
+            yield offset, length, ts
+    else:
+        for _, ts, _, _, _, offset, length, _ in parse_content_rows(f):
+            yield offset, length, ts
+
+
+def _write_chunks(out, raw, records, chunk_start, first_record, end, chunk_bytes, level):
+    """Compresses raw[chunk_start:end] into chunks cut at record boundaries; returns their Chunks."""
+    chunks = []
+    record_no = first_record
+    count = 0
+    min_ts = max_ts = _NO_TIMESTAMP
+
+    def emit(stop):
+        data = raw.read(stop - chunk_start)
+        compressed = zlib.compress(data, level)
+        chunk = Chunk(out.tell(), len(compressed), len(data), chunk_start, record_no, count,
+                      min_ts, max_ts, hashlib.sha256(data).digest())
+        out.write(compressed)
+        chunks.append(chunk)
+
+    for offset, length, ts in records:
+        if ts is not None:
+            min_ts = ts if min_ts == _NO_TIMESTAMP else min(min_ts, ts)
+            max_ts = max(max_ts, ts)
+        count += 1
+        record_end = offset + length
+        if record_end - chunk_start >= chunk_bytes:
+            emit(record_end)
+            chunk_start = record_end
+            record_no += count
+            count = 0
+            min_ts = max_ts = _NO_TIMESTAMP
+    if end > chunk_start:
+        emit(end)
+    return chunks
+
+
+def _write_index(out, chunks, source_size, source_mtime_ns):
+    index_offset = out.tell()
+    for chunk in chunks:
+        out.write(chunk.pack())
+    out.write(_TRAILER.pack(index_offset, len(chunks), source_size, source_mtime_ns, _TRAILER_MAGIC))
+    out.truncate()
+
+
+def write_container(source, source_path=None, path=None, chunk_bytes=EVIDENCE_CHUNK_BYTES,
+                    level=EVIDENCE_COMPRESSION_LEVEL):
+    """Packs an acquired file (all its segments) into a new container and returns its ContainerIndex."""
+    source_path = source_path or LOG_FILES[source]
+    path = path or container_path(source)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    size, mtime_ns = plain_signature(source_path)
+    tmp_path = path + ".tmp"
+    with open_plain(source_path) as f, open_plain(source_path) as raw, open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, _VERSION, _CODEC_ZLIB))
+        chunks = _write_chunks(out, raw, _source_records(source, f), 0, 0, size, chunk_bytes, level)
+        _write_index(out, chunks, size, mtime_ns)
+    os.replace(tmp_path, path)
+    return read_index(path)
+
+
+def _same_prefix(index, source_path):
+    """True if the source still starts with the bytes the container's last chunk was made from."""
+    if not index.chunks:
+        return False
+    last = index.chunks[-1]
+    with open_plain(source_path) as f:
+        f.seek(last.raw_offset)
+        return hashlib.sha256(f.read(last.raw_size)).digest() == last.sha256
+
+
+def pack_source(source, chunk_bytes=EVIDENCE_CHUNK_BYTES, level=EVIDENCE_COMPRESSION_LEVEL):
+    """
+    Brings the container of a source up to date with its acquired file. A logcat file that
+    only grew (incremental acquisition) gets new chunks appended after the existing ones;
+    anything else is repacked. Returns the ContainerIndex, or None if the file does not exist.
+    """
+    source_path = LOG_FILES[source]
+    path = container_path(source)
+    signature = plain_signature(source_path)
+    if signature is None:
+        return None
+    try:
+        index = read_index(path)
+    except (FileNotFoundError, ValueError, struct.error):
+        index = None
+    if index is not None and (index.source_size, index.source_mtime_ns) == signature:
+        return index
+    size, mtime_ns = signature
+    if (source != "logcat" or index is None or index.source_size >= size
+            or not _same_prefix(index, source_path)):
+        return write_container(source, source_path, path, chunk_bytes, level)
+    # Copy the existing chunks, append chunks for the new tail and write the index after
+    # them, into a new file that replaces the container only once it is complete
+    start = index.source_size
+    first_record = index.record_count
+    tmp_path = path + ".tmp"
+    with open_plain(source_path) as f, open_plain(source_path) as raw, open(tmp_path, "wb") as out:
+        with open(path, "rb") as old:
+            _copy_bytes(old, out, index.index_offset)
+        f.seek(start)
+        raw.seek(start)
+        new_chunks = _write_chunks(out, raw, _source_records(source, f, first_record, start), start,
+                                   first_record, size, chunk_bytes, level)
+        _write_index(out, index.chunks + new_chunks, size, mtime_ns)
+    os.replace(tmp_path, path)
+    return read_index(path)
+
+
+def _copy_bytes(src, dst, length, block=EVIDENCE_CHUNK_BYTES):
+    """Copies the first length bytes of src to dst."""
+    while length > 0:
+        data = src.read(min(block, length))
+        if not data:
+            raise ValueError(f"{src.name} is shorter than its chunk index says")
+        dst.write(data)
+        length -= len(data)
+
+
+def pack_logs(sources=None):
+    """Packs every acquired file into its container. Returns {source: ContainerIndex or None}."""
+    return {source: pack_source(source) for source in (sources or LOG_FILES)}
+
+
+def archive_source(source):
+    """
+    Packs a source, verifies its container and only then deletes the plain file (with the
+    segments of a logcat), leaving the container as what the tool reads. Returns the
+    ContainerIndex, or None if the source has neither a plain file nor a container. Raises
+    ValueError, keeping the plain file, if the container does not verify.
+    """
+    source_path = LOG_FILES[source]
+    path = container_path(source)
+    signature = plain_signature(source_path)
+    if signature is None:
+        # Already archived, or never acquired
+        return read_index(path) if os.path.exists(path) else None
+    index = pack_source(source)
+    bad = verify(path)
+    if bad or (index.source_size, index.source_mtime_ns) != signature:
+        raise ValueError(f"{path} does not match {source_path} (bad chunks: {bad}); the plain file is kept")
+    for part in plain_parts(source_path):
+        os.remove(part)
+    return index
+
+
+def archive_logs(sources=None):
+    """Archives every acquired file (see archive_source). Returns {source: ContainerIndex or None}."""
+    return {source: archive_source(source) for source in (sources or LOG_FILES)}
+
+
+def verify(path):
+    """Re-hashes every chunk of a container. Returns the indexes of chunks whose SHA-256 does not match."""
+    index = read_index(path)
+    bad = []
+    with open(path, "rb") as f:
+        for i, chunk in enumerate(index.chunks):
+            f.seek(chunk.offset)
+            try:
+                data = zlib.decompress(f.read(chunk.compressed_size))
+            except zlib.error:
+                bad.append(i)
+                continue
+            if hashlib.sha256(data).digest() != chunk.sha256:
+                bad.append(i)
+    return bad
+
+# -------------------------------------------------------------------
+# Segmented logcat store
+# -------------------------------------------------------------------
+def segment_paths(path):
+    """The segments rolled off a logcat file, oldest first ([] for any other file)."""
+    if os.path.normpath(path) != os.path.normpath(LOG_FILES["logcat"]) or not os.path.isdir(LOGCAT_SEGMENT_DIR):
+        return []
+    stem, ext = os.path.splitext(os.path.basename(path))
+    # Numbered with leading zeros, so the names sort in rolling order
+    names = sorted(name for name in os.listdir(LOGCAT_SEGMENT_DIR)
+                   if name.startswith(stem + ".") and name.endswith(ext))
+    return [os.path.join(LOGCAT_SEGMENT_DIR, name) for name in names]
+
+
+def roll_segment(path):
+    """
+    Moves a logcat file into LOGCAT_SEGMENT_DIR as its newest segment, so the next append
+    starts a new file. Returns the segment's path.
+    """
+    segments = segment_paths(path)
+    number = int(segments[-1].rsplit(".", 2)[1]) + 1 if segments else 1
+    stem, ext = os.path.splitext(os.path.basename(path))
+    os.makedirs(LOGCAT_SEGMENT_DIR, exist_ok=True)
+    segment = os.path.join(LOGCAT_SEGMENT_DIR, f"{stem}.{number:04d}{ext}")
+    os.replace(path, segment)
+    return segment
+
+
+def remove_segments(path):
+    """Deletes the segments of a logcat file, e.g. once a full dump replaced the whole log."""
+    for segment in segment_paths(path):
+        os.remove(segment)
+
+
+def plain_parts(path):
+    """The plain files that make up a log, in order: its segments, then the file itself."""
+    return segment_paths(path) + [path]
+
+
+def plain_signature(path):
+    """
+    (size, mtime_ns) of a plain file and its segments: their total size, and the mtime of
+    the file itself, the only part that changes. None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size + sum(os.path.getsize(segment) for segment in segment_paths(path)), st.st_mtime_ns
+
+
+class SegmentedReader(io.RawIOBase):
+    """Seekable read-only view of the plain files of a segmented log as one file."""
+
+    def __init__(self, paths):
+        super().__init__()
+        self._files = []
+        self._starts = array("q")
+        self._size = 0
+        try:
+            for path in paths:
+                f = open(path, "rb")
+                self._files.append(f)
+                self._starts.append(self._size)
+                self._size += os.fstat(f.fileno()).st_size
+        except OSError:
+            self.close()
+            raise
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._pos >= self._size:
+            return 0
+        # The last part starting at or before the position; empty parts are skipped over
+        i = bisect_right(self._starts, self._pos) - 1
+        f = self._files[i]
+        f.seek(self._pos - self._starts[i])
+        n = f.readinto(buffer)
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            for f in self._files:
+                f.close()
+        super().close()
+
+
+class _JoinedMap:
+    """
+    Consecutive non-empty parts of a log read as one mapped buffer: len(), slices, find()
+    and rfind(). Every part ends with a complete line, so a line never spans two parts; a
+    needle that would (one longer than a line ending) is not found across them.
+    Subclasses fill _starts and _sizes and return the bytes of part i from _part(i).
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._sizes = []
+
+    def _part(self, i):
+        raise NotImplementedError
+
+    def __len__(self):
+        return self._starts[-1] + self._sizes[-1] if self._starts else 0
+
+    def __getitem__(self, key):
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return b""
+        i = bisect_right(self._starts, start) - 1
+        pieces = []
+        while start < stop:
+            base = self._starts[i]
+            end = min(stop, base + self._sizes[i])
+            pieces.append(self._part(i)[start - base:end - base])
+            start = end
+            i += 1
+        return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+    def _overlapping(self, start, end):
+        """The parts overlapping [start, end), in order."""
+        first = max(0, bisect_right(self._starts, max(0, start)) - 1)
+        return [i for i in range(first, len(self._starts)) if self._starts[i] < end]
+
+    def find(self, sub, start=0, end=None):
+        end = len(self) if end is None else end
+        for i in self._overlapping(start, end):
+            base = self._starts[i]
+            found = self._part(i).find(sub, max(0, start - base), end - base)
+            if found >= 0:
+                return base + found
+        return -1
+
+    def rfind(self, sub, start=0, end=None):
+        end = len(self) if end is None else end
+        for i in reversed(self._overlapping(start, end)):
+            base = self._starts[i]
+            found = self._part(i).rfind(sub, max(0, start - base), end - base)
+            if found >= 0:
+                return base + found
+        return -1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SegmentedMap(_JoinedMap):
+    """The plain files of a segmented log, mapped read-only as one buffer."""
+
+    def __init__(self, paths):
+        super().__init__()
+        self._maps = []
+        size = 0
+        try:
+            for path in paths:
+                with open(path, "rb") as f:
+                    part_size = os.fstat(f.fileno()).st_size
+                    # mmap refuses empty files; they hold nothing to map anyway
+                    if part_size:
+                        self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                        self._starts.append(size)
+                        self._sizes.append(part_size)
+                        size += part_size
+        except (OSError, ValueError):
+            self.close()
+            raise
+
+    def _part(self, i):
+        return self._maps[i]
+
+    def close(self):
+        for mm in self._maps:
+            mm.close()
+        self._maps = []
+
+
+def open_plain(path):
+    """Opens the plain file of a log (all its segments, if it has any) for binary reading."""
+    segments = segment_paths(path)
+    if not segments:
+        return open(path, "rb")
+    return io.BufferedReader(SegmentedReader(segments + [path]))
+
+# -------------------------------------------------------------------
+# Reading
+# -------------------------------------------------------------------
+class ContainerReader(io.RawIOBase):
+    """Seekable read-only view of the original bytes of a container, decompressing chunk by chunk."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.index = read_index(path)
+        self._file = open(path, "rb")
+        self._pos = 0
+        self._cached = (None, b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def _chunk_data(self, i):
+        if self._cached[0] != i:
+            chunk = self.index.chunks[i]
+            self._file.seek(chunk.offset)
+            self._cached = (i, zlib.decompress(self._file.read(chunk.compressed_size)))
+        return self._cached[1]
+
+    def readinto(self, buffer):
+        if self._pos >= self.index.source_size:
+            return 0
+        i = bisect_right(self.index.raw_offsets, self._pos) - 1
+        data = self._chunk_data(i)
+        start = self._pos - self.index.chunks[i].raw_offset
+        n = min(len(buffer), len(data) - start)
+        buffer[:n] = data[start:start + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.index.source_size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_container(path):
+    """Opens a container as a buffered, seekable binary file of the original bytes."""
+    return io.BufferedReader(ContainerReader(path), buffer_size=EVIDENCE_CHUNK_BYTES)
+
+
+class ContainerMap(_JoinedMap):
+    """The original bytes of a container as one buffer, decompressing only the chunks read (the last one is kept)."""
+
+    def __init__(self, path):
+        super().__init__()
+        self._reader = ContainerReader(path)
+        for chunk in self._reader.index.chunks:
+            if chunk.raw_size:
+                self._starts.append(chunk.raw_offset)
+                self._sizes.append(chunk.raw_size)
+        self._chunk_ids = [i for i, chunk in enumerate(self._reader.index.chunks) if chunk.raw_size]
+
+    def _part(self, i):
+        return self._reader._chunk_data(self._chunk_ids[i])
+
+    def close(self):
+        self._reader.close()
+
+
+def _container_for(path):
+    if path.endswith(CONTAINER_SUFFIX):
+        return path
+    for source, source_path in LOG_FILES.items():
+        if os.path.normpath(source_path) == os.path.normpath(path):
+            return container_path(source)
+    return None
+
+
+def open_log(path):
+    """
+    Opens an acquired log (or a container path) for binary reading: the plain file, with its
+    segments, if it exists, else the container of the same source. Raises FileNotFoundError
+    if neither exists.
+    """
+    if path.endswith(CONTAINER_SUFFIX):
+        return open_container(path)
+    if os.path.exists(path):
+        return open_plain(path)
+    container = _container_for(path)
+    if container is not None and os.path.exists(container):
+        return open_container(container)
+    raise FileNotFoundError(path)
+
+
+def open_log_text(path):
+    """open_log() decoded as UTF-8 text (undecodable bytes replaced)."""
+    return io.TextIOWrapper(open_log(path), encoding="utf-8", errors="replace")
+
+
+def map_log(path):
+    """
+    Maps an acquired log read-only as open_log() opens it: the plain file (an mmap, or a
+    SegmentedMap over its segments), else its container as a ContainerMap. Use as a
+    context manager. An empty plain file cannot be mapped (ValueError).
+    """
+    if path.endswith(CONTAINER_SUFFIX):
+        return ContainerMap(path)
+    if os.path.exists(path):
+        segments = segment_paths(path)
+        if segments:
+            return SegmentedMap(segments + [path])
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    container = _container_for(path)
+    if container is not None and os.path.exists(container):
+        return ContainerMap(container)
+    raise FileNotFoundError(path)
+
+
+def log_exists(path):
+    container = _container_for(path)
+    return os.path.exists(path) or (container is not None and os.path.exists(container))
+
+
+def log_signature(path):
+    """
+    (size, mtime_ns) of the plain file (see plain_signature), or of the source it was packed
+    from; None if neither exists.
+    """
+    signature = plain_signature(path)
+    if signature is not None:
+        return signature
+    container = _container_for(path)
+    try:
+        index = read_index(container) if container else None
+    except (FileNotFoundError, ValueError, struct.error):
+        return None
+    return (index.source_size, index.source_mtime_ns) if index else None
+
+
+def iter_lines_since(path, since_ms, located=False):
+    """
+    Yields the decoded lines of a container, decompressing only chunks that can hold entries
+    at or after since_ms. Callers still apply their own time check. With located, lines are
+    (offset, length, text) with offsets into the source.
+    """
+    index = read_index(path)
+    newest = _NO_TIMESTAMP
+    with open(path, "rb") as f:
+        for chunk in index.chunks:
+            if chunk.has_timestamps():
+                newest = max(newest, chunk.max_ts)
+            # A line without a date takes that of a line before it, so a chunk can only
+            # hold entries in the window if a line up to its end is dated inside it
+            if since_ms is not None and newest < since_ms:
+                continue
+            f.seek(chunk.offset)
+            data = zlib.decompress(f.read(chunk.compressed_size))
+            if not located:
+                yield from io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="replace", newline="")
+                continue
+            offset = chunk.raw_offset
+            for raw in io.BytesIO(data):
+                yield offset, len(raw), raw.decode("utf-8", "replace")
+                offset += len(raw)
@@ -0,0 +1,209 @@
+# filter_cache.py
+"""
+LRU cache of Filter tab results.
+
+A result is keyed by the input file's fingerprint (its size and mtime, see
+evidence.log_signature) and the filter controls. It holds the byte span of
+every match as varint-encoded gaps (see token_index.encode_postings), a few
+bytes per match instead of its text. Re-running a filter reads the matched
+records straight from their offsets, with no scan and no predicate tests.
+If the output file still holds the result of the last run, nothing is read
+at all. A new extraction changes the fingerprint, so stale results are never
+served; invalidate() also drops them eagerly. The cache is bounded by the
+encoded size of the results it holds (FILTER_CACHE_BYTES) and evicts the
+least recently used first.
+
+Relative time windows ("Past 24 Hours", time:24h) move with the clock. When
+they are required lower bounds, a result also keeps each match's timestamp,
+and a later run drops the matches that have fallen out of the window, which
+is exactly what a rescan would return. Filters whose matches could grow with
+time (e.g. NOT time:1h) are not cached.
+"""
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from config import FILTER_CACHE_BYTES
+from evidence import open_log, log_signature
+from token_index import encode_postings, decode_postings
+import instrumentation
+
+_NO_TIMESTAMP = -(2 ** 63)
+# Bytes charged for every result on top of its encoded matches (key, object), so
+# results with few or no matches still count against the bound
+_ENTRY_OVERHEAD = 512
+
+_lock = threading.Lock()
+# key -> FilterResult, least recently used first
+_results = OrderedDict()
+_total_bytes = 0
+
+
+def make_key(input_file, plan, keyword=None, time_range=None, severity=None, subtype=None, query=None):
+    """The cache key of a filter run on input_file, or None if its result cannot be cached."""
+    if not plan.narrows_over_time:
+        return None
+    signature = log_signature(input_file)
+    if signature is None:
+        return None
+    return (os.path.normpath(input_file), signature,
+            keyword or "", time_range or "", severity or "", subtype or "", query or "")
+
+
+class FilterResult:
+    """The matches of one filter run, and the output file last written from them."""
+
+    __slots__ = ("spans", "count", "timestamps", "since_ms", "output")
+
+    def __init__(self, spans, count, timestamps=None, since_ms=None):
+        # Varint gaps between the start and end offsets of consecutive matches
+        self.spans = spans
+        self.count = count
+        # Epoch ms of every match (_NO_TIMESTAMP if it has none), kept for relative time windows
+        self.timestamps = timestamps
+        self.since_ms = since_ms
+        # (path, (size, mtime_ns)) of the output file holding exactly these matches
+        self.output = None
+
+    @property
+    def nbytes(self):
+        timestamps = self.timestamps
+        size = _ENTRY_OVERHEAD + len(self.spans)
+        return size + (timestamps.itemsize * len(timestamps) if timestamps is not None else 0)
+
+    def locations(self):
+        """Returns the (offset, length) of every match, in file order."""
+        bounds = decode_postings(self.spans, 0, len(self.spans))
+        return [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(0, len(bounds), 2)]
+
+    def narrowed(self, since_ms):
+        """The result without the matches older than since_ms (self if there are none)."""
+        timestamps = self.timestamps
+        # Matches without a date were outside the window already
+        keep = [ts >= since_ms for ts in timestamps]
+        if all(keep):
+            return self
+        builder = ResultBuilder(keep_timestamps=True)
+        for kept, (offset, length), ts in zip(keep, self.locations(), timestamps):
+            if kept:
+                builder.add(offset, length, None if ts == _NO_TIMESTAMP else ts)
+        return builder.finish(since_ms)
+
+    def mark_written(self, output_file):
+        self.output = (os.path.normpath(output_file), _stat(output_file))
+
+    def written_to(self, output_file):
+        """True if output_file still holds exactly these matches."""
+        output = self.output
+        return output is not None and output[0] == os.path.normpath(output_file) and output[1] == _stat(output_file)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class ResultBuilder:
+    """Collects the matches of a filter run, which must arrive in file order."""
+
+    def __init__(self, keep_timestamps=False):
+        self._spans = bytearray()
+        self._end = 0
+        self._count = 0
+        self._timestamps = array("q") if keep_timestamps else None
+        # False once a match arrives out of order; such a run is not cached
+        self.valid = True
+
+    def add(self, offset, length, ts=None):
+        if offset < self._end:
+            self.valid = False
+            return
+        # Single-value calls encode the gaps to the previous end and to this end
+        encode_postings((offset - self._end,), self._spans)
+        encode_postings((length,), self._spans)
+        self._end = offset + length
+        self._count += 1
+        if self._timestamps is not None:
+            self._timestamps.append(_NO_TIMESTAMP if ts is None else ts)
+
+    def finish(self, since_ms=None):
+        return FilterResult(bytes(self._spans), self._count, self._timestamps, since_ms)
+
+
+def iter_records(path, result):
+    """Yields the text of the result's matches, read from path (or its evidence container)."""
+    with open_log(path) as f:
+        position = 0
+        for offset, length in result.locations():
+            if offset != position:
+                f.seek(offset)
+            yield f.read(length).decode("utf-8", "replace")
+            position = offset + length
+
+# -------------------------------------------------------------------
+# LRU
+# -------------------------------------------------------------------
+def get(key, since_ms=None):
+    """
+    Returns the cached result of key, or None. since_ms is the start of the filter's
+    relative time window for this run; matches that have fallen out of it are dropped.
+    """
+    if key is None:
+        return None
+    with _lock:
+        result = _results.get(key)
+        if result is not None:
+            _results.move_to_end(key)
+    if result is not None and result.timestamps is not None and since_ms is not None:
+        if result.since_ms is not None and since_ms < result.since_ms:
+            # The clock went back: matches dropped earlier may be inside the window again
+            result = None
+        else:
+            narrowed = result.narrowed(since_ms)
+            if narrowed is not result:
+                result = narrowed
+                put(key, result)
+    instrumentation.count("filter_cache.hits" if result is not None else "filter_cache.misses")
+    return result
+
+
+def put(key, result):
+    """Stores a result, evicting the least recently used ones beyond FILTER_CACHE_BYTES."""
+    global _total_bytes
+    if key is None or result.nbytes > FILTER_CACHE_BYTES:
+        return
+    evicted = 0
+    with _lock:
+        previous = _results.pop(key, None)
+        if previous is not None:
+            _total_bytes -= previous.nbytes
+        _results[key] = result
+        _total_bytes += result.nbytes
+        while _total_bytes > FILTER_CACHE_BYTES:
+            _, oldest = _results.popitem(last=False)
+            _total_bytes -= oldest.nbytes
+            evicted += 1
+        total = _total_bytes
+    if evicted:
+        instrumentation.count("filter_cache.evictions", evicted)
+    instrumentation.gauge("filter_cache.bytes", total)
+
+
+def invalidate(path=None):
+    """Drops the cached results of path, or every result when path is None."""
+    global _total_bytes
+    with _lock:
+        if path is None:
+            _results.clear()
+            _total_bytes = 0
+            return
+        path = os.path.normpath(path)
+        for key in [key for key in _results if key[0] == path]:
+            _total_bytes -= _results.pop(key).nbytes
+
+
+def clear():
+    invalidate()
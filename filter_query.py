@@ -0,0 +1,658 @@
+# filter_query.py
+"""
+Query language of the Filter tab.
+
+    fatal level:E NOT tag:ActivityManager time:24h
+    ("see you" OR body:dinner) AND number:5550100
+    regex:"pid=\\d+" after:"2024-05-01 12:00" before:2024-05-02
+
+A query is a boolean expression of terms. Terms next to each other must
+all match (AND); OR, NOT (or a leading "-") and parentheses combine them.
+The operators are only recognised in upper case. A term is either a word or
+"quoted phrase", matched case-insensitively anywhere in the entry like the
+Keyword box, or field:value:
+
+    severity:, subtype:, category:  the Filter tab / logcat category patterns
+    level:, tag:, pid:              fields of a logcat line
+    number:, address:, body:, ...   columns of a call log or SMS row
+    regex:                          a case-insensitive regular expression
+    time:, after:, before:          "24h", "30m", "7d", "Past 1 Hour";
+                                    "YYYY-MM-DD[ HH:MM[:SS]]"
+
+parse() builds a tree of predicates. plan() orders every AND and OR by the
+cost of its operands: substring checks first, then field and regex
+matches, and timestamp parsing last, so the expensive checks only run on
+entries the cheap ones let through. The plan also reports the words every
+match must contain and the start of the time window, which the filter uses
+to read only candidate entries through the token and timestamp indexes.
+
+Every reader dates entries the same way, so a query returns the same
+matches whichever index answers it. A row is dated by its date column and
+a logcat line by its `-v time` prefix. A line without one (a continuation
+line, a "--------- beginning of" marker) takes the date of the closest line
+before it that has one. An entry left without a date (a row without a date
+column, lines before the first prefixed line) is outside every time window.
+"""
+import re
+from datetime import datetime, timedelta
+from classifier import severity_classifier, subtype_classifier, logcat_classifier
+from config import CONTENT_QUERY_PROJECTIONS, TIME_RANGE_HOURS
+from content_rows import parse_row_fields
+from timestamps import LineDecoder, decode_date_field, has_logcat_prefix, to_ms, from_ms
+import instrumentation
+
+# Relative cost of evaluating one predicate on one entry
+COST_LITERAL = 1
+COST_LOGCAT_FIELD = 3
+COST_PATTERN = 4
+COST_CONTENT_FIELD = 5
+COST_TIME = 10
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed."""
+
+# -------------------------------------------------------------------
+# Per-entry values shared by the predicates of one plan
+# -------------------------------------------------------------------
+_LOGCAT_PREFIX_RE = re.compile(r'\d\d-\d\d \d\d:\d\d:\d\d\.\d{3} ([VDIWEFAS])/([^(]*?)\(\s*(\d+)\)')
+
+
+class EntryContext:
+    """
+    Derives values from the entry being tested (lowercase text, timestamp, fields),
+    computing each at most once per entry however many predicates use it. columns,
+    the projection of the rows (default: every call log and SMS column), are the
+    only names that start a field, so ", word=" inside an SMS body stays in the body.
+    Lines of a logcat file (logcat) are dated by their prefix only, as the indexes
+    date them; lines of other files by the first timestamp found in them. A line
+    without a date takes that of the closest line before it that has one, which
+    follow() tracks as the entries are read.
+    """
+
+    def __init__(self, content_rows, now, columns=None, logcat=False):
+        self.content_rows = content_rows
+        self.now = now
+        self.columns = set(columns) if columns is not None else _CONTENT_COLUMNS
+        decoder = LineDecoder(now)
+        self.own_timestamp = (decode_date_field if content_rows else
+                              decoder.clock.decode if logcat else decoder.decode)
+        # passes_date(line): true if line dates the undated lines after it (it has a date, or a logcat prefix)
+        self.passes_date = has_logcat_prefix if logcat else self._has_own_date
+        # (line the next undated line takes its date from, or None; that date once known)
+        self._carried = (None, None)
+        self._lower = (None, None)
+        self._timestamp = (None, None)
+        self._logcat = (None, None)
+        self._fields = (None, None)
+
+    def lower(self, line):
+        entry, value = self._lower
+        if entry is not line:
+            value = line.lower()
+            self._lower = (line, value)
+        return value
+
+    def timestamp(self, line):
+        """Epoch ms of the entry, or None."""
+        entry, value = self._timestamp
+        if entry is not line:
+            # A row is dated by its date column, never by dates quoted in a message body
+            value = self.own_timestamp(line)
+            if value is None and not self.content_rows and not self.passes_date(line):
+                value = self.carried()
+            self._timestamp = (line, value)
+        return value
+
+    def _has_own_date(self, line):
+        return self.own_timestamp(line) is not None
+
+    def follow(self, line):
+        """Notes that line, read in file order and passing passes_date(), dates the undated lines after it."""
+        # Decoded only if an undated line needs it
+        self._carried = (line, None)
+
+    def carry(self, ts):
+        """Sets the date the next undated line takes, when it is already known."""
+        self._carried = (None, ts)
+
+    def carried(self):
+        line, value = self._carried
+        if line is not None:
+            value = self.own_timestamp(line)
+            self._carried = (None, value)
+        return value
+
+    def logcat(self, line):
+        """(level, tag, pid) of a logcat line, or None."""
+        entry, value = self._logcat
+        if entry is not line:
+            match = _LOGCAT_PREFIX_RE.match(line)
+            value = (match.group(1), match.group(2).strip().lower(), match.group(3)) if match else None
+            self._logcat = (line, value)
+        return value
+
+    def fields(self, line):
+        """The fields of a `content query` row."""
+        entry, value = self._fields
+        if entry is not line:
+            header_end = line.find(" ", len("Row: "))
+            value = parse_row_fields(line, header_end + 1, self.columns)[0] if header_end >= 0 else {}
+            self._fields = (line, value)
+        return value
+
+# -------------------------------------------------------------------
+# Predicates
+# -------------------------------------------------------------------
+class Literal:
+    """Case-insensitive substring."""
+
+    cost = COST_LITERAL
+
+    def __init__(self, text):
+        self.text = text
+
+    def compile(self, ctx):
+        needle = self.text.lower()
+        lower = ctx.lower
+        return lambda line: needle in lower(line)
+
+    def __repr__(self):
+        return f"{self.text!r}"
+
+
+class Pattern:
+    """A named pattern of a classifier (severity, subtype) or a user regex."""
+
+    cost = COST_PATTERN
+
+    def __init__(self, label, search):
+        self.label = label
+        self.search = search
+
+    def compile(self, ctx):
+        search = self.search
+        if instrumentation.enabled:
+            def counted_search(line):
+                instrumentation.count("regex.filter_lines")
+                return search(line) is not None
+            return counted_search
+        return lambda line: search(line) is not None
+
+    def __repr__(self):
+        return self.label
+
+
+class Category:
+    """Logcat entries whose first matching LOG_TYPES category is name, as on the category tabs."""
+
+    cost = COST_PATTERN
+
+    def __init__(self, name):
+        self.name = name
+
+    def compile(self, ctx):
+        name = self.name
+        return lambda line: logcat_classifier.classify(line) == name
+
+    def __repr__(self):
+        return f"category:{self.name}"
+
+
+class LogcatField:
+    """level, tag or pid of a logcat line, compared exactly (the tag case-insensitively)."""
+
+    cost = COST_LOGCAT_FIELD
+    _POSITIONS = {"level": 0, "tag": 1, "pid": 2}
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value.upper() if field == "level" else value.strip().lower()
+
+    def compile(self, ctx):
+        position = self._POSITIONS[self.field]
+        value = self.value
+        parsed = ctx.logcat
+
+        def test(line):
+            entry = parsed(line)
+            return entry is not None and entry[position] == value
+        return test
+
+    def __repr__(self):
+        return f"{self.field}:{self.value}"
+
+
+class ContentField:
+    """
+    A column of a call log or SMS row: equal to a number, or containing the text
+    (case-insensitive). Several names are alternatives, e.g. number and address.
+    """
+
+    cost = COST_CONTENT_FIELD
+
+    def __init__(self, names, value):
+        self.names = names
+        self.value = value
+
+    def compile(self, ctx):
+        names = self.names
+        needle = self.value.lower()
+        numeric = self.value.isdigit()
+        fields = ctx.fields
+
+        def test(line):
+            row = fields(line)
+            for name in names:
+                value = row.get(name)
+                if value is None:
+                    continue
+                if numeric and value.isdigit():
+                    if value == needle:
+                        return True
+                elif needle in value.lower():
+                    return True
+            return False
+        return test
+
+    def __repr__(self):
+        return f"{self.names[0]}:{self.value}"
+
+
+class TimeWindow:
+    """
+    Entries at or after start and before end (epoch ms; either may be None).
+    Entries without a timestamp are outside it. relative marks a window computed
+    back from the current time, which moves on every run.
+    """
+
+    cost = COST_TIME
+
+    def __init__(self, start=None, end=None, relative=False):
+        self.start = start
+        self.end = end
+        self.relative = relative
+
+    def compile(self, ctx):
+        start, end = self.start, self.end
+        timestamp = ctx.timestamp
+
+        def test(line):
+            ts = timestamp(line)
+            return ts is not None and (start is None or ts >= start) and (end is None or ts < end)
+        return test
+
+    def __repr__(self):
+        bounds = [f"{from_ms(ms):%Y-%m-%d %H:%M:%S}" if ms is not None else "" for ms in (self.start, self.end)]
+        return f"time[{bounds[0]}..{bounds[1]})"
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    @property
+    def cost(self):
+        return sum(child.cost for child in self.children)
+
+    def compile(self, ctx):
+        tests = [child.compile(ctx) for child in self.children]
+        if len(tests) == 1:
+            return tests[0]
+
+        def test(line):
+            for child in tests:
+                if not child(line):
+                    return False
+            return True
+        return test
+
+    def __repr__(self):
+        return "(" + " AND ".join(repr(child) for child in self.children) + ")"
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+    @property
+    def cost(self):
+        return sum(child.cost for child in self.children)
+
+    def compile(self, ctx):
+        tests = [child.compile(ctx) for child in self.children]
+        if len(tests) == 1:
+            return tests[0]
+
+        def test(line):
+            for child in tests:
+                if child(line):
+                    return True
+            return False
+        return test
+
+    def __repr__(self):
+        return "(" + " OR ".join(repr(child) for child in self.children) + ")"
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    @property
+    def cost(self):
+        return self.child.cost
+
+    def compile(self, ctx):
+        test = self.child.compile(ctx)
+        return lambda line: not test(line)
+
+    def __repr__(self):
+        return f"NOT {self.child!r}"
+
+# -------------------------------------------------------------------
+# Terms
+# -------------------------------------------------------------------
+_CONTENT_COLUMNS = {column for columns in CONTENT_QUERY_PROJECTIONS.values() for column in columns}
+# The call log calls the other party "number", the SMS provider "address"
+_FIELD_ALIASES = {"number": ("number", "address"), "address": ("address", "number")}
+_LEVEL_NAMES = {"v": "V", "verbose": "V", "d": "D", "debug": "D", "i": "I", "info": "I",
+                "w": "W", "warning": "W", "warn": "W", "e": "E", "error": "E", "f": "F", "fatal": "F",
+                "a": "A", "assert": "A", "s": "S", "silent": "S"}
+_DURATION_RE = re.compile(r'^(\d+)\s*([mhdw])$')
+_DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+
+
+def _named(classifier, kind, value):
+    for name in classifier.names:
+        if name.lower() == value.lower():
+            return Pattern(f"{kind}:{name}", classifier.matcher(name))
+    raise QueryError(f"Unknown {kind} {value!r}; expected one of {', '.join(classifier.names)}")
+
+
+def _parse_since(value, now):
+    hours = {name.lower(): hours for name, hours in TIME_RANGE_HOURS.items()}.get(value.lower())
+    if hours is not None:
+        return now - timedelta(hours=hours)
+    match = _DURATION_RE.match(value.strip().lower())
+    if match is None:
+        raise QueryError(f"Bad time range {value!r}; use e.g. 30m, 24h, 7d or \"Past 24 Hours\"")
+    return now - timedelta(seconds=int(match.group(1)) * _DURATION_UNITS[match.group(2)])
+
+
+def _parse_date(value):
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format)
+        except ValueError:
+            continue
+    raise QueryError(f"Bad date {value!r}; use YYYY-MM-DD, optionally followed by HH:MM[:SS]")
+
+
+def make_term(field, value, now=None):
+    """Builds the predicate of one field:value term (field None for a plain word or phrase)."""
+    now = now or datetime.now()
+    if field is None:
+        return Literal(value)
+    field = field.lower()
+    if field == "severity":
+        return _named(severity_classifier, "severity", value)
+    if field == "subtype":
+        return _named(subtype_classifier, "subtype", value)
+    if field == "category":
+        for name in logcat_classifier.names:
+            if name.lower() == value.lower():
+                return Category(name)
+        raise QueryError(f"Unknown category {value!r}; expected one of {', '.join(logcat_classifier.names)}")
+    if field == "regex":
+        try:
+            return Pattern(f"regex:{value}", re.compile(value, re.IGNORECASE).search)
+        except re.error as e:
+            raise QueryError(f"Bad regex {value!r}: {e}")
+    if field == "level":
+        level = _LEVEL_NAMES.get(value.lower())
+        if level is None:
+            raise QueryError(f"Unknown level {value!r}; expected V, D, I, W, E, F or A")
+        return LogcatField("level", level)
+    if field in ("tag", "pid"):
+        return LogcatField(field, value)
+    if field == "time":
+        if value.lower() in ("all", "all time"):
+            return None
+        return TimeWindow(start=to_ms(_parse_since(value, now)), relative=True)
+    if field == "after":
+        return TimeWindow(start=to_ms(_parse_date(value)))
+    if field == "before":
+        return TimeWindow(end=to_ms(_parse_date(value)))
+    if field in _FIELD_ALIASES:
+        return ContentField(_FIELD_ALIASES[field], value)
+    if field in _CONTENT_COLUMNS:
+        return ContentField((field,), value)
+    raise QueryError(f"Unknown field {field!r}")
+
+# -------------------------------------------------------------------
+# Parser
+# -------------------------------------------------------------------
+_KNOWN_FIELDS = ({"severity", "subtype", "category", "regex", "level", "tag", "pid", "time", "after", "before"}
+                 | set(_FIELD_ALIASES) | _CONTENT_COLUMNS)
+_TOKEN_RE = re.compile(r'\s*(?:(?P<paren>[()])|(?P<negate>-)(?=\()|(?P<neg>-)?(?:(?P<field>[A-Za-z_]+):)?'
+                       r'(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<bare>[^\s()"]+)))')
+# Inside quotes only \" and \\ are escapes, so regex:"\d+" keeps its backslash
+_UNESCAPE_RE = re.compile(r'\\(["\\])')
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+def _tokenize(text):
+    """Yields ("(" | ")" | "AND" | "OR" | "NOT", None, None) and ("TERM", field, value) tokens."""
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise QueryError(f"Cannot parse the query at {text[position:].strip()!r} (unbalanced quote?)")
+        position = match.end()
+        if match.group("paren"):
+            yield match.group("paren"), None, None
+            continue
+        if match.group("negate"):
+            yield "NOT", None, None
+            continue
+        field = match.group("field")
+        quoted = match.group("quoted")
+        value = _UNESCAPE_RE.sub(r'\1', quoted) if quoted is not None else match.group("bare")
+        if field is not None and field.lower() not in _KNOWN_FIELDS:
+            # "http://..." or "Tag:" are words that happen to contain a colon
+            value = f"{field}:{value}"
+            field = None
+        if match.group("neg"):
+            yield "NOT", None, None
+        if field is None and quoted is None and value in _OPERATORS:
+            yield value, None, None
+        else:
+            yield "TERM", field, value
+
+
+class _Parser:
+    def __init__(self, text, now):
+        self.tokens = list(_tokenize(text))
+        self.position = 0
+        self.now = now
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected {self.peek()!r} in the query")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return _combine(Or, children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_not())
+        return _combine(And, children)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.take()
+            child = self.parse_not()
+            return None if child is None else Not(child)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind = self.peek()
+        if kind is None:
+            raise QueryError("The query ends where a term was expected")
+        if kind == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("Missing ')' in the query")
+            self.take()
+            return node
+        if kind != "TERM":
+            raise QueryError(f"Unexpected {kind!r} in the query")
+        _, field, value = self.take()
+        return make_term(field, value, self.now)
+
+
+def _combine(kind, children):
+    """Builds an And/Or of the children, dropping empty ones (e.g. time:all) and flattening nesting."""
+    flat = []
+    for child in children:
+        if child is None:
+            continue
+        flat.extend(child.children if isinstance(child, kind) else [child])
+    if not flat:
+        return None
+    return flat[0] if len(flat) == 1 else kind(flat)
+
+
+def parse(text, now=None):
+    """Parses a query into a predicate tree. Returns None for an empty query."""
+    if not text or not text.strip():
+        return None
+    return _Parser(text, now or datetime.now()).parse()
+
+
+def from_controls(keyword=None, time_range=None, severity=None, subtype=None, query=None, now=None):
+    """The predicate tree of the Filter tab: its fixed controls AND-ed with the query, or None."""
+    now = now or datetime.now()
+    terms = []
+    if keyword and keyword.strip():
+        terms.append(Literal(keyword))
+    if severity and severity != "All":
+        terms.append(Pattern(f"severity:{severity}", severity_classifier.matcher(severity)))
+    if subtype and subtype != "All":
+        terms.append(Pattern(f"subtype:{subtype}", subtype_classifier.matcher(subtype)))
+    if time_range in TIME_RANGE_HOURS:
+        terms.append(TimeWindow(start=to_ms(now - timedelta(hours=TIME_RANGE_HOURS[time_range])), relative=True))
+    terms.append(parse(query, now))
+    return _combine(And, terms)
+
+# -------------------------------------------------------------------
+# Planning
+# -------------------------------------------------------------------
+def _ordered(node):
+    """Returns the tree with the operands of every AND and OR sorted cheapest first."""
+    if isinstance(node, (And, Or)):
+        return type(node)(sorted((_ordered(child) for child in node.children), key=lambda child: child.cost))
+    if isinstance(node, Not):
+        return Not(_ordered(node.child))
+    return node
+
+
+def _walk(node):
+    yield node
+    if isinstance(node, (And, Or)):
+        for child in node.children:
+            yield from _walk(child)
+    elif isinstance(node, Not):
+        yield from _walk(node.child)
+
+
+class Plan:
+    """
+    An ordered predicate tree and what it guarantees about every match:
+    literals holds texts each match contains, since_ms the earliest timestamp
+    a timestamped match can have (None when unbounded). relative is True when
+    the tree has time windows relative to now; narrows_over_time when all of
+    them are required lower bounds, so a later run of the same filter can only
+    drop matches older than its since_ms.
+    """
+
+    def __init__(self, node):
+        self.node = _ordered(node) if node is not None else None
+        self.required = self.node.children if isinstance(self.node, And) else [self.node] if self.node else []
+        self.literals = [child.text for child in self.required if isinstance(child, Literal)]
+        starts = [child.start for child in self.required if isinstance(child, TimeWindow) and child.start is not None]
+        self.since_ms = max(starts) if starts else None
+        all_windows = [n for n in _walk(self.node) if isinstance(n, TimeWindow)] if self.node else []
+        windows = [window for window in all_windows if window.relative]
+        # Entries must be dated in file order, so lines without a date take the previous one's
+        self.timed = bool(all_windows)
+        self.relative = bool(windows)
+        self.narrows_over_time = all(any(window is child for child in self.required) for window in windows)
+
+    def compile(self, content_rows=False, now=None, since_applied=False, columns=None, ctx=None):
+        """
+        Returns test(entry) -> bool for entries of a logcat (or, with content_rows, a call/SMS)
+        file whose rows have the given columns. since_applied means the entries were already
+        read from since_ms on by their record timestamps, so the open-ended time windows need
+        not be checked again. ctx, if given, is the EntryContext the test reads entries through.
+        """
+        node = self.node
+        if since_applied:
+            node = _combine(And, [child for child in self.required
+                                  if not (isinstance(child, TimeWindow) and child.end is None)])
+        if node is None:
+            return lambda line: True
+        return node.compile(ctx or EntryContext(content_rows, now or datetime.now(), columns))
+
+    def select(self, entries, ctx, since_applied=False):
+        """
+        Yields the (offset, length, text, ts) of the entries matching the plan, in file order.
+        entries are (offset, length, text) in file order, or (offset, length, text, ts) when the
+        reader already knows the entry's date (an index), ts being None if it has none. The
+        ts yielded is the match's date when the plan has time windows, else None.
+        """
+        test = self.compile(since_applied=since_applied, ctx=ctx)
+        if not self.timed:
+            for entry in entries:
+                if test(entry[2]):
+                    yield entry[0], entry[1], entry[2], None
+            return
+        timestamp = ctx.timestamp
+        # Rows are never dated by the row before them
+        passes_date = ctx.passes_date if not ctx.content_rows else None
+        for entry in entries:
+            text = entry[2]
+            if len(entry) > 3:
+                ctx.carry(entry[3])
+            if test(text):
+                yield entry[0], entry[1], text, timestamp(text)
+            if passes_date is not None and passes_date(text):
+                ctx.follow(text)
+
+    def __repr__(self):
+        return repr(self.node) if self.node is not None else "(everything)"
+
+
+def plan(node):
+    return Plan(node)
@@ -1,168 +1,288 @@
-import tkinter as tk  # <-- Added so we can reference tk.END, tk.* etc.
-import re
-from datetime import datetime, timedelta
+from array import array
+from datetime import datetime
 import os
-from tkinter import messagebox
+import record_store
+import timestamp_index
+import token_index
+import filter_query
+import filter_cache
+import sharded_scan
+from content_rows import iter_rows, ROW_PREFIX
+import evidence
+import instrumentation
+from config import CONTENT_QUERY_PROJECTIONS, FILTER_CANCEL_CHECK_ENTRIES
 
-def filter_logs(input_file, keyword=None, time_range=None, severity=None, subtype=None, output_file="logs/filtered_logs.txt"):
+_NO_TIMESTAMP = -(2 ** 63)
+
+# -------------------------------------------------------------------
+# Readers and the filter pipeline: entries stream one at a time, so a
+# filter runs with constant memory.
+# -------------------------------------------------------------------
+def read_lines(input_file, located=False):
+    """
+    Yields lines from input_file (or its evidence container) one at a time
+    (with located, as (offset, length, text)).
+    """
+    if not located:
+        with evidence.open_log_text(input_file) as f:
+            for line in f:
+                yield line
+        return
+    with evidence.open_log(input_file) as f:
+        offset = 0
+        for raw in f:
+            yield offset, len(raw), raw.decode("utf-8", "replace")
+            offset += len(raw)
+
+def read_content_records(input_file, located=False):
+    """
+    Yields each `content query` row of input_file as one record, continuation lines
+    included (with located, as (offset, length, text)).
+    """
+    with evidence.open_log(input_file) as f:
+        for row in iter_rows(f):
+            yield (row.offset, row.length, row.text) if located else row.text
+
+def plan_filter(keyword=None, time_range=None, severity=None, subtype=None, query=None, now=None):
+    """Compiles the Filter tab controls and the query into one planned predicate (see filter_query)."""
+    return filter_query.plan(filter_query.from_controls(keyword, time_range, severity, subtype, query, now))
+
+def iter_filtered_logs(input_file, keyword=None, time_range=None, severity=None, subtype=None, query=None):
+    """Returns a generator over the entries of input_file matching the Filter tab controls and the query."""
+    now = datetime.now()
+    criteria = dict(keyword=keyword, time_range=time_range, severity=severity, subtype=subtype, query=query)
+    plan = plan_filter(now=now, **criteria)
+    return (text for _, _, text, _ in iter_filtered_records(input_file, plan, now, criteria))
+
+def iter_filtered_records(input_file, plan, now=None, criteria=None, should_continue=None):
+    """
+    Returns a generator over the (offset, length, text, ts) of the entries of input_file
+    matching plan, in file order; ts is the entry's date when the plan has time windows
+    (see filter_query for how lines without one are dated). criteria, the plan_filter() arguments the plan was
+    built from, lets a full scan of a large file run in several processes (see sharded_scan).
+    The scan stops early once should_continue() returns False, checked every
+    FILTER_CANCEL_CHECK_ENTRIES entries read (or range scanned), matching or not.
+    """
+    now = now or datetime.now()
+    source = record_store.source_for_path(input_file)
+    content_rows = source in ("calls", "sms")
+    ctx = filter_query.EntryContext(content_rows, now, CONTENT_QUERY_PROJECTIONS.get(source), source == "logcat")
+    since_ms = plan.since_ms
+    entries = None
+    if source and plan.literals:
+        # The token index narrows the file to the entries holding every word of the
+        # required literals; the predicate still checks each of them in full
+        entries = token_index.search(input_file, plan.literals, since_ms, located=True)
+    if entries is not None:
+        pass
+    elif source == "logcat" and since_ms is not None:
+        # Seek straight to the time window through the sidecar timestamp index (or,
+        # for an archived case, decompress only the container chunks in the window);
+        # the predicate then drops the few lines before the window starts. Lines
+        # skipped this way, and undated lines read before the first dated one, are
+        # dated before since_ms, so they could not match anyway.
+        if os.path.exists(input_file):
+            start = timestamp_index.seek_offset(input_file, since_ms)
+            if criteria is not None and sharded_scan.should_shard(input_file, start):
+                return _iter_sharded(input_file, start, False, criteria, now, should_continue)
+            entries = timestamp_index.iter_lines_since(input_file, since_ms, located=True)
+        else:
+            entries = evidence.iter_lines_since(evidence.container_path(source), since_ms, located=True)
+    elif content_rows and since_ms is not None:
+        # Acquired files are parsed once into the record store, so the time
+        # window is answered from it and older records are never read.
+        entries = record_store.iter_record_text(source, since_ms, located=True)
+    elif criteria is not None and sharded_scan.should_shard(input_file):
+        return _iter_sharded(input_file, 0, content_rows, criteria, now, should_continue)
+    else:
+        # Call and SMS dumps are filtered per row, since message bodies span several lines
+        entries = read_content_records(input_file, True) if content_rows else read_lines(input_file, True)
+    # Entries read count towards the "filter" timer's throughput
+    entries = instrumentation.counted(entries, "filter")
+    if should_continue is not None:
+        entries = _until_cancelled(entries, should_continue)
+    # Rows read by their record-store timestamps need no second time check
+    return plan.select(entries, ctx, since_applied=content_rows and since_ms is not None)
+
+def _until_cancelled(entries, should_continue):
+    """Yields entries until should_continue() returns False, checked every FILTER_CANCEL_CHECK_ENTRIES entries."""
+    countdown = FILTER_CANCEL_CHECK_ENTRIES
+    for entry in entries:
+        countdown -= 1
+        if not countdown:
+            if not should_continue():
+                return
+            countdown = FILTER_CANCEL_CHECK_ENTRIES
+        yield entry
+
+def _timestamp_before(mm, offset, ctx):
+    """The date undated lines at offset take from the lines before it (see filter_query), or None."""
+    end = offset
+    while end > 0:
+        start = mm.rfind(b"\n", 0, end - 1) + 1
+        text = mm[start:end].decode("utf-8", "replace")
+        if ctx.passes_date(text):
+            return ctx.own_timestamp(text)
+        end = start
+    return None
+
+def _filter_range(path, start, end, content_rows, criteria, now):
+    """
+    Sharded scan worker: the (offset, length) pairs of the matches in path[start:end], their
+    dates (None unless the plan has time windows) and the number of entries read.
+    """
+    source = record_store.source_for_path(path)
+    plan = plan_filter(now=now, **criteria)
+    ctx = filter_query.EntryContext(content_rows, now, CONTENT_QUERY_PROJECTIONS.get(source), source == "logcat")
+    spans = array("q")
+    timestamps = array("q") if plan.timed else None
+    scanned = [0]
+    with sharded_scan.mapped(path) as mm:
+        lines = sharded_scan.iter_lines(mm, start, end)
+        if content_rows:
+            entries = ((start + row.offset, row.length, row.text) for row in iter_rows(lines))
+        else:
+            if plan.timed:
+                # The range may start on lines that take their date from the range before it
+                ctx.carry(_timestamp_before(mm, start, ctx))
+            entries = _located_lines(lines, start)
+        for offset, length, _, ts in plan.select(_counting(entries, scanned), ctx):
+            spans.extend((offset, length))
+            if timestamps is not None:
+                timestamps.append(_NO_TIMESTAMP if ts is None else ts)
+    return spans, timestamps, scanned[0]
+
+def _located_lines(lines, offset):
+    """Yields (offset, length, text) for raw lines read from offset on."""
+    for raw in lines:
+        yield offset, len(raw), raw.decode("utf-8", "replace")
+        offset += len(raw)
+
+def _counting(entries, counter):
+    for entry in entries:
+        counter[0] += 1
+        yield entry
+
+def _iter_sharded(input_file, start, content_rows, criteria, now, should_continue=None):
+    """Yields the (offset, length, text, ts) of the matches of a sharded scan of input_file[start:], in file order."""
+    results = sharded_scan.map_ranges(input_file, _filter_range, (content_rows, criteria, now), start,
+                                      ROW_PREFIX if content_rows else None)
     try:
-        # Check if the input file exists; if not, create an empty one to avoid errors.
-        if not os.path.exists(input_file):
+        with sharded_scan.mapped(input_file) as mm:
+            for spans, timestamps, scanned in results:
+                instrumentation.add_lines("filter", scanned)
+                if should_continue is not None and not should_continue():
+                    return
+                for i in range(0, len(spans), 2):
+                    offset, length = spans[i], spans[i + 1]
+                    ts = timestamps[i // 2] if timestamps is not None else _NO_TIMESTAMP
+                    yield (offset, length, mm[offset:offset + length].decode("utf-8", "replace"),
+                           None if ts == _NO_TIMESTAMP else ts)
+    finally:
+        # A filter stopped early cancels the ranges still waiting for a worker
+        results.close()
+
+def filter_logs(input_file, keyword=None, time_range=None, severity=None, subtype=None, query=None,
+                output_file="logs/filtered_logs.txt", on_batch=None, batch_size=500, should_continue=None,
+                use_cache=True):
+    """
+    Streams the matching lines of input_file into output_file and returns the match count.
+    query is an expression in the filter_query language, combined with the other controls.
+    If on_batch is given it is called with (first_index, lines) for every batch_size matches,
+    so callers can show results before the scan finishes. The scan stops early once
+    should_continue() returns False (e.g. when a newer filter supersedes this one).
+    A filter already run on the same input is answered from filter_cache without a scan.
+    """
+    try:
+        # Check if the input file (or its container) exists; if not, create an empty one to avoid errors.
+        if not evidence.log_exists(input_file):
             with open(input_file, "w", encoding="utf-8") as f_temp:
                 f_temp.write("")
-        with open(input_file, "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-        now = datetime.now()
-        filtered_lines = []
-        
-        severity_patterns = {
-            "Error": r'E/|ERROR|Exception|FATAL',
-            "Warning": r'W/|WARN|WARNING',
-            "Info": r'I/|INFO',
-            "Debug": r'D/|DEBUG',
-            "Verbose": r'V/|VERBOSE'
-        }
-        
-        subtype_patterns = {
-            "Activity": r'Activity|startActivity',
-            "Fragment": r'Fragment',
-            "View": r'View|Inflate',
-            "Lifecycle": r'onCreate|onStart|onResume|onPause|onStop|onDestroy',
-            
-            "Boot": r'boot|start up|startup|starting',
-            "Memory": r'memory|heap|ram',
-            "CPU": r'cpu|processor',
-            "Battery": r'battery|power',
-            
-            "NullPointer": r'NullPointerException',
-            "OutOfMemory": r'OutOfMemoryError',
-            "IllegalState": r'IllegalStateException',
-            "ANR": r'ANR|Not Responding',
-            
-            "WiFi": r'wifi|wlan',
-            "Mobile": r'mobile|cellular|data connection',
-            "HTTP": r'http|https|URL',
-            "Socket": r'socket|tcp|udp',
-            
-            "Dalvik GC": r'dalvikvm.*GC',
-            "ART GC": r'art.*GC',
-            "Explicit GC": r'Explicit GC',
-            "Concurrent GC": r'Concurrent GC',
-            
-            "System": r'android\.intent\.action|system broadcast',
-            "App": r'com\.',
-            "Sticky": r'sticky|registerReceiver',
-            "Ordered": r'ordered broadcast',
-            
-            "Start": r'startService',
-            "Stop": r'stopService',
-            "Bind": r'bindService|onBind',
-            "Unbind": r'unbindService|onUnbind',
-            
-            "Power": r'power|PowerManager|wake|sleep',
-            "Sensor": r'sensor|Sensor',
-            "Camera": r'camera|Camera',
-            "Location": r'location|LocationManager|GPS'
-        }
-        
-        for line in lines:
-            include = True
-            
-            # Apply time filter
-            if time_range and time_range != "All Time":
-                date_match = re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', line)
-                unix_match = re.search(r'date=(\d+)', line)
-                logcat_match = re.search(r'(\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                
-                has_timestamp = False
-                if date_match:
-                    try:
-                        ts = datetime.strptime(date_match.group(), "%Y-%m-%d %H:%M:%S")
-                        has_timestamp = True
-                    except:
-                        pass
-                elif unix_match:
-                    try:
-                        ts = datetime.fromtimestamp(int(unix_match.group(1)) / 1000)
-                        has_timestamp = True
-                    except:
-                        pass
-                elif logcat_match:
-                    try:
-                        today = datetime.now()
-                        date_str = f"{today.year}-{logcat_match.group(1)}"
-                        ts = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                        if ts > today:
-                            ts = ts.replace(year=today.year - 1)
-                        has_timestamp = True
-                    except:
-                        pass
-                
-                if has_timestamp:
-                    if time_range == "Past 1 Hour" and (now - ts) > timedelta(hours=1):
-                        include = False
-                    elif time_range == "Past 24 Hours" and (now - ts) > timedelta(hours=24):
-                        include = False
-                    elif time_range == "Past 7 Days" and (now - ts) > timedelta(days=7):
-                        include = False
-            
-            # Apply keyword filter
-            if include and keyword and keyword.strip():
-                if keyword.lower() not in line.lower():
-                    include = False
-            
-            # Apply severity filter
-            if include and severity and severity != "All":
-                if not re.search(severity_patterns.get(severity, ""), line, re.IGNORECASE):
-                    include = False
-            
-            # Apply subtype filter
-            if include and subtype and subtype != "All":
-                if not re.search(subtype_patterns.get(subtype, ""), line, re.IGNORECASE):
-                    include = False
-            
-            if include:
-                filtered_lines.append(line)
         
         # Ensure the output directory exists
         output_dir = os.path.dirname(output_file)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.writelines(filtered_lines)
+        now = datetime.now()
+        criteria = dict(keyword=keyword, time_range=time_range, severity=severity, subtype=subtype, query=query)
+        plan = plan_filter(now=now, **criteria)
+        key = filter_cache.make_key(input_file, plan, keyword, time_range, severity, subtype, query) if use_cache else None
+        cached = filter_cache.get(key, plan.since_ms if plan.relative else None)
+        if cached is not None and cached.written_to(output_file):
+            # The output file still holds this result; there is nothing to read or write
+            return cached.count
+
+        builder = None
+        if cached is not None:
+            records = ((None, None, text, None) for text in filter_cache.iter_records(input_file, cached))
+        else:
+            records = iter_filtered_records(input_file, plan, now, criteria, should_continue)
+            if key is not None:
+                builder = filter_cache.ResultBuilder(keep_timestamps=plan.relative)
+
+        count = 0
+        batch = []
+        completed = True
+        with open(output_file, "w", encoding="utf-8") as out, instrumentation.timed("filter"):
+            for offset, length, line, ts in records:
+                out.write(line)
+                count += 1
+                if builder is not None:
+                    builder.add(offset, length, ts)
+                if on_batch:
+                    batch.append(line)
+                    if len(batch) >= batch_size:
+                        on_batch(count - len(batch), batch)
+                        batch = []
+                if should_continue and not should_continue():
+                    completed = False
+                    break
+        # The scan itself may have stopped early, between matches
+        if should_continue and not should_continue():
+            completed = False
+        if on_batch and batch:
+            on_batch(count - len(batch), batch)
+
+        # Only a complete run is cached, and remembered as the output file's content
+        if completed and builder is not None and builder.valid:
+            cached = builder.finish(plan.since_ms)
+            filter_cache.put(key, cached)
+        if completed and cached is not None:
+            cached.mark_written(output_file)
         
-        return len(filtered_lines)
+        return count
     
     except Exception as e:
         print(f"Error filtering logs: {e}")
         raise
 
+def append_filtered_batch(filter_output_widget, first_index, lines):
+    """Appends one batch of numbered matches to the filter viewer while a filter is still running."""
+    filter_output_widget.append_text("".join(f"{first_index + i + 1}: {line}" for i, line in enumerate(lines)))
+
+def show_filter_summary(filter_output_widget, count, output_file="logs/filtered_logs.txt"):
+    """
+    Switches the filter viewer from the streamed batches to the finished output file
+    (served from disk, not held in memory) and appends the summary line.
+    """
+    if count:
+        filter_output_widget.load_file(output_file, on_loaded=lambda: filter_output_widget.append_text(
+            f"\n\n✅ Found {count} matching log entries.\n"))
+    else:
+        filter_output_widget.show_text("No logs match the selected filters.\n")
+
 def load_filtered_logs(filter_output_widget):
     try:
-        # We reference tk here
-        filter_output_widget.delete(1.0, tk.END)
-        
         # Check if the filtered log file exists; if not, notify the user gracefully.
-        if not os.path.exists("logs/filtered_logs.txt"):
-            filter_output_widget.insert(tk.END, "No logs match the selected filters.\n")
+        if not os.path.exists("logs/filtered_logs.txt") or os.path.getsize("logs/filtered_logs.txt") == 0:
+            filter_output_widget.show_text("No logs match the selected filters.\n")
             return
         
-        with open("logs/filtered_logs.txt", "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-            
-        if not lines:
-            filter_output_widget.insert(tk.END, "No logs match the selected filters.\n")
-            return
-        
-        # Show lines
-        for i, line in enumerate(lines):
-            filter_output_widget.insert(tk.END, f"{i+1}: {line}")
-        
-        filter_output_widget.insert(tk.END, f"\n\n✅ Found {len(lines)} matching log entries.\n")
+        filter_output_widget.load_file("logs/filtered_logs.txt", on_loaded=lambda: filter_output_widget.append_text(
+            f"\n\n✅ Found {filter_output_widget.line_count} matching log entries.\n"))
     except Exception as e:
-        filter_output_widget.delete(1.0, tk.END)
-        filter_output_widget.insert(tk.END, f"❌ Error loading filtered logs: {str(e)}\n")
+        filter_output_widget.show_text(f"❌ Error loading filtered logs: {str(e)}\n")
 
 def save_filtered_logs():
     from tkinter import filedialog, messagebox
@@ -1,268 +1,265 @@
-import re
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from collections import Counter
 import os
+import numpy as np
 import pandas as pd
 from fpdf import FPDF  # Correct import for FPDF
-from tkinter import messagebox
+import record_store
+import aggregation
+from config import LOG_FILES, GRAPH_BUCKETS, TIME_RANGE_HOURS
+import timestamp_index
+import evidence
+from timestamps import (LineDecoder, from_ms, utc_offset_ms, OFFSET_STEP_MS,
+                        PLAUSIBLE_MIN_MS, PLAUSIBLE_MAX_MS)
 
-def get_timestamps_from_file(filepath):
+def get_timestamps_from_file(filepath, time_range=None):
+    source = record_store.source_for_path(filepath)
+    if source == "logcat" and time_range in TIME_RANGE_HOURS:
+        if not evidence.log_exists(filepath):
+            return None, []
+        # Seek to the window through the sidecar timestamp index instead of scanning the whole dump
+        now = datetime.now()
+        since_ms = record_store.since_ms_for_range(time_range, now)
+        if os.path.exists(filepath):
+            lines = timestamp_index.iter_lines_since(filepath, since_ms)
+        else:
+            lines = evidence.iter_lines_since(evidence.container_path(source), since_ms)
+        decode = LineDecoder(now).decode
+        all_lines = []
+        timestamps = []
+        for line in lines:
+            ts = decode(line)
+            if ts is not None and ts >= since_ms:
+                timestamps.append(from_ms(ts))
+                all_lines.append(line)
+        return all_lines, timestamps
+    if source:
+        if not evidence.log_exists(filepath):
+            return None, []
+        all_lines = []
+        timestamps = []
+        for ts, text in record_store.iter_timestamped_records(source):
+            timestamps.append(from_ms(ts))
+            all_lines.append(text)
+        return all_lines, timestamps
     try:
         with open(filepath, "r", encoding="utf-8", errors="replace") as f:
             lines = f.readlines()
     except FileNotFoundError:
         return None, []
     
+    decode = LineDecoder().decode
     timestamps = []
     all_lines = []
     for line in lines:
-        # Try standard datetime format
-        date_match = re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', line)
-        if date_match:
-            try:
-                ts = datetime.strptime(date_match.group(), "%Y-%m-%d %H:%M:%S")
-                timestamps.append(ts)
-                all_lines.append(line)
-                continue
-            except Exception:
-                pass
-        # Try unix timestamp
-        unix_match = re.search(r'date=(\d+)', line)
-        if unix_match:
-            try:
-                ts = datetime.fromtimestamp(int(unix_match.group(1)) / 1000)
-                timestamps.append(ts)
-                all_lines.append(line)
-            except Exception:
-                pass
-        # Try logcat timestamp format
-        logcat_match = re.search(r'(\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-        if logcat_match:
-            try:
-                today = datetime.now()
-                date_str = f"{today.year}-{logcat_match.group(1)}"
-                ts = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                if ts > today:
-                    ts = ts.replace(year=today.year - 1)
-                timestamps.append(ts)
-                all_lines.append(line)
-            except Exception:
-                pass
+        ts = decode(line)
+        if ts is not None:
+            timestamps.append(from_ms(ts))
+            all_lines.append(line)
     return all_lines, timestamps
 
+# -------------------------------------------------------------------
+# Vectorized time-series helpers: timestamps are sorted int64 epoch-ms arrays
+# -------------------------------------------------------------------
+_timestamp_cache = {}
+
+def get_timestamp_array(source):
+    """Returns the sorted epoch-ms timestamps of a record store source as an int64 array."""
+    path = LOG_FILES[source]
+    signature = evidence.log_signature(path)
+    if signature is None:
+        return np.empty(0, dtype=np.int64)
+    cached = _timestamp_cache.get(source)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    array = np.array(record_store.get_timestamps(source), dtype=np.int64)
+    _timestamp_cache[source] = (signature, array)
+    return array
+
+def clear_timestamp_cache():
+    _timestamp_cache.clear()
+
+def window_since(sorted_ms, since_ms):
+    """Returns the tail of a sorted epoch-ms array at or after since_ms (None keeps everything)."""
+    if since_ms is None:
+        return sorted_ms
+    return sorted_ms[np.searchsorted(sorted_ms, since_ms, side="left"):]
+
+def bucket_counts(timestamps_ms, bucket="Hour"):
+    """
+    Buckets epoch-ms timestamps into local-time bins of the given GRAPH_BUCKETS size, using
+    the UTC offset in effect at each timestamp, so day buckets start at local midnight on
+    both sides of a DST change. Implausible timestamps (e.g. date=0 rows) are skipped.
+    Returns (bucket_start_datetimes, counts) for the non-empty buckets only.
+    """
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    timestamps_ms = timestamps_ms[(timestamps_ms >= PLAUSIBLE_MIN_MS) & (timestamps_ms <= PLAUSIBLE_MAX_MS)]
+    if len(timestamps_ms) == 0:
+        return [], []
+    size = GRAPH_BUCKETS.get(bucket, GRAPH_BUCKETS["Hour"])
+    # One offset lookup per distinct quarter hour, not per timestamp
+    steps, inverse = np.unique(timestamps_ms // OFFSET_STEP_MS, return_inverse=True)
+    offsets = np.array([utc_offset_ms(step * OFFSET_STEP_MS) for step in steps.tolist()], dtype=np.int64)
+    bins = np.floor_divide(timestamps_ms + offsets[inverse.ravel()], size)
+    # Only the non-empty bins are materialised, however far apart the timestamps are
+    starts, counts = np.unique(bins, return_counts=True)
+    epoch = datetime(1970, 1, 1)
+    return [epoch + timedelta(milliseconds=ms) for ms in (starts * size).tolist()], counts.tolist()
+
 def apply_time_filter(timestamps, lines, time_range):
-    filtered_timestamps = []
-    filtered_lines = []
-    now = datetime.now()
-    for i, ts in enumerate(timestamps):
-        include = False
-        if time_range == "Past 1 Hour" and now - ts <= timedelta(hours=1):
-            include = True
-        elif time_range == "Past 24 Hours" and now - ts <= timedelta(hours=24):
-            include = True
-        elif time_range == "Past 7 Days" and now - ts <= timedelta(days=7):
-            include = True
-        elif time_range == "All Time":
-            include = True
-        if include:
-            filtered_timestamps.append(ts)
-            filtered_lines.append(lines[i])
-    return filtered_timestamps, filtered_lines
+    since_ms = record_store.since_ms_for_range(time_range)
+    if since_ms is None or not timestamps:
+        return list(timestamps), list(lines)
+    ms = np.fromiter((ts.timestamp() * 1000 for ts in timestamps), dtype=np.float64, count=len(timestamps))
+    keep = np.flatnonzero(ms >= since_ms)
+    return [timestamps[i] for i in keep], [lines[i] for i in keep]
 
-def plot_graph(graph_ax, graph_canvas, log_type, time_range):
-    graph_ax.clear()
+# -------------------------------------------------------------------
+# Graphs are computed off the UI thread into a plain description, then
+# drawn on the UI thread by render_graph
+# -------------------------------------------------------------------
+def _message(text, fontsize=12):
+    return {"kind": "message", "text": text, "fontsize": fontsize}
+
+def _bar_spec(pairs, title, xlabel):
+    return {"kind": "barh", "labels": [p[0] for p in pairs], "counts": [p[1] for p in pairs],
+            "title": title, "xlabel": xlabel}
+
+def compute_graph(log_type, time_range, bucket="Hour"):
+    """Returns the description of the activity graph for a log type; safe to call from a worker thread."""
+    since_ms = record_store.since_ms_for_range(time_range)
     if log_type in ["Call Logs", "SMS Logs"]:
-        path = "logs/call_logs.txt" if log_type == "Call Logs" else "logs/sms_logs.txt"
-        lines, timestamps = get_timestamps_from_file(path)
-        if lines is None or not lines:
-            graph_ax.text(0.5, 0.5, f"{log_type} file not found or empty", fontsize=14, ha='center')
-            graph_canvas.draw()
-            return
-        timestamps, lines = apply_time_filter(timestamps, lines, time_range)
-        if not timestamps:
-            graph_ax.text(0.5, 0.5, "No data in selected time range", fontsize=12, ha='center')
-            graph_canvas.draw()
-            return
-        activity_per_hour = {}
-        for ts in timestamps:
-            hour = ts.replace(minute=0, second=0, microsecond=0)
-            activity_per_hour[hour] = activity_per_hour.get(hour, 0) + 1
-        sorted_times = sorted(activity_per_hour.keys())
-        counts = [activity_per_hour[t] for t in sorted_times]
-        graph_ax.plot(sorted_times, counts, marker="o", color="lime", linewidth=2)
-        graph_ax.set_title(f"{log_type} Activity Over Time", color="lime", fontsize=12)
-        graph_ax.set_ylabel("Count", color="lime")
+        source = "calls" if log_type == "Call Logs" else "sms"
+        if not aggregation.get_summary(source).total:
+            return _message(f"{log_type} file not found or empty", 14)
+        timestamps = window_since(get_timestamp_array(source), since_ms)
+        if not len(timestamps):
+            return _message("No data in selected time range")
+        sorted_times, counts = bucket_counts(timestamps, bucket)
+        return {"kind": "line", "x": sorted_times, "y": counts, "linestyle": None,
+                "title": f"{log_type} Activity Over Time", "ylabel": f"Count per {bucket.lower()}"}
+    elif log_type == "Top SMS Senders":
+        summary = aggregation.get_summary("sms")
+        if not summary.total:
+            return _message("SMS log file not found or empty", 14)
+        if not len(window_since(get_timestamp_array("sms"), since_ms)):
+            return _message("No data in selected time range")
+        # Senders are the addresses of received (type 1) messages; the all-time list comes from the summary
+        if since_ms is None:
+            top_senders = summary.top_addresses(10, received_only=True)
+        else:
+            top_senders = record_store.top_addresses("sms", 10, since_ms, types=(1,))
+        if not top_senders:
+            return _message("No sender data found in logs")
+        return _bar_spec(top_senders, "Top 10 SMS Senders", "Number of Messages")
+    elif log_type == "Logcat Activity":
+        if not record_store.count_records("logcat"):
+            return _message("Logcat file not found or empty", 14)
+        timestamps = window_since(get_timestamp_array("logcat"), since_ms)
+        if not len(timestamps):
+            return _message("No logcat activity in selected time range")
+        sorted_times, counts = bucket_counts(timestamps, bucket)
+        return {"kind": "line", "x": sorted_times, "y": counts, "linestyle": "-",
+                "title": "Logcat Activity Over Time", "ylabel": f"Entries per {bucket.lower()}"}
+    return None
+
+def compute_frequent_callers(time_range):
+    """Returns the description of the top callers chart; safe to call from a worker thread."""
+    if not evidence.log_exists("logs/call_logs.txt"):
+        return _message("Call log file not found", 14)
+    since_ms = record_store.since_ms_for_range(time_range)
+    if since_ms is not None and not len(window_since(get_timestamp_array("calls"), since_ms)):
+        return _message("No call data in selected time range")
+    if since_ms is None:
+        top_callers = aggregation.get_summary("calls").top_addresses(10)
+    else:
+        top_callers = record_store.top_addresses("calls", 10, since_ms)
+    if not top_callers:
+        return _message("No phone numbers found in logs")
+    return _bar_spec(top_callers, "Top 10 Frequent Callers", "Number of Calls")
+
+def render_graph(graph_ax, graph_canvas, spec):
+    """Draws a graph description from compute_graph/compute_frequent_callers. UI thread only."""
+    if spec is None:
+        return
+    graph_ax.clear()
+    if spec["kind"] == "message":
+        graph_ax.text(0.5, 0.5, spec["text"], fontsize=spec["fontsize"], ha='center')
+    elif spec["kind"] == "line":
+        line_options = {"linestyle": spec["linestyle"]} if spec["linestyle"] else {}
+        graph_ax.plot(spec["x"], spec["y"], marker="o", color="lime", linewidth=2, **line_options)
+        graph_ax.set_title(spec["title"], color="lime", fontsize=12)
+        graph_ax.set_ylabel(spec["ylabel"], color="lime")
         graph_ax.set_xlabel("Time", color="lime")
         graph_ax.tick_params(axis='x', colors="lime")
         graph_ax.tick_params(axis='y', colors="lime")
         graph_ax.grid(True, alpha=0.3)
         graph_ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        graph_canvas.draw()
-    elif log_type == "Top SMS Senders":
-        lines, timestamps = get_timestamps_from_file("logs/sms_logs.txt")
-        if lines is None or not lines:
-            graph_ax.text(0.5, 0.5, "SMS log file not found or empty", fontsize=14, ha='center')
-            graph_canvas.draw()
-            return
-        timestamps, lines = apply_time_filter(timestamps, lines, time_range)
-        if not timestamps:
-            graph_ax.text(0.5, 0.5, "No data in selected time range", fontsize=12, ha='center')
-            graph_canvas.draw()
-            return
-        senders = []
-        for line in lines:
-            # Check multiple possibilities: from:, address:, sender:
-            match = re.search(r'(?:from:|address:|sender:)\s*(\+?\d+)', line, re.IGNORECASE)
-            if match:
-                senders.append(match.group(1))
-        if not senders:
-            graph_ax.text(0.5, 0.5, "No sender data found in logs", fontsize=12, ha='center')
-            graph_canvas.draw()
-            return
-        counter = Counter(senders)
-        top_senders = counter.most_common(10)
-        labels = [s[0] for s in top_senders]
-        counts = [s[1] for s in top_senders]
+    elif spec["kind"] == "barh":
+        labels, counts = spec["labels"], spec["counts"]
         bars = graph_ax.barh(labels[::-1], counts[::-1], color="lime")
-        graph_ax.set_title("Top 10 SMS Senders", color="lime", fontsize=12)
-        graph_ax.set_xlabel("Number of Messages", color="lime")
+        graph_ax.set_title(spec["title"], color="lime", fontsize=12)
+        graph_ax.set_xlabel(spec["xlabel"], color="lime")
         graph_ax.tick_params(axis='x', colors="lime")
         graph_ax.tick_params(axis='y', colors="lime")
         graph_ax.grid(True, axis='x', alpha=0.3)
-        for i, bar in enumerate(bars):
+        for bar in bars:
             width = bar.get_width()
             graph_ax.text(width + 0.3, bar.get_y() + bar.get_height()/2, str(int(width)),
                           ha='left', va='center', color='lime')
-        graph_canvas.draw()
-    elif log_type == "Logcat Activity":
-        lines, timestamps = get_timestamps_from_file("logs/android_logcat.txt")
-        if lines is None or not lines:
-            graph_ax.text(0.5, 0.5, "Logcat file not found or empty", fontsize=14, ha='center')
-            graph_canvas.draw()
-            return
-        timestamps, lines = apply_time_filter(timestamps, lines, time_range)
-        if not timestamps:
-            graph_ax.text(0.5, 0.5, "No logcat activity in selected time range", fontsize=12, ha='center')
-            graph_canvas.draw()
-            return
-        activity_per_hour = {}
-        for ts in timestamps:
-            hour = ts.replace(minute=0, second=0, microsecond=0)
-            activity_per_hour[hour] = activity_per_hour.get(hour, 0) + 1
-        sorted_times = sorted(activity_per_hour.keys())
-        counts = [activity_per_hour[t] for t in sorted_times]
-        graph_ax.plot(sorted_times, counts, marker="o", linestyle="-", color="lime", linewidth=2)
-        graph_ax.set_title("Logcat Activity Over Time", color="lime", fontsize=12)
-        graph_ax.set_ylabel("Number of Entries", color="lime")
-        graph_ax.set_xlabel("Time", color="lime")
-        graph_ax.tick_params(axis='x', colors="lime")
-        graph_ax.tick_params(axis='y', colors="lime")
-        graph_ax.grid(True, alpha=0.3)
-        graph_ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        graph_canvas.draw()
+    graph_canvas.draw_idle()
+
+def plot_graph(graph_ax, graph_canvas, log_type, time_range, bucket="Hour"):
+    render_graph(graph_ax, graph_canvas, compute_graph(log_type, time_range, bucket))
 
 def plot_frequent_callers(graph_ax, graph_canvas, time_range):
-    try:
-        with open("logs/call_logs.txt", "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        graph_ax.clear()
-        graph_ax.text(0.5, 0.5, "Call log file not found", fontsize=14, ha='center')
-        graph_canvas.draw()
-        return
-    now = datetime.now()
-    filtered_lines = []
-    for line in lines:
-        date_match = re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', line)
-        unix_match = re.search(r'date=(\d+)', line)
-        include = False
-        if date_match:
-            try:
-                ts = datetime.strptime(date_match.group(), "%Y-%m-%d %H:%M:%S")
-                if (time_range == "Past 1 Hour" and now - ts <= timedelta(hours=1)) or \
-                   (time_range == "Past 24 Hours" and now - ts <= timedelta(hours=24)) or \
-                   (time_range == "Past 7 Days" and now - ts <= timedelta(days=7)) or \
-                   (time_range == "All Time"):
-                    include = True
-            except:
-                pass
-        elif unix_match:
-            try:
-                ts = datetime.fromtimestamp(int(unix_match.group(1)) / 1000)
-                if (time_range == "Past 1 Hour" and now - ts <= timedelta(hours=1)) or \
-                   (time_range == "Past 24 Hours" and now - ts <= timedelta(hours=24)) or \
-                   (time_range == "Past 7 Days" and now - ts <= timedelta(days=7)) or \
-                   (time_range == "All Time"):
-                    include = True
-            except:
-                pass
-        if include or time_range == "All Time":
-            filtered_lines.append(line)
-    if not filtered_lines:
-        graph_ax.clear()
-        graph_ax.text(0.5, 0.5, "No call data in selected time range", fontsize=12, ha='center')
-        graph_canvas.draw()
-        return
-    numbers = []
-    # NEW extraction logic: use a broad regex to capture phone numbers (optionally starting with +, 10 to 15 digits)
-    for line in filtered_lines:
-        matches = re.findall(r'\+?\d{10,15}', line)
-        if matches:
-            # Choose the first match from each line as the representative phone number
-            numbers.append(matches[0])
-    if not numbers:
-        graph_ax.clear()
-        graph_ax.text(0.5, 0.5, "No phone numbers found in logs", fontsize=12, ha='center')
-        graph_canvas.draw()
-        return
-    counter = Counter(numbers)
-    top_callers = counter.most_common(10)
-    labels = [x[0] for x in top_callers]
-    counts = [x[1] for x in top_callers]
-    graph_ax.clear()
-    bars = graph_ax.barh(labels[::-1], counts[::-1], color="lime")
-    graph_ax.set_title("Top 10 Frequent Callers", color="lime", fontsize=12)
-    graph_ax.set_xlabel("Number of Calls", color="lime")
-    graph_ax.tick_params(axis='x', colors="lime")
-    graph_ax.tick_params(axis='y', colors="lime")
-    graph_ax.grid(True, axis='x', alpha=0.3)
-    for i, bar in enumerate(bars):
-        width = bar.get_width()
-        graph_ax.text(width + 0.3, bar.get_y() + bar.get_height()/2, str(int(width)),
-                      ha='left', va='center', color='lime')
-    graph_canvas.draw()
+    render_graph(graph_ax, graph_canvas, compute_frequent_callers(time_range))
+
+def save_chart(fig, filename):
+    """Saves a figure under logs/exports and returns its path."""
+    os.makedirs("logs/exports", exist_ok=True)
+    filepath = os.path.join("logs/exports", filename)
+    fig.savefig(filepath, dpi=300, bbox_inches='tight')
+    return filepath
 
 def export_chart(fig, filename):
+    from tkinter import messagebox
     try:
-        os.makedirs("logs/exports", exist_ok=True)
-        filepath = os.path.join("logs/exports", filename)
-        fig.savefig(filepath, dpi=300, bbox_inches='tight')
+        filepath = save_chart(fig, filename)
         messagebox.showinfo("Export Successful", f"Chart exported to {filepath}")
     except Exception as e:
         messagebox.showerror("Export Failed", f"Failed to export chart: {str(e)}")
 
+def get_graph_data(graph_ax):
+    """Returns the (label/time, count) pairs currently plotted on graph_ax. UI thread only."""
+    if graph_ax.lines:
+        x_data = graph_ax.lines[0].get_xdata()
+        y_data = graph_ax.lines[0].get_ydata()
+        return list(zip(x_data, y_data))
+    elif graph_ax.patches:
+        bars = graph_ax.patches
+        tick_labels = [tick.get_text() for tick in graph_ax.get_yticklabels()]
+        values = [bar.get_width() for bar in bars]
+        return list(zip(tick_labels[::-1], values[::-1]))
+    return []
+
+def save_graph_data(data):
+    """Writes graph data pairs to a timestamped CSV under logs/exports and returns its path."""
+    os.makedirs("logs/exports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    df = pd.DataFrame(data, columns=["Label/Time", "Count"])
+    filepath = f"logs/exports/graph_export_{timestamp}.csv"
+    df.to_csv(filepath, index=False)
+    return filepath
+
 def export_graph_data(graph_ax, time_combo, log_type):
+    from tkinter import messagebox
     try:
-        data = []
-        if graph_ax.lines:
-            x_data = graph_ax.lines[0].get_xdata()
-            y_data = graph_ax.lines[0].get_ydata()
-            data = list(zip(x_data, y_data))
-        elif graph_ax.patches:
-            bars = graph_ax.patches
-            tick_labels = [tick.get_text() for tick in graph_ax.get_yticklabels()]
-            values = [bar.get_width() for bar in bars]
-            data = list(zip(tick_labels[::-1], values[::-1]))
+        data = get_graph_data(graph_ax)
         if not data:
             messagebox.showwarning("Export Warning", "No graph data to export.")
             return
-        os.makedirs("logs/exports", exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        df = pd.DataFrame(data, columns=["Label/Time", "Count"])
-        filepath = f"logs/exports/graph_export_{timestamp}.csv"
-        df.to_csv(filepath, index=False)
+        filepath = save_graph_data(data)
         messagebox.showinfo("Export Successful", f"Data exported to {filepath}")
     except Exception as e:
         messagebox.showerror("Export Failed", f"Failed to export data: {str(e)}")
@@ -1,7 +1,327 @@
 # gui.py
+import threading
 import tkinter as tk
+import tkinter.font as tkfont
+from array import array
+from bisect import bisect_right
 from tkinter import scrolledtext, ttk, filedialog, messagebox
-from config import BG_COLOR, FG_COLOR, TEXT_BG_COLOR, TEXT_FG_COLOR, BUTTON_COLOR, BUTTON_TEXT_COLOR, FONT, LOG_TYPES
+from evidence import log_exists, log_signature, map_log
+from config import (BG_COLOR, FG_COLOR, TEXT_BG_COLOR, TEXT_FG_COLOR, BUTTON_COLOR, BUTTON_TEXT_COLOR, FONT, LOG_TYPES,
+                    VIEWER_MAX_TEXT_LINES, LIVE_MAX_LINES)
+
+# -------------------------------------------------------------------
+# Virtualized log viewer: renders only the visible window of lines
+# -------------------------------------------------------------------
+# Viewers open their files on this pool (see set_viewer_pool); without one they open them inline
+_viewer_pool = None
+
+# path -> (log_signature, line offsets), shared by every viewer showing the file
+_offsets = {}
+_offsets_locks = {}
+_offsets_guard = threading.Lock()
+
+def set_viewer_pool(pool):
+    """Makes the viewers open their files on a workers.WorkerPool instead of the UI thread."""
+    global _viewer_pool
+    _viewer_pool = pool
+
+def _scan_offsets(mm, size):
+    offsets = array("q")
+    find = mm.find
+    position = 0
+    while position < size:
+        offsets.append(position)
+        end = find(b"\n", position)
+        if end < 0:
+            break
+        position = end + 1
+    return offsets
+
+def line_offsets(path):
+    """
+    Returns (size, offsets of every line) of a file or acquired log. The offsets are cached
+    until evidence.log_signature(path) changes; concurrent callers for a path scan it once.
+    """
+    with _offsets_guard:
+        lock = _offsets_locks.setdefault(path, threading.Lock())
+    with lock:
+        signature = log_signature(path)
+        cached = _offsets.get(path)
+        if cached is not None and cached[0] == signature:
+            return signature[0], cached[1]
+        size = signature[0]
+        offsets = array("q")
+        if size:
+            with map_log(path) as mm:
+                offsets = _scan_offsets(mm, size)
+        _offsets[path] = (signature, offsets)
+        return size, offsets
+
+def clear_offsets_cache():
+    with _offsets_guard:
+        _offsets.clear()
+
+class _FileSegment:
+    """
+    Lines of a file served through a line-offset index from its mapping (see evidence.map_log:
+    an mmap, or the segments or evidence container of an acquired log).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size, self.offsets = line_offsets(path)
+        self._mm = map_log(path) if self.size else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def line(self, i):
+        start = self.offsets[i]
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.size
+        return self._mm[start:end].decode("utf-8", "replace").rstrip("\r\n")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+
+class _TextSegment:
+    """In-memory lines (headers, messages, streamed results)."""
+
+    def __init__(self, lines=None):
+        self.lines = list(lines or [])
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line(self, i):
+        return self.lines[i]
+
+    def close(self):
+        pass
+
+def _open_segments(sources):
+    """The segments load_files shows for sources; may run on a worker thread."""
+    segments = []
+    for header, path, missing_text in sources:
+        if header is not None:
+            segments.append(_TextSegment(["", header]))
+        if log_exists(path):
+            segments.append(_FileSegment(path))
+        elif missing_text is not None:
+            segments.append(_TextSegment(missing_text.split("\n")))
+    return segments
+
+class VirtualLogViewer(tk.Frame):
+    """
+    Read-only log view that keeps no copy of the log in Tk. Content is a list of
+    file segments (mmap + line offsets) and text segments; only the lines that fit
+    in the window are inserted into the Text widget, and scrolling moves a line offset.
+    With numbered=True, lines of file segments are prefixed with their line number.
+    Appended text keeps at most max_text_lines lines, the first ones or with
+    keep_newest the last ones; the others are only counted in the status bar.
+    """
+
+    def __init__(self, parent, numbered=False, max_text_lines=VIEWER_MAX_TEXT_LINES, keep_newest=False, **kwargs):
+        super().__init__(parent, bg=BG_COLOR, **kwargs)
+        self.numbered = numbered
+        self.max_text_lines = max_text_lines
+        self.keep_newest = keep_newest
+        self.segments = []
+        self.segment_starts = []
+        self.line_count = 0
+        self.omitted_lines = 0
+        self.top = 0
+
+        toolbar = tk.Frame(self, bg=BG_COLOR)
+        toolbar.pack(fill=tk.X)
+        tk.Label(toolbar, text="Go to line:", bg=BG_COLOR, fg=FG_COLOR, font=FONT).pack(side=tk.LEFT, padx=5)
+        self.jump_entry = tk.Entry(toolbar, width=10)
+        self.jump_entry.pack(side=tk.LEFT)
+        self.jump_entry.bind("<Return>", lambda event: self._jump_from_entry())
+        tk.Button(toolbar, text="Go", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR,
+                  command=self._jump_from_entry).pack(side=tk.LEFT, padx=5)
+        self.status_label = tk.Label(toolbar, text="0 lines", bg=BG_COLOR, fg=FG_COLOR, font=FONT)
+        self.status_label.pack(side=tk.RIGHT, padx=5)
+
+        body = tk.Frame(self, bg=BG_COLOR)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.xscrollbar = ttk.Scrollbar(body, orient=tk.HORIZONTAL)
+        self.xscrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.text = tk.Text(body, wrap=tk.NONE, bg=TEXT_BG_COLOR, fg=TEXT_FG_COLOR, font=FONT,
+                            xscrollcommand=self.xscrollbar.set, state=tk.DISABLED)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.xscrollbar.config(command=self.text.xview)
+        self._linespace = tkfont.Font(font=FONT).metrics("linespace")
+
+        self.text.bind("<Configure>", lambda event: self._render())
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+        for key, action in (("<Up>", lambda: self.scroll_lines(-1)), ("<Down>", lambda: self.scroll_lines(1)),
+                            ("<Prior>", lambda: self.scroll_pages(-1)), ("<Next>", lambda: self.scroll_pages(1)),
+                            ("<Home>", lambda: self.jump_to_line(1)), ("<End>", lambda: self.jump_to_line(self.line_count))):
+            self.text.bind(key, lambda event, action=action: (action(), "break")[1])
+
+    # --- content -------------------------------------------------------
+    def clear(self):
+        """Drops all content, releases any mapped files and abandons a load still running."""
+        if _viewer_pool is not None:
+            _viewer_pool.cancel(self._load_key())
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self.omitted_lines = 0
+        self._reindex()
+        self.top = 0
+        self._render()
+
+    def show_text(self, text):
+        """Replaces the content with in-memory text."""
+        self.clear()
+        self.append_text(text)
+
+    def load_file(self, path, missing_text=None, on_loaded=None):
+        """Replaces the content with a file, or missing_text if the file does not exist."""
+        self.load_files([(None, path, missing_text)], on_loaded=on_loaded)
+
+    def load_files(self, sources, on_loaded=None):
+        """
+        Replaces the content with several files. sources is a list of
+        (header, path, missing_text); header and missing_text may be None.
+        An acquired log is shown whole: all its segments, or its evidence container.
+        With a viewer pool the files are indexed on it and shown when ready; on_loaded()
+        is then called on the UI thread, unless another load or clear() came first.
+        """
+        self.clear()
+        if _viewer_pool is None:
+            self._show_segments(_open_segments(sources), on_loaded)
+            return
+        self.status_label.config(text="Loading...")
+        _viewer_pool.submit(self._load_key(), self._load_job, sources, on_loaded, pass_job=True)
+
+    def _load_key(self):
+        return f"viewer_load_{id(self)}"
+
+    def _load_job(self, job, sources, on_loaded):
+        segments = _open_segments(sources)
+
+        def show():
+            # A superseded load still has to release the files it mapped
+            if job.cancelled():
+                for segment in segments:
+                    segment.close()
+            else:
+                self._show_segments(segments, on_loaded)
+        job.dispatcher.call(show)
+
+    def _show_segments(self, segments, on_loaded):
+        self.segments = segments
+        self._reindex()
+        self._render()
+        if on_loaded is not None:
+            on_loaded()
+
+    def append_text(self, text):
+        """Appends in-memory text at the end of the content, within max_text_lines."""
+        lines = text.split("\n")
+        if lines and lines[-1] == "":
+            lines.pop()
+        if not self.segments or not isinstance(self.segments[-1], _TextSegment):
+            self.segments.append(_TextSegment())
+        kept = self.segments[-1].lines
+        kept.extend(lines)
+        excess = len(kept) - self.max_text_lines
+        if excess > 0:
+            if self.keep_newest:
+                del kept[:excess]
+            else:
+                del kept[len(kept) - excess:]
+            self.omitted_lines += excess
+        self._reindex()
+        self._render()
+
+    def _reindex(self):
+        self.segment_starts = []
+        total = 0
+        for segment in self.segments:
+            self.segment_starts.append(total)
+            total += len(segment)
+        self.line_count = total
+
+    def get_line(self, index):
+        """Returns the text of a 0-based line of the content."""
+        segment_no = bisect_right(self.segment_starts, index) - 1
+        return self.segments[segment_no].line(index - self.segment_starts[segment_no])
+
+    def _display_line(self, index):
+        segment_no = bisect_right(self.segment_starts, index) - 1
+        segment = self.segments[segment_no]
+        local_index = index - self.segment_starts[segment_no]
+        if self.numbered and isinstance(segment, _FileSegment):
+            return f"{local_index + 1}: {segment.line(local_index)}"
+        return segment.line(local_index)
+
+    # --- viewport ------------------------------------------------------
+    def visible_rows(self):
+        return max(1, self.text.winfo_height() // self._linespace)
+
+    def _render(self):
+        rows = self.visible_rows()
+        self.top = max(0, min(self.top, self.line_count - rows))
+        end = min(self.line_count, self.top + rows)
+        lines = [self._display_line(i) for i in range(self.top, end)]
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+        self.text.config(state=tk.DISABLED)
+        if self.line_count:
+            self.scrollbar.set(self.top / self.line_count, end / self.line_count)
+        else:
+            self.scrollbar.set(0, 1)
+        status = f"Lines {self.top + 1 if end else 0}-{end} of {self.line_count}"
+        if self.omitted_lines:
+            status += f" ({self.omitted_lines} more not shown)"
+        self.status_label.config(text=status)
+
+    def scroll_lines(self, count):
+        self.top += count
+        self._render()
+
+    def scroll_pages(self, count):
+        self.scroll_lines(count * max(1, self.visible_rows() - 1))
+
+    def jump_to_line(self, line_no):
+        """Scrolls so that the 1-based line_no is the first visible line."""
+        self.top = max(0, line_no - 1)
+        self._render()
+
+    def _jump_from_entry(self):
+        try:
+            self.jump_to_line(int(self.jump_entry.get()))
+        except ValueError:
+            pass
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.top = int(float(args[0]) * self.line_count)
+            self._render()
+        elif action == "scroll":
+            count, unit = int(args[0]), args[1]
+            if unit == "pages":
+                self.scroll_pages(count)
+            else:
+                self.scroll_lines(count)
+
+    def _on_mousewheel(self, event):
+        self.scroll_lines(-3 if event.delta > 0 else 3)
+        return "break"
+
+def create_log_viewer(parent, numbered=False, max_text_lines=VIEWER_MAX_TEXT_LINES, keep_newest=False, **pack_options):
+    viewer = VirtualLogViewer(parent, numbered=numbered, max_text_lines=max_text_lines, keep_newest=keep_newest)
+    viewer.pack(fill=tk.BOTH, expand=True, **pack_options)
+    return viewer
 
 def create_main_window():
     root = tk.Tk()
@@ -27,6 +347,7 @@ def create_tabs(root):
     tabs["LogcatTypes"] = ttk.Frame(tab_control)
     tabs["Filter"] = ttk.Frame(tab_control)
     tabs["Graphs"] = ttk.Frame(tab_control)
+    tabs["Diagnostics"] = ttk.Frame(tab_control)
     
     tab_control.add(tabs["Extract"], text="Extract Logs")
     tab_control.add(tabs["Live"], text="Live Monitoring")
@@ -35,6 +356,7 @@ def create_tabs(root):
     tab_control.add(tabs["LogcatTypes"], text="Logcat Types")
     tab_control.add(tabs["Filter"], text="Filter Logs")
     tab_control.add(tabs["Graphs"], text="Activity Graphs")
+    tab_control.add(tabs["Diagnostics"], text="Diagnostics")
     tab_control.pack(expand=1, fill="both")
     return tabs, tab_control
 
@@ -46,23 +368,20 @@ def create_widgets(tabs):
     widgets["live_text"] = scrolledtext.ScrolledText(tabs["Live"], wrap=tk.WORD, bg=BG_COLOR, fg=FG_COLOR, font=FONT)
     widgets["live_text"].pack(fill=tk.BOTH, expand=True, pady=5)
     
-    widgets["all_logs_text"] = scrolledtext.ScrolledText(tabs["AllLogs"], wrap=tk.WORD, bg=BG_COLOR, fg=FG_COLOR, font=FONT)
-    widgets["all_logs_text"].pack(fill=tk.BOTH, expand=True, pady=5)
+    widgets["all_logs_text"] = create_log_viewer(tabs["AllLogs"], pady=5)
     
-    widgets["logcat_text"] = scrolledtext.ScrolledText(tabs["Logcat"], wrap=tk.WORD, bg=BG_COLOR, fg=FG_COLOR, font=FONT)
-    widgets["logcat_text"].pack(fill=tk.BOTH, expand=True, pady=5)
+    widgets["logcat_text"] = create_log_viewer(tabs["Logcat"], pady=5)
     
     # Build notebook for logcat types
     logcat_type_notebook = ttk.Notebook(tabs["LogcatTypes"])
     logcat_type_notebook.pack(expand=1, fill="both")
     widgets["logcat_type_notebook"] = logcat_type_notebook
+    # Each tab shows its logs/logcat_types file from disk, then the newest live lines
     logcat_type_texts = {}
     for log_type in LOG_TYPES:
         frame = ttk.Frame(logcat_type_notebook)
         logcat_type_notebook.add(frame, text=log_type)
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, bg=TEXT_BG_COLOR, fg=TEXT_FG_COLOR, font=FONT)
-        text_widget.pack(fill=tk.BOTH, expand=True, pady=5)
-        logcat_type_texts[log_type] = text_widget
+        logcat_type_texts[log_type] = create_log_viewer(frame, max_text_lines=LIVE_MAX_LINES, keep_newest=True, pady=5)
     widgets["logcat_type_texts"] = logcat_type_texts
     return widgets
 
@@ -75,6 +394,13 @@ def create_live_monitoring_buttons(tab_live):
     stop_btn.pack(side=tk.LEFT, padx=10)
     return start_btn, stop_btn
 
+def create_live_rate_label(tab_live):
+    """Label showing live per-category line rates (lines/s over 1/5/60 s)."""
+    rate_label = tk.Label(tab_live, text="Category rates (lines/s, 1s/5s/60s): waiting for data",
+                          bg=BG_COLOR, fg=FG_COLOR, font=FONT, anchor="w", justify=tk.LEFT)
+    rate_label.pack(fill=tk.X, padx=10)
+    return rate_label
+
 def create_graph_controls(tab_graphs):
     frame = tk.Frame(tab_graphs, bg="black")
     frame.pack(pady=10)
@@ -90,12 +416,19 @@ def create_graph_controls(tab_graphs):
     logtype_combo.set("Call Logs")
     logtype_combo.grid(row=0, column=3, padx=5)
     
+    tk.Label(frame, text="Bucket:", bg="black", fg="lime").grid(row=0, column=4, padx=5)
+    from config import GRAPH_BUCKETS
+    bucket_combo = ttk.Combobox(frame, values=list(GRAPH_BUCKETS.keys()), width=8)
+    bucket_combo.set("Hour")
+    bucket_combo.grid(row=0, column=5, padx=5)
+    
     graph_btn = tk.Button(frame, text="Generate Graph", bg="gray", fg="black")
-    graph_btn.grid(row=0, column=4, padx=10)
+    graph_btn.grid(row=0, column=6, padx=10)
     freq_btn = tk.Button(frame, text="Most Frequent Callers", bg="gray", fg="black")
-    freq_btn.grid(row=0, column=5, padx=10)
+    freq_btn.grid(row=0, column=7, padx=10)
     
-    return {"time_combo": time_combo, "logtype_combo": logtype_combo, "graph_btn": graph_btn, "freq_btn": freq_btn}
+    return {"time_combo": time_combo, "logtype_combo": logtype_combo, "bucket_combo": bucket_combo,
+            "graph_btn": graph_btn, "freq_btn": freq_btn}
 
 def create_filter_controls(tab_filter):
     frame = tk.Frame(tab_filter, bg=BG_COLOR)
@@ -127,18 +460,44 @@ def create_filter_controls(tab_filter):
     severity_combo.set("All")
     severity_combo.grid(row=0, column=5, padx=5, pady=5)
     
+    tk.Label(frame, text="Query", bg=BG_COLOR, fg=FG_COLOR, font=FONT).grid(row=2, column=0, padx=5, pady=5)
+    query_entry = tk.Entry(frame, width=60)
+    query_entry.grid(row=2, column=1, columnspan=3, padx=5, pady=5, sticky="we")
+    tk.Label(frame, text='e.g. fatal level:E NOT tag:ActivityManager time:1h  |  "see you" OR number:5550100',
+             bg=BG_COLOR, fg="gray", font=("Arial", 9)).grid(row=2, column=4, columnspan=2, padx=5, pady=5, sticky="w")
+    
     apply_btn = tk.Button(frame, text="Apply Filter", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR)
-    apply_btn.grid(row=2, column=1, padx=5, pady=5)
+    apply_btn.grid(row=3, column=1, padx=5, pady=5)
     save_btn = tk.Button(frame, text="Save Filtered Logs", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR)
-    save_btn.grid(row=2, column=2, padx=5, pady=5)
+    save_btn.grid(row=3, column=2, padx=5, pady=5)
     
-    return {"logtype": logtype_combo, "time": time_combo, "keyword": keyword_entry,
+    return {"logtype": logtype_combo, "time": time_combo, "keyword": keyword_entry, "query": query_entry,
             "subtype": subtype_combo, "severity": severity_combo, "apply": apply_btn, "save": save_btn}
 
 def create_filter_output(tab_filter):
-    filter_output = scrolledtext.ScrolledText(tab_filter, width=80, height=25, bg=TEXT_BG_COLOR, fg=TEXT_FG_COLOR, font=FONT)
-    filter_output.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    return filter_output
+    return create_log_viewer(tab_filter, numbered=True, padx=10, pady=10)
+
+def create_diagnostics_controls(tab_diagnostics, enabled):
+    """Instrumentation switch, reset/dump/profile buttons and the metrics table of the Diagnostics tab."""
+    frame = tk.Frame(tab_diagnostics, bg=BG_COLOR)
+    frame.pack(fill=tk.X, pady=5)
+    enabled_var = tk.BooleanVar(value=enabled)
+    enable_check = tk.Checkbutton(frame, text="Enable instrumentation", variable=enabled_var, bg=BG_COLOR,
+                                  fg=FG_COLOR, selectcolor=BG_COLOR, activebackground=BG_COLOR,
+                                  activeforeground=FG_COLOR)
+    enable_check.pack(side=tk.LEFT, padx=10)
+    btn_reset = tk.Button(frame, text="Reset", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR)
+    btn_dump = tk.Button(frame, text="Dump Metrics (JSON)", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR)
+    btn_profile = tk.Button(frame, text="Start Profiling", bg=BUTTON_COLOR, fg=BUTTON_TEXT_COLOR)
+    btn_reset.pack(side=tk.LEFT, padx=10)
+    btn_dump.pack(side=tk.LEFT, padx=10)
+    btn_profile.pack(side=tk.LEFT, padx=10)
+    metrics_text = scrolledtext.ScrolledText(tab_diagnostics, wrap=tk.NONE, bg=TEXT_BG_COLOR, fg=TEXT_FG_COLOR,
+                                             font=("Courier", 10))
+    metrics_text.pack(fill=tk.BOTH, expand=True, pady=5)
+    metrics_text.config(state=tk.DISABLED)
+    return {"enabled": enabled_var, "enable_check": enable_check, "reset": btn_reset, "dump": btn_dump,
+            "profile": btn_profile, "text": metrics_text}
 
 def create_export_frame(root):
     frame = tk.Frame(root, bg=BG_COLOR)
@@ -151,7 +510,10 @@ def create_export_frame(root):
     btn_png.pack(side=tk.LEFT, padx=10)
     btn_pdf.pack(side=tk.LEFT, padx=10)
     btn_csv.pack(side=tk.LEFT, padx=10)
-    return {"full": btn_full, "png": btn_png, "pdf": btn_pdf, "csv": btn_csv}
+    # Progress of the report being generated
+    status = tk.Label(frame, text="", bg=BG_COLOR, fg=FG_COLOR, anchor="w")
+    status.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+    return {"full": btn_full, "png": btn_png, "pdf": btn_pdf, "csv": btn_csv, "status": status}
 
 def create_menu(root, notebook):
     main_menu = tk.Menu(root)
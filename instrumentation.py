@@ -0,0 +1,303 @@
+# instrumentation.py
+"""
+Opt-in instrumentation of the hot paths.
+
+Timers record how often and how long an operation ran, plus the lines and
+bytes it processed, so throughput can be read off directly; counters count
+events such as regex evaluations; gauges keep the latest and highest value
+of something sampled, such as a queue depth. Everything is a no-op until
+enabled (ANDROID_FORENSIC_INSTRUMENT=1 or the Diagnostics tab): hot paths
+test the module-level `enabled` flag before doing any work, and timed()
+returns a shared inert span.
+
+A cProfile run can be started on demand. The thread that starts it is
+profiled, and so is every worker pool job that starts while it runs. The
+merged statistics are written as a .prof file for pstats/snakeviz and as
+a text summary.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from config import INSTRUMENTATION_ENABLED, DIAGNOSTICS_DIR
+
+enabled = INSTRUMENTATION_ENABLED
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_gauges = {}
+
+
+class TimerStats:
+    """Accumulated samples of one timer."""
+
+    __slots__ = ("count", "total", "max", "last", "lines", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.lines = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "lines_per_second": round(self.lines / self.total) if self.total and self.lines else None,
+            "bytes_per_second": round(self.bytes / self.total) if self.total and self.bytes else None,
+        }
+
+
+def _timer(name):
+    stats = _timers.get(name)
+    if stats is None:
+        stats = _timers[name] = TimerStats()
+    return stats
+
+
+def set_enabled(on):
+    global enabled
+    enabled = bool(on)
+
+
+def reset():
+    """Discards every timer, counter and gauge."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+
+# -------------------------------------------------------------------
+# Recording
+# -------------------------------------------------------------------
+def record(name, seconds, lines=0, nbytes=0):
+    """Adds one sample to a timer."""
+    if not enabled:
+        return
+    with _lock:
+        stats = _timer(name)
+        stats.count += 1
+        stats.total += seconds
+        stats.last = seconds
+        if seconds > stats.max:
+            stats.max = seconds
+        stats.lines += lines
+        stats.bytes += nbytes
+
+
+class _Span:
+    """Times a with-block; set .lines and .bytes inside it to record what it processed."""
+
+    __slots__ = ("name", "lines", "bytes", "_started")
+
+    def __init__(self, name, lines=0, nbytes=0):
+        self.name = name
+        self.lines = lines
+        self.bytes = nbytes
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self._started, self.lines, self.bytes)
+        return False
+
+
+class _NullSpan:
+    """Stands in for _Span while instrumentation is off; attribute writes are ignored."""
+
+    lines = 0
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def timed(name, lines=0, nbytes=0):
+    """Context manager timing a block under name: `with timed("filter") as span: ... span.lines = n`."""
+    return _Span(name, lines, nbytes) if enabled else _NULL_SPAN
+
+
+def count(name, n=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name, value):
+    """Records the latest value of a sampled quantity (and keeps its maximum)."""
+    if not enabled:
+        return
+    with _lock:
+        previous = _gauges.get(name)
+        _gauges[name] = (value, value if previous is None else max(previous[1], value))
+
+
+def add_lines(name, lines, nbytes=0):
+    """Adds processed lines/bytes to a timer without adding a timing sample."""
+    if not enabled:
+        return
+    with _lock:
+        stats = _timer(name)
+        stats.lines += lines
+        stats.bytes += nbytes
+
+
+def counted(iterable, name, counter=False):
+    """
+    Yields from iterable and, once it is exhausted or closed, adds the number of items
+    to the lines of timer name (or to counter name with counter=True).
+    Returns iterable unchanged when instrumentation is off.
+    """
+    if not enabled:
+        return iterable
+    return _counted(iterable, name, counter)
+
+
+def _counted(iterable, name, counter):
+    n = 0
+    try:
+        for item in iterable:
+            n += 1
+            yield item
+    finally:
+        if counter:
+            count(name, n)
+        else:
+            add_lines(name, n)
+
+# -------------------------------------------------------------------
+# Reading
+# -------------------------------------------------------------------
+def snapshot():
+    """Returns every metric as a JSON-serializable dict."""
+    with _lock:
+        return {
+            "enabled": enabled,
+            "taken": datetime.now().isoformat(timespec="seconds"),
+            "timers": {name: stats.as_dict() for name, stats in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+            "gauges": {name: {"value": value, "max": peak} for name, (value, peak) in sorted(_gauges.items())},
+        }
+
+
+def format_snapshot(snap):
+    """Renders a snapshot as fixed-width text for the Diagnostics tab."""
+    lines = [f"Instrumentation {'on' if snap['enabled'] else 'off'} - {snap['taken']}", ""]
+    lines.append(f"{'timer':<28}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}{'lines/s':>12}{'MB/s':>9}")
+    for name, t in snap["timers"].items():
+        lps = f"{t['lines_per_second']:,}" if t["lines_per_second"] else "-"
+        mbs = f"{t['bytes_per_second'] / 1e6:.1f}" if t["bytes_per_second"] else "-"
+        lines.append(f"{name:<28}{t['count']:>8}{t['total_seconds']:>10.3f}{t['mean_ms']:>10.2f}"
+                     f"{t['max_ms']:>10.2f}{lps:>12}{mbs:>9}")
+    lines.append("")
+    lines.append(f"{'counter':<28}{'value':>14}")
+    for name, value in snap["counters"].items():
+        lines.append(f"{name:<28}{value:>14,}")
+    lines.append("")
+    lines.append(f"{'gauge':<28}{'value':>14}{'max':>14}")
+    for name, g in snap["gauges"].items():
+        lines.append(f"{name:<28}{g['value']:>14,}{g['max']:>14,}")
+    return "\n".join(lines) + "\n"
+
+
+def _dump_path(prefix, suffix):
+    os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+    return os.path.join(DIAGNOSTICS_DIR, f"{prefix}_{datetime.now():%Y%m%d_%H%M%S}{suffix}")
+
+
+def dump_json(path=None):
+    """Writes snapshot() as JSON (default: under DIAGNOSTICS_DIR) and returns the path."""
+    path = path or _dump_path("diagnostics", ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+    return path
+
+# -------------------------------------------------------------------
+# Profiling
+# -------------------------------------------------------------------
+_profile_lock = threading.Lock()
+_main_profile = None
+_job_profiles = []
+
+
+def profiling():
+    return _main_profile is not None
+
+
+def start_profiling():
+    """Starts profiling the calling thread and every worker job started from now on."""
+    global _main_profile
+    with _profile_lock:
+        if _main_profile is not None:
+            return
+        _job_profiles.clear()
+        _main_profile = cProfile.Profile()
+    _main_profile.enable()
+
+
+def profile_call(fn, *args, **kwargs):
+    """Calls fn, under its own profiler while a profiling run is active."""
+    if _main_profile is None:
+        return fn(*args, **kwargs)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active on this thread; run unprofiled
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.disable()
+        with _profile_lock:
+            _job_profiles.append(profile)
+
+
+def stop_profiling(path=None, limit=40):
+    """
+    Stops the profiling run and writes the merged statistics to path (a .prof file, default
+    under DIAGNOSTICS_DIR) plus a text summary of the limit costliest functions next to it.
+    Returns the .prof path, or None if no run was active.
+    """
+    global _main_profile
+    with _profile_lock:
+        profile, _main_profile = _main_profile, None
+        jobs = list(_job_profiles)
+        _job_profiles.clear()
+    if profile is None:
+        return None
+    profile.disable()
+    stats = pstats.Stats(profile)
+    for job_profile in jobs:
+        stats.add(job_profile)
+    path = path or _dump_path("profile", ".prof")
+    stats.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(path, stream=text).sort_stats("cumulative").print_stats(limit)
+    with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+    return path
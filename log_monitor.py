@@ -4,8 +4,9 @@ import time
 import re
 import os
 import queue
-from config import monitoring_active, LOG_TYPES
+from config import monitoring_active, LOG_TYPES, LIVE_CLASSIFY_QUEUE_BATCHES
 from scripts.android_logs import monitor_logs
+from classifier import logcat_classifier
 
 def start_monitoring(update_live_monitor, log_queue):
     """
@@ -35,29 +36,101 @@ def stop_monitoring(update_live_monitor):
     else:
         update_live_monitor("⚠️ Monitoring is not running\n")
 
+# Windows (in seconds) over which per-category line rates are reported
+RATE_WINDOWS = (1, 5, 60)
+
+class CategoryRateCounter:
+    """Rolling per-category line counts in one-second slots, reported as lines/s per window."""
+
+    def __init__(self, categories, horizon=max(RATE_WINDOWS)):
+        self.categories = list(categories)
+        self.horizon = horizon
+        self.slots = {name: [0] * horizon for name in self.categories}
+        self.slot_second = [None] * horizon
+
+    def _slot(self, second):
+        index = second % self.horizon
+        if self.slot_second[index] != second:
+            # The slot still holds counts from horizon seconds ago; reuse it
+            self.slot_second[index] = second
+            for counts in self.slots.values():
+                counts[index] = 0
+        return index
+
+    def add(self, category, count, now=None):
+        second = int(now if now is not None else time.time())
+        self.slots[category][self._slot(second)] += count
+
+    def rates(self, now=None):
+        """Returns {category: {window: lines_per_second}} for every window in RATE_WINDOWS."""
+        second = int(now if now is not None else time.time())
+        self._slot(second)
+        result = {}
+        for name, counts in self.slots.items():
+            per_window = {}
+            for window in RATE_WINDOWS:
+                total = 0
+                for age in range(window):
+                    index = (second - age) % self.horizon
+                    if self.slot_second[index] == second - age:
+                        total += counts[index]
+                per_window[window] = total / window
+            result[name] = per_window
+        return result
+
+def classify_thread(classify_queue, log_queue, rate_interval=1.0):
+    """
+    Live classification stage, off the pipe reader thread. Classifies each
+    batch with the precompiled LOG_TYPES classifier, sends one ('categorize', ...)
+    message per batch and a ('rates', ...) snapshot every rate_interval seconds.
+    """
+    counter = CategoryRateCounter(LOG_TYPES)
+    last_report = 0.0
+    while True:
+        try:
+            lines = classify_queue.get(timeout=rate_interval)
+        except queue.Empty:
+            lines = []
+        if lines is None:
+            break
+        if lines:
+            groups = logcat_classifier.classify_lines(lines)
+            groups = {name: matched for name, matched in groups.items() if matched}
+            if groups:
+                now = time.time()
+                for name, matched in groups.items():
+                    counter.add(name, len(matched), now)
+                log_queue.put(('categorize', groups))
+        now = time.time()
+        if now - last_report >= rate_interval:
+            last_report = now
+            log_queue.put(('rates', counter.rates(now)))
+
 def monitor_thread(update_live_monitor, log_queue):
     """
     Actual background thread that calls monitor_logs with a callback.
     Reads until user presses Stop or the process ends.
     """
+    # Bounded, so a classifier falling behind drops batches instead of growing without limit
+    classify_queue = queue.Queue(maxsize=LIVE_CLASSIFY_QUEUE_BATCHES)
+    classifier = threading.Thread(target=classify_thread, args=(classify_queue, log_queue), daemon=True)
+    classifier.start()
     try:
-        def handle_log(log):
-            # Put updates in the queue so they appear in the main UI
-            log_queue.put(('update', log))
-            # Optional categorization:
-            # for log_type, info in LOG_TYPES.items():
-            #     if re.search(info["pattern"], log, re.IGNORECASE):
-            #         log_queue.put(('categorize', (log_type, log)))
-        monitor_logs(handle_log)
+        def handle_batch(lines, dropped):
+            # One queue message per batch; the UI applies it with a single insert
+            log_queue.put(('batch', (lines, dropped)))
+            # Categorization runs on its own thread so the reader never waits on regexes
+            if lines:
+                try:
+                    classify_queue.put_nowait(lines)
+                except queue.Full:
+                    log_queue.put(('uncategorized', len(lines)))
+        monitor_logs(handle_batch, should_continue=lambda: monitoring_active)
     except Exception as e:
         log_queue.put(('error', f"Monitoring error: {str(e)}"))
     finally:
-        try:
-            # Terminate the process (if not already terminated)
-            process = None
-            # (The monitor_logs function internally terminates its process.)
-        except Exception as term_e:
-            log_queue.put(('error', f"Error terminating process: {term_e}"))
+        # The classifier drains the queue, so the stop marker always gets in
+        classify_queue.put(None)
         # Use the global monitoring_active value directly (do not re-import)
         global monitoring_active
         if not monitoring_active:
@@ -1,21 +1,37 @@
 import os
 import queue
+import time
+import startup_timing
+
+# Time every import below when started with --startup-timing
+if startup_timing.requested():
+    startup_timing.enable()
+
 import tkinter as tk
 import tkinter.ttk as ttk
-import matplotlib.pyplot as plt
 from tkinter import messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import threading  # Import the threading module
 
-from config import LOG_TYPES, log_queue
+# matplotlib, pandas (graphing) and fpdf (reporting) are imported on first use
+# of the Graphs tab or an export, so extraction-only sessions never load them
+from config import LOG_TYPES, LOG_FILES, BG_COLOR, FG_COLOR, DIAGNOSTICS_REFRESH_MS, LIVE_MAX_LINES, log_queue
 from gui import (create_main_window, setup_style, create_tabs, create_widgets,
-                 create_live_monitoring_buttons, create_graph_controls,
-                 create_filter_controls, create_filter_output, create_export_frame, create_menu)
+                 create_live_monitoring_buttons, create_live_rate_label, create_graph_controls,
+                 create_filter_controls, create_filter_output, create_export_frame, create_menu,
+                 create_log_viewer, create_diagnostics_controls, set_viewer_pool)
 from log_monitor import start_monitoring, stop_monitoring
-from graphing import plot_graph, plot_frequent_callers, export_chart, export_graph_data
-from filtering import filter_logs, load_filtered_logs, save_filtered_logs
-from reporting import export_full_report
-from scripts.android_logs import get_logcat, get_call_logs, get_sms_logs
+from filtering import (filter_logs, save_filtered_logs, append_filtered_batch,
+                       show_filter_summary)
+from workers import UIDispatcher, WorkerPool
+from scripts.android_logs import get_all_logs
+from scripts.incremental_logcat import category_file_path
+from record_store import ensure_ingested
+from evidence import pack_logs
+from token_index import ensure_indexes
+import filter_cache
+from aggregation import get_summaries, describe
+import instrumentation
+
+startup_timing.mark("imports")
 
 # Initialize log queue
 log_queue = queue.Queue()
@@ -24,6 +40,13 @@ log_queue = queue.Queue()
 root = create_main_window()
 setup_style(root)
 
+# Background jobs run on a bounded pool; their widget updates are applied on the UI thread
+ui_dispatcher = UIDispatcher()
+ui_dispatcher.start(root)
+worker_pool = WorkerPool(ui_dispatcher)
+# Viewers index the files they show on the pool, not on the UI thread
+set_viewer_pool(worker_pool)
+
 # Create main tabs and widgets
 tabs, tab_control = create_tabs(root)
 widgets = create_widgets(tabs)
@@ -36,128 +59,112 @@ analysis_widgets = {}
 # -------------------------------------------------------------------
 # NEW FUNCTION: Categorize logcat logs into Logcat Types sub-tabs
 # -------------------------------------------------------------------
-import re
-def categorize_logcat_logs():
-    try:
-        with open("logs/android_logcat.txt", "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-    except FileNotFoundError:
-        return
-
-    # Clear previous content in each Logcat Types text widget
+def show_categorized_logs():
+    """
+    Shows each Logcat Types tab from the category file written during extraction (each
+    line is in its first matching category), served from disk and scrolled to its end.
+    """
     for log_type in LOG_TYPES:
-        text_widget = widgets["logcat_type_texts"][log_type]
-        text_widget.config(state=tk.NORMAL)
-        text_widget.delete(1.0, tk.END)
-        text_widget.config(state=tk.DISABLED)
-
-    # Process each line from the logcat file
-    for line in lines:
-        matched = False
-        for log_type, info in LOG_TYPES.items():
-            pattern = info["pattern"]
-            if re.search(pattern, line, re.IGNORECASE):
-                text_widget = widgets["logcat_type_texts"].get(log_type)
-                if text_widget:
-                    text_widget.config(state=tk.NORMAL)
-                    text_widget.insert(tk.END, line + "\n")
-                    text_widget.see(tk.END)
-                    text_widget.config(state=tk.DISABLED)
-                matched = True
-                break  # Insert line only into the first matching category
-        if not matched:
-            # Optionally, handle lines that do not match any category
-            pass
+        viewer = widgets["logcat_type_texts"].get(log_type)
+        if viewer:
+            viewer.load_file(category_file_path(log_type), missing_text=f"No {log_type} logs.",
+                             on_loaded=lambda viewer=viewer: viewer.jump_to_line(viewer.line_count))
+
+def log_viewers():
+    """All virtualized viewers that may map the acquired log files or the category files."""
+    return ([widgets["logcat_text"], widgets["all_logs_text"], filter_output_widget]
+            + list(widgets["logcat_type_texts"].values()) + list(analysis_widgets.values()))
+
+def write_extract_output(message):
+    widgets["output_text"].config(state=tk.NORMAL)
+    widgets["output_text"].insert(tk.END, message)
+    widgets["output_text"].see(tk.END)
+    widgets["output_text"].config(state=tk.DISABLED)
 
 # -------------------------------------------------------------------
 # Add Extract Logs Button in the "Extract Logs" tab
 # -------------------------------------------------------------------
-def extract_logs():
-    widgets["output_text"].config(state=tk.NORMAL)
-    widgets["output_text"].insert(tk.END, "Starting log extraction...\n")
-    widgets["output_text"].see(tk.END)
-    # Remove try/except so errors cause a crash (as requested)
-    get_logcat()
-    get_call_logs()
-    get_sms_logs()
-    # Reload logcat logs into "Logcat Logs" tab
-    with open("logs/android_logcat.txt", "r", encoding="utf-8") as f:
-        data = f.read()
-    widgets["logcat_text"].delete(1.0, tk.END)
-    widgets["logcat_text"].insert(tk.END, data)
-
-    # Load all logs into "All Logs" text widget
-    all_text = ""
-    log_files = [("Logcat", "logs/android_logcat.txt"),
-                 ("Call", "logs/call_logs.txt"),
-                 ("SMS", "logs/sms_logs.txt")]
-    for title, path in log_files:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as ff:
-                all_text += f"\n===== {title} Logs =====\n" + ff.read() + "\n"
-        else:
-            all_text += f"\n⚠️ {title} log file not found.\n"
-    widgets["all_logs_text"].delete(1.0, tk.END)
-    widgets["all_logs_text"].insert(tk.END, all_text)
-
-    # Categorize logcat lines into logcat types sub-tabs
-    categorize_logcat_logs()
+def extract_logs(job, incremental=False):
+    """Acquires and parses the logs on a worker thread; every widget update is posted to the UI thread."""
+    # logcat, call log and SMS are pulled concurrently; a failed logcat dump raises
+    def progress(name, size, seconds, finished):
+        state = "done" if finished else "receiving"
+        job.post(write_extract_output, f"  {name}: {state}, {size / 1024:.0f} KB in {seconds:.1f}s\n")
+    started = time.perf_counter()
+    _, categorized, appended = get_all_logs(progress=progress, incremental=incremental)
+    job.post(write_extract_output, f"Acquisition finished in {time.perf_counter() - started:.1f}s\n")
+    if appended:
+        added = sum(categorized.values())
+        job.post(write_extract_output, f"Incremental logcat: {added} new categorized entries appended\n")
+    # Parse the acquired files once so graphs, filters and reports can query them;
+    # an incrementally extended logcat was already updated in place
+    for source in LOG_FILES:
+        ensure_ingested(source)
+        # Results cached for the replaced files are never valid again
+        filter_cache.invalidate(LOG_FILES[source])
+    # Index every word once so keyword searches in the Filter tab skip the full scan;
+    # an incrementally extended logcat already had its index extended
+    for source, index in ensure_indexes().items():
+        if index is not None:
+            job.post(write_extract_output, f"  {source}: {len(index.terms)} distinct words indexed\n")
+    # Seal copies of the acquired files into compressed, hashed evidence containers
+    for source, index in pack_logs().items():
+        if index is not None and index.compressed_size:
+            ratio = index.source_size / index.compressed_size
+            job.post(write_extract_output, f"  {source}: {len(index.chunks)} evidence chunks, {ratio:.1f}x compressed\n")
+    # One summary scan per source, shared with the graphs and the report
+    for summary in get_summaries().values():
+        job.post(write_extract_output, f"  {describe(summary)}\n")
+    # Fill the logcat types sub-tabs
+    job.post(show_categorized_logs)
+    job.post(show_extracted_logs)
+
+def show_extracted_logs():
+    # Reload logcat logs into "Logcat Logs" tab (rendered from disk, page by page)
+    widgets["logcat_text"].load_file("logs/android_logcat.txt")
+
+    # Load all logs into "All Logs" viewer
+    widgets["all_logs_text"].load_files([
+        (f"===== {title} Logs =====", path, f"\n⚠️ {title} log file not found.")
+        for title, path in [("Logcat", "logs/android_logcat.txt"),
+                            ("Call", "logs/call_logs.txt"),
+                            ("SMS", "logs/sms_logs.txt")]
+    ])
 
     # ---------------------------------------------
     # Populate the Analysis Notebook with real logs
     # ---------------------------------------------
-    # 1) Call Logs
-    if os.path.exists("logs/call_logs.txt"):
-        with open("logs/call_logs.txt", "r", encoding="utf-8", errors="replace") as f_call:
-            call_data = f_call.read()
-    else:
-        call_data = "No call logs found."
-    analysis_widgets["call_log_text"].config(state=tk.NORMAL)
-    analysis_widgets["call_log_text"].delete(1.0, tk.END)
-    analysis_widgets["call_log_text"].insert(tk.END, call_data)
-    analysis_widgets["call_log_text"].config(state=tk.DISABLED)
-
-    # 2) SMS Logs
-    if os.path.exists("logs/sms_logs.txt"):
-        with open("logs/sms_logs.txt", "r", encoding="utf-8", errors="replace") as f_sms:
-            sms_data = f_sms.read()
-    else:
-        sms_data = "No SMS logs found."
-    analysis_widgets["sms_text"].config(state=tk.NORMAL)
-    analysis_widgets["sms_text"].delete(1.0, tk.END)
-    analysis_widgets["sms_text"].insert(tk.END, sms_data)
-    analysis_widgets["sms_text"].config(state=tk.DISABLED)
-
-    # 3) Logcat
-    if os.path.exists("logs/android_logcat.txt"):
-        with open("logs/android_logcat.txt", "r", encoding="utf-8", errors="replace") as f_lcat:
-            logcat_data = f_lcat.read()
-    else:
-        logcat_data = "No raw logcat data available."
-    analysis_widgets["logcat_text"].config(state=tk.NORMAL)
-    analysis_widgets["logcat_text"].delete(1.0, tk.END)
-    analysis_widgets["logcat_text"].insert(tk.END, logcat_data)
-    analysis_widgets["logcat_text"].config(state=tk.DISABLED)
+    analysis_widgets["call_log_text"].load_file("logs/call_logs.txt", missing_text="No call logs found.")
+    analysis_widgets["sms_text"].load_file("logs/sms_logs.txt", missing_text="No SMS logs found.")
+    analysis_widgets["logcat_text"].load_file("logs/android_logcat.txt", missing_text="No raw logcat data available.")
 
     # The "Filter" tab is left as placeholder. You could show "logs/filtered_logs.txt" here if desired.
 
-    widgets["output_text"].insert(tk.END, "✅ Logs extracted successfully!\n")
-    widgets["output_text"].see(tk.END)
-    widgets["output_text"].config(state=tk.DISABLED)
+    write_extract_output("✅ Logs extracted successfully!\n")
 
-# --- THREADED FUNCTION WRAPPER for extract_logs ---
+# --- WORKER WRAPPER for extract_logs ---
 def extract_logs_threaded():
-    """Runs the extract_logs function in a separate thread to avoid freezing the GUI."""
-    thread = threading.Thread(target=extract_logs, daemon=True)
-    thread.start()
+    """Runs extract_logs on the worker pool to avoid freezing the GUI."""
+    write_extract_output("Starting log extraction...\n")
+    # Release the mapped log files before the extraction rewrites them
+    for viewer in log_viewers():
+        viewer.clear()
+    worker_pool.submit("extract", extract_logs, incremental_var.get(), pass_job=True,
+                       on_error=lambda e: write_extract_output(f"❌ Log extraction failed: {e}\n"))
 
 extract_button = tk.Button(tabs["Extract"], text="Extract Logs", bg="gray", fg="black", command=extract_logs_threaded)
 extract_button.pack(pady=5)
+incremental_var = tk.BooleanVar(value=False)
+incremental_check = tk.Checkbutton(tabs["Extract"], text="Incremental logcat (append only new entries)",
+                                   variable=incremental_var, bg=BG_COLOR, fg=FG_COLOR, selectcolor=BG_COLOR,
+                                   activebackground=BG_COLOR, activeforeground=FG_COLOR)
+incremental_check.pack()
 
 # -------------------------------------------------------------------
 # Create live monitoring buttons and assign commands
 # -------------------------------------------------------------------
 start_btn, stop_btn = create_live_monitoring_buttons(tabs["Live"])
+live_rate_label = create_live_rate_label(tabs["Live"])
 # This part is already well-designed with a queue, so no changes are needed here.
 start_btn.configure(command=lambda: start_monitoring(lambda log: log_queue.put(('update', log)), log_queue))
 stop_btn.configure(command=lambda: stop_monitoring(lambda log: log_queue.put(('update', log))))
@@ -168,24 +175,57 @@ stop_btn.configure(command=lambda: stop_monitoring(lambda log: log_queue.put(('u
 graph_controls = create_graph_controls(tabs["Graphs"])
 graph_controls["logtype_combo"]["values"] = ["Call Logs", "SMS Logs", "Logcat Activity"]
 graph_controls["logtype_combo"].set("Call Logs")
-graph_fig, graph_ax = plt.subplots(figsize=(7, 4))
-graph_canvas = FigureCanvasTkAgg(graph_fig, master=tabs["Graphs"])
-graph_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=10)
+# The figure and canvas are created the first time the Graphs tab or a graph export needs them
+graph_state = {}
+
+def ensure_graph_canvas():
+    """Imports matplotlib and creates the graph figure and canvas once. Returns (fig, ax, canvas)."""
+    if not graph_state:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        fig = Figure(figsize=(7, 4))
+        ax = fig.add_subplot()
+        canvas = FigureCanvasTkAgg(fig, master=tabs["Graphs"])
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=10)
+        graph_state.update(fig=fig, ax=ax, canvas=canvas)
+    return graph_state["fig"], graph_state["ax"], graph_state["canvas"]
+
+def on_tab_changed(event):
+    if tab_control.select() == str(tabs["Graphs"]):
+        ensure_graph_canvas()
+
+tab_control.bind("<<NotebookTabChanged>>", on_tab_changed, add="+")
+
+# --- WORKER WRAPPERS for plotting ---
+def show_graph(spec):
+    from graphing import render_graph
+    _, graph_ax, graph_canvas = ensure_graph_canvas()
+    with instrumentation.timed("plot.render"):
+        render_graph(graph_ax, graph_canvas, spec)
+
+def compute_graph_job(log_type, time_range, bucket):
+    from graphing import compute_graph
+    with instrumentation.timed("plot.compute"):
+        return compute_graph(log_type, time_range, bucket)
+
+def compute_frequent_callers_job(time_range):
+    from graphing import compute_frequent_callers
+    with instrumentation.timed("plot.compute"):
+        return compute_frequent_callers(time_range)
 
-# --- THREADED FUNCTION WRAPPERS for plotting ---
 def plot_graph_threaded():
-    """Runs plot_graph in a thread to prevent freezing."""
-    # Get values from widgets in the main thread before passing to the new thread
+    """Computes the graph on the worker pool; drawing happens on the UI thread."""
+    # Get values from widgets in the main thread before passing to the worker
     log_type = graph_controls["logtype_combo"].get()
     time_range = graph_controls["time_combo"].get()
-    thread = threading.Thread(target=plot_graph, args=(graph_ax, graph_canvas, log_type, time_range), daemon=True)
-    thread.start()
+    bucket = graph_controls["bucket_combo"].get()
+    # A newer graph request supersedes one that is still being computed
+    worker_pool.submit("graph", compute_graph_job, log_type, time_range, bucket, on_done=show_graph)
 
 def plot_frequent_callers_threaded():
-    """Runs plot_frequent_callers in a thread to prevent freezing."""
+    """Computes the top callers chart on the worker pool."""
     time_range = graph_controls["time_combo"].get()
-    thread = threading.Thread(target=plot_frequent_callers, args=(graph_ax, graph_canvas, time_range), daemon=True)
-    thread.start()
+    worker_pool.submit("graph", compute_frequent_callers_job, time_range, on_done=show_graph)
 
 graph_controls["graph_btn"].configure(command=plot_graph_threaded)
 graph_controls["freq_btn"].configure(command=plot_frequent_callers_threaded)
@@ -195,23 +235,57 @@ graph_controls["freq_btn"].configure(command=plot_frequent_callers_threaded)
 # -------------------------------------------------------------------
 export_controls = create_export_frame(root)
 
-# --- THREADED FUNCTION WRAPPERS for exporting ---
+# --- WORKER WRAPPERS for exporting ---
+def set_export_status(text):
+    export_controls["status"].config(text=text)
+
+def generate_report(job):
+    from reporting import generate_full_report
+    def progress(step, done, total):
+        job.post(set_export_status, f"Report: {step} ({done}/{total})")
+    with instrumentation.timed("report"):
+        return generate_full_report(progress=progress)
+
+def report_finished(path):
+    set_export_status("")
+    messagebox.showinfo("Report Generated", f"Forensic report exported to {path}")
+
+def report_failed(e):
+    set_export_status("")
+    messagebox.showerror("Report Generation Failed", f"Failed to generate report: {str(e)}")
+
 def export_full_report_threaded():
-    """Runs export_full_report in a thread."""
-    thread = threading.Thread(target=export_full_report, daemon=True)
-    thread.start()
+    """Runs generate_full_report on the worker pool, showing its progress next to the export buttons."""
+    set_export_status("Report: collecting statistics...")
+    worker_pool.submit("report", generate_report, pass_job=True, on_done=report_finished, on_error=report_failed)
+
+def save_chart_job(fig, filename):
+    from graphing import save_chart
+    return save_chart(fig, filename)
 
 def export_chart_threaded(file_format):
-    """Runs export_chart in a thread."""
-    thread = threading.Thread(target=export_chart, args=(graph_fig, f"graph_export.{file_format}"), daemon=True)
-    thread.start()
+    """Saves the current chart on the worker pool."""
+    graph_fig, _, _ = ensure_graph_canvas()
+    worker_pool.submit(f"chart_{file_format}", save_chart_job, graph_fig, f"graph_export.{file_format}",
+        on_done=lambda path: messagebox.showinfo("Export Successful", f"Chart exported to {path}"),
+        on_error=lambda e: messagebox.showerror("Export Failed", f"Failed to export chart: {str(e)}"))
+
+def save_graph_data_job(data):
+    from graphing import save_graph_data
+    return save_graph_data(data)
 
 def export_graph_data_threaded():
-    """Runs export_graph_data in a thread."""
-    time_range = graph_controls["time_combo"].get()
-    log_type = graph_controls["logtype_combo"].get()
-    thread = threading.Thread(target=export_graph_data, args=(graph_ax, time_range, log_type), daemon=True)
-    thread.start()
+    """Reads the plotted data on the UI thread and writes the CSV on the worker pool."""
+    data = None
+    if graph_state:
+        from graphing import get_graph_data
+        data = get_graph_data(graph_state["ax"])
+    if not data:
+        messagebox.showwarning("Export Warning", "No graph data to export.")
+        return
+    worker_pool.submit("graph_data", save_graph_data_job, data,
+        on_done=lambda path: messagebox.showinfo("Export Successful", f"Data exported to {path}"),
+        on_error=lambda e: messagebox.showerror("Export Failed", f"Failed to export data: {str(e)}"))
 
 export_controls["full"].configure(command=export_full_report_threaded)
 export_controls["png"].configure(command=lambda: export_chart_threaded("png"))
@@ -223,13 +297,8 @@ export_controls["csv"].configure(command=export_graph_data_threaded)
 # -------------------------------------------------------------------
 filter_controls = create_filter_controls(tabs["Filter"])
 filter_output_widget = create_filter_output(tabs["Filter"])
-def apply_filter():
-    chosen_logtype = filter_controls["logtype"].get()
-    chosen_time_range = filter_controls["time"].get()
-    chosen_severity = filter_controls["severity"].get()
-    chosen_subtype = filter_controls["subtype"].get()
-    chosen_keyword = filter_controls["keyword"].get()
-
+def apply_filter(job, chosen_logtype, chosen_time_range, chosen_severity, chosen_subtype, chosen_keyword,
+                 chosen_query):
     if chosen_logtype == "Logcat":
         input_file = "logs/android_logcat.txt"
     elif chosen_logtype == "Calls":
@@ -239,25 +308,81 @@ def apply_filter():
     else:
         input_file = "logs/android_logcat.txt"
 
-    filter_logs(
+    # Matches are streamed to the Filter tab as they are found
+    return filter_logs(
         input_file,
         keyword=chosen_keyword,
         time_range=chosen_time_range,
         severity=chosen_severity,
         subtype=chosen_subtype,
-        output_file="logs/filtered_logs.txt"
+        query=chosen_query,
+        output_file="logs/filtered_logs.txt",
+        on_batch=lambda first_index, lines: job.post(append_filtered_batch, filter_output_widget, first_index, lines),
+        should_continue=job.should_continue
     )
-    load_filtered_logs(filter_output_widget)
 
-# --- THREADED FUNCTION WRAPPER for filtering ---
+# --- WORKER WRAPPER for filtering ---
 def apply_filter_threaded():
-    """Runs apply_filter in a thread."""
-    thread = threading.Thread(target=apply_filter, daemon=True)
-    thread.start()
+    """Runs apply_filter on the worker pool; re-clicking Apply cancels a filter still running."""
+    # Read the controls on the UI thread
+    params = (filter_controls["logtype"].get(), filter_controls["time"].get(), filter_controls["severity"].get(),
+              filter_controls["subtype"].get(), filter_controls["keyword"].get(), filter_controls["query"].get())
+    # Unmap the previous results before the worker rewrites the output file
+    filter_output_widget.clear()
+    worker_pool.submit("filter", apply_filter, *params, pass_job=True,
+        on_done=lambda count: show_filter_summary(filter_output_widget, count),
+        on_error=lambda e: filter_output_widget.show_text(f"❌ Error filtering logs: {e}\n"))
 
 filter_controls["apply"].configure(command=apply_filter_threaded)
 filter_controls["save"].configure(command=save_filtered_logs) # Saving is usually fast, but can be threaded if needed
 
+# -------------------------------------------------------------------
+# Diagnostics tab: live instrumentation metrics, JSON dumps and profiling
+# -------------------------------------------------------------------
+diagnostics_controls = create_diagnostics_controls(tabs["Diagnostics"], instrumentation.enabled)
+
+def refresh_diagnostics():
+    """Re-renders the metrics table while the Diagnostics tab is visible."""
+    if not root.winfo_exists():
+        return
+    if tab_control.select() == str(tabs["Diagnostics"]):
+        text = diagnostics_controls["text"]
+        view = text.yview()
+        text.config(state=tk.NORMAL)
+        text.delete(1.0, tk.END)
+        text.insert(tk.END, instrumentation.format_snapshot(instrumentation.snapshot()))
+        text.yview_moveto(view[0])
+        text.config(state=tk.DISABLED)
+    root.after(DIAGNOSTICS_REFRESH_MS, refresh_diagnostics)
+
+def toggle_instrumentation():
+    instrumentation.set_enabled(diagnostics_controls["enabled"].get())
+
+def dump_diagnostics():
+    try:
+        path = instrumentation.dump_json()
+        messagebox.showinfo("Diagnostics", f"Metrics written to {path}")
+    except Exception as e:
+        messagebox.showerror("Diagnostics", f"Failed to write metrics: {str(e)}")
+
+def toggle_profiling():
+    if not instrumentation.profiling():
+        instrumentation.start_profiling()
+        diagnostics_controls["profile"].config(text="Stop Profiling & Save")
+        return
+    diagnostics_controls["profile"].config(text="Start Profiling")
+    try:
+        path = instrumentation.stop_profiling()
+        messagebox.showinfo("Diagnostics", f"Profile written to {path} (summary in the .txt next to it)")
+    except Exception as e:
+        messagebox.showerror("Diagnostics", f"Failed to write profile: {str(e)}")
+
+diagnostics_controls["enable_check"].configure(command=toggle_instrumentation)
+diagnostics_controls["reset"].configure(command=instrumentation.reset)
+diagnostics_controls["dump"].configure(command=dump_diagnostics)
+diagnostics_controls["profile"].configure(command=toggle_profiling)
+refresh_diagnostics()
+
 # -------------------------------------------------------------------
 # Create main menu
 # -------------------------------------------------------------------
@@ -286,35 +411,83 @@ for i in range(menu.index("end") + 1):
 # -------------------------------------------------------------------
 def update_live_monitor(log):
     widgets["live_text"].config(state=tk.NORMAL)
-    widgets["live_text"].insert(tk.END, log)
+    with instrumentation.timed("tk.insert", lines=log.count("\n")):
+        widgets["live_text"].insert(tk.END, log)
     widgets["live_text"].see(tk.END)
-    if int(widgets["live_text"].index('end-1c').split('.')[0]) > 1000:
-        widgets["live_text"].delete(1.0, "100.0")
+    # Keep only the newest LIVE_MAX_LINES lines, trimmed with a single delete
+    line_count = int(widgets["live_text"].index('end-1c').split('.')[0])
+    if line_count > LIVE_MAX_LINES:
+        widgets["live_text"].delete(1.0, f"{line_count - LIVE_MAX_LINES + 1}.0")
     widgets["live_text"].config(state=tk.DISABLED)
 
+# -------------------------------------------------------------------
+# Show rolling per-category rates so crash/ANR spikes stand out live
+# -------------------------------------------------------------------
+def update_live_rates(rates):
+    parts = []
+    for log_type, per_window in rates.items():
+        if any(per_window.values()):
+            parts.append(f"{log_type}: " + "/".join(f"{per_window[w]:.1f}" for w in sorted(per_window)))
+    text = "Category rates (lines/s, 1s/5s/60s): " + (" | ".join(parts) if parts else "idle")
+    crash_spike = rates.get("Crash", {}).get(1, 0) > 0
+    live_rate_label.config(text=text, fg="red" if crash_spike else FG_COLOR)
+
 # -------------------------------------------------------------------
 # Process log queue periodically
 # -------------------------------------------------------------------
 def process_log_queue():
     if not root.winfo_exists():
         return
+    if instrumentation.enabled:
+        instrumentation.gauge("log_queue.depth", log_queue.qsize())
     try:
+        # Live lines from every batch received this tick are coalesced into one insert,
+        # and classified lines into one append per Logcat Types tab
+        live_lines = []
+        categorized = {}
+        dropped = 0
+        uncategorized = 0
         while not log_queue.empty():
             entry_type, data = log_queue.get_nowait()
+            if entry_type == 'batch':
+                lines, batch_dropped = data
+                live_lines.extend(lines)
+                if len(live_lines) > LIVE_MAX_LINES:
+                    del live_lines[:-LIVE_MAX_LINES]
+                dropped += batch_dropped
+                continue
+            if live_lines:
+                update_live_monitor("\n".join(live_lines) + "\n")
+                live_lines = []
             if entry_type == 'update':
                 update_live_monitor(data + "\n")
             elif entry_type == 'categorize':
-                log_type, log_line = data
-                text_widget = widgets["logcat_type_texts"].get(log_type)
-                if text_widget:
-                    text_widget.config(state=tk.NORMAL)
-                    text_widget.insert(tk.END, log_line + "\n")
-                    text_widget.see(tk.END)
-                    text_widget.config(state=tk.DISABLED)
+                for log_type, log_lines in data.items():
+                    pending = categorized.setdefault(log_type, [])
+                    pending.extend(log_lines)
+                    if len(pending) > LIVE_MAX_LINES:
+                        del pending[:-LIVE_MAX_LINES]
+            elif entry_type == 'uncategorized':
+                uncategorized += data
+            elif entry_type == 'rates':
+                update_live_rates(data)
             elif entry_type == 'error':
                 messagebox.showerror("Monitoring Error", data)
             elif entry_type == 'status':
                 update_live_monitor(f"⭐ {data}\n")
+        if live_lines:
+            update_live_monitor("\n".join(live_lines) + "\n")
+        if dropped:
+            update_live_monitor(f"⚠️ {dropped} lines dropped (device output faster than display)\n")
+        if uncategorized:
+            update_live_monitor(f"⚠️ {uncategorized} lines not categorized (classifier behind)\n")
+        # Each tab keeps only its newest LIVE_MAX_LINES live lines
+        for log_type, log_lines in categorized.items():
+            viewer = widgets["logcat_type_texts"].get(log_type)
+            if viewer:
+                with instrumentation.timed("tk.insert", lines=len(log_lines)):
+                    viewer.append_text("\n".join(log_lines) + "\n")
+                viewer.jump_to_line(viewer.line_count)
     except Exception as e:
         print("Error processing log queue:", e)
     if root.winfo_exists():
@@ -325,8 +498,6 @@ process_log_queue()
 # -------------------------------------------------------------------
 # (Optional) Create a secondary notebook for analysis if desired.
 # -------------------------------------------------------------------
-from tkinter import scrolledtext
-
 analysis_notebook = ttk.Notebook(root)
 
 tab_call_log = tk.Frame(analysis_notebook)
@@ -334,21 +505,10 @@ tab_sms = tk.Frame(analysis_notebook)
 tab_logcat_secondary = tk.Frame(analysis_notebook)
 tab_filter_secondary = tk.Frame(analysis_notebook)
 
-call_log_text = scrolledtext.ScrolledText(tab_call_log, wrap=tk.WORD, bg="black", fg="lime", font=("Consolas", 10))
-call_log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-analysis_widgets["call_log_text"] = call_log_text
-
-sms_text = scrolledtext.ScrolledText(tab_sms, wrap=tk.WORD, bg="black", fg="lime", font=("Consolas", 10))
-sms_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-analysis_widgets["sms_text"] = sms_text
-
-logcat_text = scrolledtext.ScrolledText(tab_logcat_secondary, wrap=tk.WORD, bg="black", fg="lime", font=("Consolas", 10))
-logcat_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-analysis_widgets["logcat_text"] = logcat_text
-
-filter_analysis_text = scrolledtext.ScrolledText(tab_filter_secondary, wrap=tk.WORD, bg="black", fg="lime", font=("Consolas", 10))
-filter_analysis_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-analysis_widgets["filter_text"] = filter_analysis_text
+analysis_widgets["call_log_text"] = create_log_viewer(tab_call_log, padx=5, pady=5)
+analysis_widgets["sms_text"] = create_log_viewer(tab_sms, padx=5, pady=5)
+analysis_widgets["logcat_text"] = create_log_viewer(tab_logcat_secondary, padx=5, pady=5)
+analysis_widgets["filter_text"] = create_log_viewer(tab_filter_secondary, numbered=True, padx=5, pady=5)
 
 analysis_notebook.add(tab_call_log, text="Call Logs")
 analysis_notebook.add(tab_sms, text="SMS")
@@ -356,6 +516,14 @@ analysis_notebook.add(tab_logcat_secondary, text="Logcat")
 analysis_notebook.add(tab_filter_secondary, text="Filter")
 
 analysis_notebook.pack(expand=True, fill='both')
+startup_timing.mark("widgets built")
+
+def first_frame_drawn():
+    startup_timing.mark("first frame drawn")
+    startup_timing.report()
+
+if startup_timing.enabled():
+    root.after_idle(first_frame_drawn)
 
 if __name__ == "__main__":
     os.makedirs("logs", exist_ok=True)
@@ -0,0 +1,324 @@
+# record_store.py
+"""
+Parse-once record store for the acquired logcat, call and SMS files.
+
+Each source file is parsed a single time into typed records (epoch-ms
+timestamp, level/tag/pid for logcat, address/type for content rows) plus
+the byte offset and length of the record in the raw file. The records are
+kept in a SQLite database so the Graphs, Filter and Export features can
+query them instead of re-reading and re-parsing the text files. A source
+is re-ingested automatically when its file size or mtime changes.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from config import LOG_FILES, RECORD_STORE_PATH, TIME_RANGE_HOURS
+from content_rows import iter_rows
+from evidence import open_log, log_signature
+from timestamps import LogcatClock, to_ms
+import instrumentation
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    source TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logcat (
+    line_no INTEGER PRIMARY KEY,
+    ts INTEGER,
+    level TEXT,
+    tag TEXT,
+    pid INTEGER,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logcat_ts ON logcat(ts);
+CREATE TABLE IF NOT EXISTS calls (
+    row_no INTEGER PRIMARY KEY,
+    ts INTEGER,
+    address TEXT,
+    type INTEGER,
+    duration INTEGER,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    body_offset INTEGER
+);
+CREATE INDEX IF NOT EXISTS calls_ts ON calls(ts);
+CREATE TABLE IF NOT EXISTS sms (
+    row_no INTEGER PRIMARY KEY,
+    ts INTEGER,
+    address TEXT,
+    type INTEGER,
+    duration INTEGER,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    body_offset INTEGER
+);
+CREATE INDEX IF NOT EXISTS sms_ts ON sms(ts);
+"""
+
+# Serializes ingestion so two workers never rebuild the same source at once
+_ingest_lock = threading.Lock()
+
+# -------------------------------------------------------------------
+# Parsers
+# -------------------------------------------------------------------
+# Level, tag and pid after the fixed-width "MM-DD HH:MM:SS.mmm " timestamp of a `-v time` line
+_LOGCAT_TIMESTAMP_WIDTH = 19
+_LOGCAT_FIELDS_RE = re.compile(rb'([VDIWEFAS])/([^(]*?)\(\s*(\d+)\)')
+# The timestamp layout, for lines whose date does not decode (e.g. 02-30)
+_LOGCAT_LAYOUT_RE = re.compile(rb'\d\d-\d\d \d\d:\d\d:\d\d\.\d{3} ')
+
+
+def parse_logcat(f, start_line=0, start_offset=0):
+    """
+    Yields (line_no, ts, level, tag, pid, offset, length) for each line of a binary logcat file.
+    To parse only the tail of a file, seek f to start_offset and pass the number of the line there.
+    """
+    decode = LogcatClock().decode_bytes
+    match_fields = _LOGCAT_FIELDS_RE.match
+    offset = start_offset
+    for line_no, raw in enumerate(f, start_line):
+        length = len(raw)
+        ts = decode(raw)
+        if ts is not None and raw[18:19] == b" " or ts is None and _LOGCAT_LAYOUT_RE.match(raw):
+            match = match_fields(raw, _LOGCAT_TIMESTAMP_WIDTH)
+        else:
+            match = None
+        if match:
+            yield (line_no, ts, match.group(1).decode("ascii"),
+                   match.group(2).decode("utf-8", "replace").strip(), int(match.group(3)), offset, length)
+        else:
+            yield (line_no, None, None, None, None, offset, length)
+        offset += length
+
+
+def parse_content_rows(f):
+    """
+    Yields (row_no, ts, address, type, duration, offset, length, body_offset) for each
+    "Row: N ..." record of a binary `content query` dump.
+    """
+    for row in iter_rows(f):
+        address = row.get("address")
+        if address is None:
+            address = row.get("number")
+        yield (row.row_no, row.get_int("date"), address, row.get_int("type"), row.get_int("duration"),
+               row.offset, row.length, row.byte_offset("body"))
+
+# -------------------------------------------------------------------
+# Ingestion
+# -------------------------------------------------------------------
+_SOURCES = {
+    "logcat": ("logcat", parse_logcat, "INSERT INTO logcat VALUES (?, ?, ?, ?, ?, ?, ?)"),
+    "calls": ("calls", parse_content_rows, "INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?)"),
+    "sms": ("sms", parse_content_rows, "INSERT INTO sms VALUES (?, ?, ?, ?, ?, ?, ?, ?)"),
+}
+
+
+def connect(db_path=RECORD_STORE_PATH):
+    """Opens the record store, creating its schema if needed."""
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _file_signature(path):
+    # Falls back to the evidence container when the plain file was archived away
+    return log_signature(path)
+
+
+def source_for_path(path):
+    """Returns the store source name for an acquired log file path, or None."""
+    norm = os.path.normpath(path)
+    for source, source_path in LOG_FILES.items():
+        if os.path.normpath(source_path) == norm:
+            return source
+    return None
+
+
+def ingest_source(source, conn, path=None):
+    """Parses one source file into the store, replacing its previous records. Returns the record count."""
+    table, parser, insert_sql = _SOURCES[source]
+    path = path or LOG_FILES[source]
+    signature = _file_signature(path)
+    with conn:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM meta WHERE source = ?", (source,))
+        if signature is None:
+            return 0
+        with instrumentation.timed(f"parse.{source}", nbytes=signature[0]) as span:
+            with open_log(path) as f:
+                conn.executemany(insert_sql, parser(f))
+            count = span.lines = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.execute("INSERT INTO meta VALUES (?, ?, ?, ?, ?)", (source, path, signature[0], signature[1], count))
+    return count
+
+
+def ingest_appended(source, previous_size, db_path=RECORD_STORE_PATH):
+    """
+    Parses only the bytes appended to a logcat source since it was ingested at previous_size
+    and adds their records. Falls back to a full ingest if the store does not hold exactly
+    that prefix. Returns the number of records added (or the total after a full ingest).
+    """
+    table, parser, insert_sql = _SOURCES[source]
+    path = LOG_FILES[source]
+    with _ingest_lock:
+        conn = connect(db_path)
+        try:
+            row = conn.execute("SELECT path, size FROM meta WHERE source = ?", (source,)).fetchone()
+            if source != "logcat" or row is None or row[0] != path or row[1] != previous_size:
+                return ingest_source(source, conn, path)
+            signature = _file_signature(path)
+            with conn:
+                next_line = conn.execute("SELECT COALESCE(MAX(line_no) + 1, 0) FROM logcat").fetchone()[0]
+                with instrumentation.timed(f"parse.{source}", nbytes=signature[0] - previous_size) as span:
+                    with open_log(path) as f:
+                        f.seek(previous_size)
+                        cursor = conn.executemany(insert_sql, parser(f, next_line, previous_size))
+                    added = span.lines = cursor.rowcount
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                conn.execute("UPDATE meta SET size = ?, mtime_ns = ?, records = ? WHERE source = ?",
+                             (signature[0], signature[1], count, source))
+            return added
+        finally:
+            conn.close()
+
+def _is_stale(conn, source, path):
+    row = conn.execute("SELECT path, size, mtime_ns FROM meta WHERE source = ?", (source,)).fetchone()
+    signature = _file_signature(path)
+    if row is None:
+        return signature is not None
+    return row[0] != path or (row[1], row[2]) != signature
+
+
+def ingest_logs(sources=None, db_path=RECORD_STORE_PATH):
+    """
+    Parses the acquired log files into the store. Call this once after extraction.
+    Returns a dict of source -> record count.
+    """
+    counts = {}
+    with _ingest_lock:
+        conn = connect(db_path)
+        try:
+            for source in sources or LOG_FILES:
+                counts[source] = ingest_source(source, conn)
+        finally:
+            conn.close()
+    return counts
+
+
+def ensure_ingested(source, db_path=RECORD_STORE_PATH):
+    """Re-ingests a source only if its file changed since it was last parsed."""
+    path = LOG_FILES[source]
+    with _ingest_lock:
+        conn = connect(db_path)
+        try:
+            if _is_stale(conn, source, path):
+                ingest_source(source, conn, path)
+        finally:
+            conn.close()
+
+# -------------------------------------------------------------------
+# Queries
+# -------------------------------------------------------------------
+def since_ms_for_range(time_range, now=None):
+    """Returns the epoch-ms lower bound of a UI time range, or None for "All Time"."""
+    hours = TIME_RANGE_HOURS.get(time_range)
+    if hours is None:
+        return None
+    now = now or datetime.now()
+    return to_ms(now) - hours * 3600 * 1000
+
+
+def _query(source, sql, params=(), db_path=RECORD_STORE_PATH):
+    ensure_ingested(source, db_path)
+    conn = connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _since_clause(since_ms):
+    if since_ms is None:
+        return "ts IS NOT NULL", ()
+    return "ts >= ?", (since_ms,)
+
+
+def count_records(source, db_path=RECORD_STORE_PATH):
+    """Returns the number of records parsed from a source."""
+    table = _SOURCES[source][0]
+    return _query(source, f"SELECT COUNT(*) FROM {table}", db_path=db_path)[0][0]
+
+
+def get_timestamps(source, since_ms=None, db_path=RECORD_STORE_PATH):
+    """Returns the sorted epoch-ms timestamps of a source, optionally only those >= since_ms."""
+    table = _SOURCES[source][0]
+    where, params = _since_clause(since_ms)
+    rows = _query(source, f"SELECT ts FROM {table} WHERE {where} ORDER BY ts", params, db_path)
+    return [row[0] for row in rows]
+
+
+def top_addresses(source, limit=10, since_ms=None, types=None, db_path=RECORD_STORE_PATH):
+    """
+    Returns the most frequent (address, count) pairs of a call or SMS source,
+    optionally restricted to the given content-row type codes.
+    """
+    table = _SOURCES[source][0]
+    where, params = _since_clause(since_ms) if since_ms is not None else ("1", ())
+    if types:
+        where += f" AND type IN ({', '.join('?' for _ in types)})"
+        params += tuple(types)
+    sql = (f"SELECT address, COUNT(*) AS n FROM {table} WHERE {where} AND address IS NOT NULL "
+           f"AND address != '' AND address != 'NULL' GROUP BY address ORDER BY n DESC, address LIMIT ?")
+    return _query(source, sql, params + (limit,), db_path)
+
+
+def count_by_type(source, since_ms=None, db_path=RECORD_STORE_PATH):
+    """Returns a dict of content-row type code -> record count for a call or SMS source."""
+    table = _SOURCES[source][0]
+    where, params = _since_clause(since_ms) if since_ms is not None else ("1", ())
+    rows = _query(source, f"SELECT type, COUNT(*) FROM {table} WHERE {where} GROUP BY type", params, db_path)
+    return dict(rows)
+
+
+def iter_timestamped_records(source, db_path=RECORD_STORE_PATH):
+    """Yields (ts, text) for every record of a source that has a timestamp, in file order."""
+    table, _, _ = _SOURCES[source]
+    order = "line_no" if table == "logcat" else "row_no"
+    rows = _query(source, f"SELECT ts, offset, length FROM {table} WHERE ts IS NOT NULL ORDER BY {order}", (), db_path)
+    with open_log(LOG_FILES[source]) as f:
+        for ts, offset, length in rows:
+            f.seek(offset)
+            yield ts, f.read(length).decode("utf-8", "replace")
+
+
+def iter_record_text(source, since_ms=None, db_path=RECORD_STORE_PATH, located=False):
+    """
+    Yields the raw text of each record, in file order (with located, as (offset, length, text)).
+    With since_ms, records older than since_ms or without a timestamp are skipped without
+    being read.
+    """
+    table, _, _ = _SOURCES[source]
+    order = "line_no" if table == "logcat" else "row_no"
+    if since_ms is None:
+        sql, params = f"SELECT offset, length FROM {table} ORDER BY {order}", ()
+    else:
+        sql, params = f"SELECT offset, length FROM {table} WHERE ts >= ? ORDER BY {order}", (since_ms,)
+    rows = _query(source, sql, params, db_path)
+    with open_log(LOG_FILES[source]) as f:
+        position = 0
+        for offset, length in rows:
+            if offset != position:
+                f.seek(offset)
+            text = f.read(length).decode("utf-8", "replace")
+            yield (offset, length, text) if located else text
+            position = offset + length
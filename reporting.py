@@ -1,9 +1,24 @@
+"""
+PDF forensic report.
+
+The statistics behind each section are collected concurrently: one
+aggregation summary per source (device information, call and SMS counts)
+and one streaming pass per logcat category file, then rendered into the PDF
+in order. Per-category listings of today's entries are capped at
+REPORT_APPENDIX_MAX_LINES; with REPORT_APPENDIX_ATTACHMENT set, the complete
+listings are written next to the PDF as a gzip-compressed text file.
+"""
+import gzip
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from collections import Counter
 from fpdf import FPDF
-from tkinter import messagebox
+from config import (LOG_TYPES, LOG_FILES, LOGCAT_TYPES_DIR, REPORT_SECTION_WORKERS,
+                    REPORT_APPENDIX_MAX_LINES, REPORT_APPENDIX_ATTACHMENT)
+import aggregation
+import evidence
+
+REPORT_LINE_WIDTH = 100
 
 def get_todays_logs(log_lines):
     """Filters log entries to include only those from the current day."""
@@ -16,292 +31,327 @@ def get_todays_logs(log_lines):
     return todays_logs
 
 def export_full_report():
+    from tkinter import messagebox
     try:
-        os.makedirs("logs/exports", exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"logs/exports/forensic_report_{timestamp}.pdf"
-        pdf = FPDF()
+        filepath = generate_full_report()
+        messagebox.showinfo("Report Generated", f"Forensic report exported to {filepath}")
+    except Exception as e:
+        messagebox.showerror("Report Generation Failed", f"Failed to generate report: {str(e)}")
 
-        # --- Cover Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=24)
-        pdf.cell(0, 15, "FORENSIC ANALYSIS REPORT", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=16)
-        pdf.cell(0, 10, "Case Number: 123456", ln=True, align='C')
-        pdf.ln(5)
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, "Examiner: John Doe, Certified Digital Forensic Examiner", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
-        pdf.ln(20)
-        pdf.multi_cell(0, 10,
-            "This report contains digital forensic analysis of Android logs. It has been prepared in accordance with forensic investigation standards "
-            "and is intended for use as court-admissible evidence. All procedures were performed following established chain-of-custody practices.",
-            align='C'
-        )
+# -------------------------------------------------------------------
+# Section statistics
+# -------------------------------------------------------------------
+def category_log_path(log_type):
+    return os.path.join(LOGCAT_TYPES_DIR, f"{log_type.lower()}_logs.txt")
 
-        # --- Chain of Custody Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=18)
-        pdf.cell(0, 10, "Chain of Custody", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 8,
-            "1. Evidence acquired from the Android device using approved ADB tools.\n"
-            "2. Logs extracted include Android Logcat, Call Logs, and SMS Logs.\n"
-            "3. All files were verified using cryptographic hashes immediately after acquisition.\n"
-            "4. This report documents the complete process, ensuring chain-of-custody integrity.",
-            align='L'
-        )
+def _short_line(line):
+    line = line.strip()
+    return line[:REPORT_LINE_WIDTH - 3] + "..." if len(line) > REPORT_LINE_WIDTH else line
 
-        # --- Methodology Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=18)
-        pdf.cell(0, 10, "Methodology", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 8,
-            "The analysis involved the extraction of logs from the device using ADB commands. The logs were then filtered "
-            "by time range, keyword, severity, and subtype. Graphical representations were generated to illustrate key activity trends. "
-            "All steps were conducted under strict forensic protocols to preserve evidence integrity.",
-            align='L'
-        )
+def collect_log_stats(path, max_lines=REPORT_APPENDIX_MAX_LINES):
+    """
+    Streams a log file once. Returns {"total", "today", "shown"}: the number of entries,
+    the number from today, and at most max_lines of today's entries shortened for the PDF.
+    """
+    stats = {"total": 0, "today": 0, "shown": []}
+    if not evidence.log_exists(path):
+        return None
+    today_str = datetime.now().strftime("%m-%d")
+    with evidence.open_log_text(path) as f:
+        for line in f:
+            stats["total"] += 1
+            if line.strip().startswith(today_str):
+                stats["today"] += 1
+                if len(stats["shown"]) < max_lines:
+                    stats["shown"].append(_short_line(line))
+    return stats
 
-        # --- Table of Contents ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(0, 10, "Table of Contents", ln=True)
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 8, "1. Call Log Analysis", ln=True)
-        pdf.cell(0, 8, "2. SMS Log Analysis", ln=True)
-        pdf.cell(0, 8, "3. Logcat Analysis", ln=True)
-        pdf.cell(0, 8, "4. Conclusion", ln=True)
+def write_appendix_attachment(attachment_path, sections):
+    """Writes every entry from today of each (title, path) section to a gzip text file."""
+    today_str = datetime.now().strftime("%m-%d")
+    with gzip.open(attachment_path, "wt", encoding="utf-8") as out:
+        for title, path in sections:
+            if not evidence.log_exists(path):
+                continue
+            out.write(f"===== {title} =====\n")
+            with evidence.open_log_text(path) as f:
+                for line in f:
+                    if line.strip().startswith(today_str):
+                        out.write(line if line.endswith("\n") else line + "\n")
+    return attachment_path
+
+def _result(future):
+    """The section statistics, or the exception that stopped their collection."""
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+# -------------------------------------------------------------------
+# Rendering
+# -------------------------------------------------------------------
+def _render_front_matter(pdf):
+    # --- Cover Page ---
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=24)
+    pdf.cell(0, 15, "FORENSIC ANALYSIS REPORT", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=16)
+    pdf.cell(0, 10, "Case Number: 123456", ln=True, align='C')
+    pdf.ln(5)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, "Examiner: John Doe, Certified Digital Forensic Examiner", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+    pdf.ln(20)
+    pdf.multi_cell(0, 10,
+        "This report contains digital forensic analysis of Android logs. It has been prepared in accordance with forensic investigation standards "
+        "and is intended for use as court-admissible evidence. All procedures were performed following established chain-of-custody practices.",
+        align='C'
+    )
 
-        # --- Device Information Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(0, 10, "Device Information", ln=True)
+    # --- Chain of Custody Page ---
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=18)
+    pdf.cell(0, 10, "Chain of Custody", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 8,
+        "1. Evidence acquired from the Android device using approved ADB tools.\n"
+        "2. Logs extracted include Android Logcat, Call Logs, and SMS Logs.\n"
+        "3. All files were verified using cryptographic hashes immediately after acquisition.\n"
+        "4. This report documents the complete process, ensuring chain-of-custody integrity.",
+        align='L'
+    )
+
+    # --- Methodology Page ---
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=18)
+    pdf.cell(0, 10, "Methodology", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 8,
+        "The analysis involved the extraction of logs from the device using ADB commands. The logs were then filtered "
+        "by time range, keyword, severity, and subtype. Graphical representations were generated to illustrate key activity trends. "
+        "All steps were conducted under strict forensic protocols to preserve evidence integrity.",
+        align='L'
+    )
+
+    # --- Table of Contents ---
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(0, 10, "Table of Contents", ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 8, "1. Call Log Analysis", ln=True)
+    pdf.cell(0, 8, "2. SMS Log Analysis", ln=True)
+    pdf.cell(0, 8, "3. Logcat Analysis", ln=True)
+    pdf.cell(0, 8, "4. Conclusion", ln=True)
+
+def _render_device_info(pdf, logcat):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(0, 10, "Device Information", ln=True)
+    pdf.ln(5)
+    pdf.set_font("Arial", size=12)
+    if isinstance(logcat, Exception):
+        pdf.cell(0, 8, "Could not retrieve device information", ln=True)
+        return
+    for key, value in logcat.device_info.items():
+        pdf.cell(0, 8, f"{key}: {value}", ln=True)
+
+def _render_top_table(pdf, title, rows, count_label):
+    pdf.set_font("Arial", 'B', size=14)
+    pdf.cell(0, 8, title, ln=True)
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', size=12)
+    pdf.cell(90, 8, "Phone Number", border=1)
+    pdf.cell(50, 8, count_label, border=1, ln=True)
+    pdf.set_font("Arial", size=12)
+    for number, count in rows:
+        pdf.cell(90, 8, number, border=1)
+        pdf.cell(50, 8, str(count), border=1, ln=True)
+
+def _render_daily_volume(pdf, summary):
+    busiest = summary.busiest_day()
+    if busiest:
+        pdf.cell(0, 8, f"Active days: {len(summary.per_day)}", ln=True)
+        pdf.cell(0, 8, f"Busiest day: {busiest[0]:%Y-%m-%d} ({busiest[1]} records)", ln=True)
+
+def _render_call_section(pdf, summary):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(0, 10, "1. Call Log Analysis", ln=True)
+    pdf.ln(10)
+    if isinstance(summary, Exception):
+        pdf.cell(0, 8, f"Error analyzing call logs: {str(summary)}", ln=True)
+        return
+    if not summary.total:
+        pdf.cell(0, 8, "No call logs found", ln=True)
+        return
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 8, f"Total calls: {summary.total}", ln=True)
+    pdf.cell(0, 8, f"Incoming calls: {summary.incoming}", ln=True)
+    pdf.cell(0, 8, f"Outgoing calls: {summary.outgoing}", ln=True)
+    pdf.cell(0, 8, f"Missed calls: {summary.missed}", ln=True)
+    _render_daily_volume(pdf, summary)
+    pdf.ln(10)
+    top_callers = summary.top_addresses(5)
+    if top_callers:
+        _render_top_table(pdf, "Top 5 Most Frequent Callers", top_callers, "Call Count")
+    else:
+        pdf.cell(0, 8, "No phone numbers found", ln=True)
+
+def _render_sms_section(pdf, summary):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(0, 10, "2. SMS Log Analysis", ln=True)
+    pdf.ln(10)
+    if isinstance(summary, Exception):
+        pdf.cell(0, 8, f"Error analyzing SMS logs: {str(summary)}", ln=True)
+        return
+    if not summary.total:
+        pdf.cell(0, 8, "No SMS logs found", ln=True)
+        return
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 8, f"Total SMS messages: {summary.total}", ln=True)
+    pdf.cell(0, 8, f"Incoming messages: {summary.incoming}", ln=True)
+    pdf.cell(0, 8, f"Outgoing messages: {summary.outgoing}", ln=True)
+    _render_daily_volume(pdf, summary)
+    pdf.ln(10)
+    # Senders are the addresses of received (type 1) messages
+    top_senders = summary.top_addresses(5, received_only=True)
+    if top_senders:
+        _render_top_table(pdf, "Top 5 Most Frequent SMS Senders", top_senders, "Message Count")
+    else:
+        pdf.cell(0, 8, "No sender data found", ln=True)
+
+def _render_todays_entries(pdf, stats, empty_text, attachment_name):
+    if not stats["today"]:
+        pdf.set_font("Arial", size=10)
+        pdf.multi_cell(0, 8, empty_text)
+        pdf.ln(5)
+        return
+    pdf.set_font("Arial", 'B', size=12)
+    pdf.cell(0, 8, "Recent Logs from Today:", ln=True)
+    pdf.set_font("Arial", size=10)
+    for line in stats["shown"]:
+        pdf.multi_cell(0, 8, f"- {line}")
+    omitted = stats["today"] - len(stats["shown"])
+    if omitted > 0:
+        pdf.set_font("Arial", 'I', size=10)
+        where = f"see {attachment_name}" if attachment_name else "not included in this report"
+        pdf.multi_cell(0, 8, f"... {omitted} more entries from today ({where}).")
+    pdf.ln(5)
+
+def _render_logcat_section(pdf, category_stats, raw_stats, attachment_name, uncategorized):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(0, 10, "3. Logcat Analysis", ln=True)
+    pdf.ln(10)
+    # Iterate through defined log types to show categorized logcat data
+    for log_type in LOG_TYPES:
+        stats = category_stats[log_type]
+        if isinstance(stats, Exception):
+            pdf.cell(0, 8, f"Error analyzing {log_type} logs: {str(stats)}", ln=True)
+            continue
+        if not stats or not stats["total"]:
+            continue
+        pdf.set_font("Arial", 'B', size=14)
+        pdf.cell(0, 8, f"{log_type} Logs", ln=True)
         pdf.ln(5)
         pdf.set_font("Arial", size=12)
-        try:
-            device_info = {
-                "Device Model": "Unknown",
-                "Android Version": "Unknown",
-                "Kernel Version": "Unknown"
-            }
-            if os.path.exists("logs/android_logcat.txt"):
-                with open("logs/android_logcat.txt", "r", encoding="utf-8", errors="replace") as f:
-                    logs = f.read()
-            else:
-                logs = ""
-            model_match = re.search(r'model=([^,\s]+)', logs)
-            if model_match:
-                device_info["Device Model"] = model_match.group(1)
-            version_matches = re.findall(r'Android\s+(\d+(?:\.\d+)?)', logs)
-            device_version = None
-            for ver in version_matches:
-                try:
-                    if float(ver) < 15:
-                        device_version = ver
-                        break
-                except ValueError:
-                    continue
-            if device_version is not None:
-                device_info["Android Version"] = device_version
-            kernel_match = re.search(r'Linux\s+version\s+([^\s]+)', logs)
-            if kernel_match:
-                device_info["Kernel Version"] = kernel_match.group(1)
-            for key, value in device_info.items():
-                pdf.cell(0, 8, f"{key}: {value}", ln=True)
-        except Exception as e:
-            pdf.cell(0, 8, "Could not retrieve device information", ln=True)
+        pdf.cell(0, 8, f"Total entries: {stats['total']}", ln=True)
+        _render_todays_entries(pdf, stats, "No log entries found for today.", attachment_name)
 
-        # --- Call Log Analysis ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(0, 10, "1. Call Log Analysis", ln=True)
-        pdf.ln(10)
-        try:
-            if os.path.exists("logs/call_logs.txt"):
-                with open("logs/call_logs.txt", "r", encoding="utf-8", errors="replace") as f:
-                    call_logs = f.readlines()
-            else:
-                call_logs = []
-            if call_logs:
-                call_count = len(call_logs)
-                incoming = sum(1 for line in call_logs if re.search(r'type:\s*1|INCOMING', line, re.IGNORECASE))
-                outgoing = sum(1 for line in call_logs if re.search(r'type:\s*2|OUTGOING', line, re.IGNORECASE))
-                missed = sum(1 for line in call_logs if re.search(r'type:\s*3|MISSED', line, re.IGNORECASE))
-                pdf.set_font("Arial", size=12)
-                pdf.cell(0, 8, f"Total calls: {call_count}", ln=True)
-                pdf.cell(0, 8, f"Incoming calls: {incoming}", ln=True)
-                pdf.cell(0, 8, f"Outgoing calls: {outgoing}", ln=True)
-                pdf.cell(0, 8, f"Missed calls: {missed}", ln=True)
-                pdf.ln(10)
-                numbers = []
-                for line in call_logs:
-                    num_match = re.search(r'number=(\+?\d+)', line)
-                    if num_match:
-                        numbers.append(num_match.group(1))
-                    else:
-                        alt_match = re.search(r'(?:from:|to:)\s*(\+?\d+)', line)
-                        if alt_match:
-                            numbers.append(alt_match.group(1))
-                if numbers:
-                    counter = Counter(numbers)
-                    top_callers = counter.most_common(5)
-                    pdf.set_font("Arial", 'B', size=14)
-                    pdf.cell(0, 8, "Top 5 Most Frequent Callers", ln=True)
-                    pdf.ln(5)
-                    pdf.set_font("Arial", 'B', size=12)
-                    pdf.cell(90, 8, "Phone Number", border=1)
-                    pdf.cell(50, 8, "Call Count", border=1, ln=True)
-                    pdf.set_font("Arial", size=12)
-                    for number, count in top_callers:
-                        pdf.cell(90, 8, number, border=1)
-                        pdf.cell(50, 8, str(count), border=1, ln=True)
-                else:
-                    pdf.cell(0, 8, "No phone numbers found", ln=True)
-            else:
-                pdf.cell(0, 8, "No call logs found", ln=True)
-        except Exception as e:
-            pdf.cell(0, 8, f"Error analyzing call logs: {str(e)}", ln=True)
+    # If no categorized logcat data exists, include raw logcat logs
+    if not uncategorized:
+        return
+    pdf.set_font("Arial", 'B', size=14)
+    pdf.cell(0, 8, "Raw Logcat Data", ln=True)
+    pdf.ln(5)
+    if raw_stats is None:
+        pdf.cell(0, 8, "No raw logcat data available.", ln=True)
+    else:
+        pdf.set_font("Arial", size=12)
+        pdf.cell(0, 8, f"Total entries: {raw_stats['total']}", ln=True)
+        _render_todays_entries(pdf, raw_stats, "No raw log entries found for today.", attachment_name)
 
-        # --- SMS Log Analysis ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(0, 10, "2. SMS Log Analysis", ln=True)
-        pdf.ln(10)
-        try:
-            if os.path.exists("logs/sms_logs.txt"):
-                with open("logs/sms_logs.txt", "r", encoding="utf-8", errors="replace") as f:
-                    sms_logs = f.readlines()
-            else:
-                sms_logs = []
-            if sms_logs:
-                sms_count = len(sms_logs)
-                incoming = sum(1 for line in sms_logs if re.search(r'type:\s*1|INCOMING|from:', line, re.IGNORECASE))
-                outgoing = sum(1 for line in sms_logs if re.search(r'type:\s*2|OUTGOING|to:', line, re.IGNORECASE))
-                pdf.set_font("Arial", size=12)
-                pdf.cell(0, 8, f"Total SMS messages: {sms_count}", ln=True)
-                pdf.cell(0, 8, f"Incoming messages: {incoming}", ln=True)
-                pdf.cell(0, 8, f"Outgoing messages: {outgoing}", ln=True)
-                pdf.ln(10)
-                senders = []
-                for line in sms_logs:
-                    match = re.search(r'from: (\+?\d+)', line)
-                    if match:
-                        senders.append(match.group(1))
-                if senders:
-                    counter = Counter(senders)
-                    top_senders = counter.most_common(5)
-                    pdf.set_font("Arial", 'B', size=14)
-                    pdf.cell(0, 8, "Top 5 Most Frequent SMS Senders", ln=True)
-                    pdf.ln(5)
-                    pdf.set_font("Arial", 'B', size=12)
-                    pdf.cell(90, 8, "Phone Number", border=1)
-                    pdf.cell(50, 8, "Message Count", border=1, ln=True)
-                    pdf.set_font("Arial", size=12)
-                    for number, count in top_senders:
-                        pdf.cell(90, 8, number, border=1)
-                        pdf.cell(50, 8, str(count), border=1, ln=True)
-                else:
-                    pdf.cell(0, 8, "No sender data found", ln=True)
-            else:
-                pdf.cell(0, 8, "No SMS logs found", ln=True)
-        except Exception as e:
-            pdf.cell(0, 8, f"Error analyzing SMS logs: {str(e)}", ln=True)
+def _render_conclusion(pdf):
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=18)
+    pdf.cell(0, 10, "Conclusion", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 8,
+        "Based on the analysis of the Android logs, the evidence indicates activity pertinent to the case. "
+        "All analyses were conducted in accordance with forensic standards. This report is complete and is prepared for court presentation.",
+        align='L'
+    )
+    pdf.ln(10)
+    pdf.cell(0, 8, "Examiner Signature: __________________________", ln=True)
+    pdf.cell(0, 8, f"Date: {datetime.now().strftime('%Y-%m-%d')}", ln=True)
 
-        # --- Logcat Analysis ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=16)
-        pdf.cell(0, 10, "3. Logcat Analysis", ln=True)
-        pdf.ln(10)
-        from config import LOG_TYPES
-        total_categorized = 0
-        # Iterate through defined log types to show categorized logcat data
-        for log_type in LOG_TYPES:
-            try:
-                filepath = f"logs/logcat_types/{log_type.lower()}_logs.txt"
-                lines = []
-                if os.path.exists(filepath):
-                    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-                        lines = f.readlines()
-                if lines:
-                    total_categorized += len(lines)
-                    pdf.set_font("Arial", 'B', size=14)
-                    pdf.cell(0, 8, f"{log_type} Logs", ln=True)
-                    pdf.ln(5)
-                    pdf.set_font("Arial", size=12)
-                    pdf.cell(0, 8, f"Total entries: {len(lines)}", ln=True)
-                    
-                    # Get and display logs from today
-                    todays_logs = get_todays_logs(lines)
-                    if todays_logs:
-                        pdf.set_font("Arial", 'B', size=12)
-                        pdf.cell(0, 8, "Recent Logs from Today:", ln=True)
-                        pdf.set_font("Arial", size=10)
-                        for line in todays_logs:
-                            if len(line) > 100:
-                                line = line[:97] + "..."
-                            pdf.multi_cell(0, 8, f"- {line.strip()}")
-                        pdf.ln(5)
-                    else:
-                        pdf.set_font("Arial", size=10)
-                        pdf.multi_cell(0, 8, "No log entries found for today.")
-                        pdf.ln(5)
+# -------------------------------------------------------------------
+# Report
+# -------------------------------------------------------------------
+def generate_full_report(progress=None, max_lines=REPORT_APPENDIX_MAX_LINES, attachment=REPORT_APPENDIX_ATTACHMENT):
+    """
+    Builds the PDF forensic report under logs/exports and returns its path. Raises on failure.
+    progress(step, done, total) is called from the calling thread as sections complete.
+    """
+    os.makedirs("logs/exports", exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = f"logs/exports/forensic_report_{timestamp}.pdf"
+    attachment_path = f"logs/exports/forensic_report_{timestamp}_logs.txt.gz" if attachment else None
+    category_paths = {log_type: category_log_path(log_type) for log_type in LOG_TYPES}
+    total_steps = len(LOG_TYPES) + 5
+    done = 0
 
-            except Exception as e:
-                pdf.cell(0, 8, f"Error analyzing {log_type} logs: {str(e)}", ln=True)
-        
-        # If no categorized logcat data exists, include raw logcat logs
-        if total_categorized == 0:
-            pdf.set_font("Arial", 'B', size=14)
-            pdf.cell(0, 8, "Raw Logcat Data", ln=True)
-            pdf.ln(5)
-            if os.path.exists("logs/android_logcat.txt"):
-                with open("logs/android_logcat.txt", "r", encoding="utf-8", errors="replace") as f:
-                    raw_lines = f.readlines()
-                pdf.set_font("Arial", size=12)
-                pdf.cell(0, 8, f"Total entries: {len(raw_lines)}", ln=True)
-                
-                # Get and display logs from today from raw logcat
-                todays_raw_logs = get_todays_logs(raw_lines)
-                if todays_raw_logs:
-                    pdf.set_font("Arial", 'B', size=12)
-                    pdf.cell(0, 8, "Recent Logs from Today:", ln=True)
-                    pdf.set_font("Arial", size=10)
-                    for line in todays_raw_logs:
-                        if len(line) > 100:
-                            line = line[:97] + "..."
-                        pdf.multi_cell(0, 8, f"- {line.strip()}")
-                    pdf.ln(5)
-                else:
-                    pdf.set_font("Arial", size=10)
-                    pdf.multi_cell(0, 8, "No raw log entries found for today.")
-                    pdf.ln(5)
-            else:
-                pdf.cell(0, 8, "No raw logcat data available.", ln=True)
+    def step(name):
+        nonlocal done
+        done += 1
+        if progress:
+            progress(name, done, total_steps)
 
-        # --- Conclusion Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=18)
-        pdf.cell(0, 10, "Conclusion", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 8,
-            "Based on the analysis of the Android logs, the evidence indicates activity pertinent to the case. "
-            "All analyses were conducted in accordance with forensic standards. This report is complete and is prepared for court presentation.",
-            align='L'
-        )
-        pdf.ln(10)
-        pdf.cell(0, 8, "Examiner Signature: __________________________", ln=True)
-        pdf.cell(0, 8, f"Date: {datetime.now().strftime('%Y-%m-%d')}", ln=True)
+    with ThreadPoolExecutor(max_workers=REPORT_SECTION_WORKERS, thread_name_prefix="report") as executor:
+        summary_futures = {source: executor.submit(aggregation.get_summary, source) for source in LOG_FILES}
+        category_futures = {log_type: executor.submit(collect_log_stats, path, max_lines)
+                            for log_type, path in category_paths.items()}
+
+        pdf = FPDF()
+        _render_front_matter(pdf)
+        _render_device_info(pdf, _result(summary_futures["logcat"]))
+        step("Device information")
+        _render_call_section(pdf, _result(summary_futures["calls"]))
+        step("Call log analysis")
+        _render_sms_section(pdf, _result(summary_futures["sms"]))
+        step("SMS log analysis")
+        category_stats = {}
+        for log_type, future in category_futures.items():
+            category_stats[log_type] = _result(future)
+            step(f"{log_type} logs")
 
+        # The raw logcat is only listed when nothing was categorized
+        raw_stats = None
+        appendix = [(f"{log_type} Logs", path) for log_type, path in category_paths.items()]
+        uncategorized = not any(isinstance(s, dict) and s["total"] for s in category_stats.values())
+        if uncategorized:
+            raw_stats = collect_log_stats(LOG_FILES["logcat"], max_lines)
+            appendix = [("Raw Logcat Data", LOG_FILES["logcat"])]
+        shown_stats = [raw_stats] if raw_stats else [s for s in category_stats.values() if isinstance(s, dict)]
+        if attachment_path and not any(s["today"] > len(s["shown"]) for s in shown_stats):
+            attachment_path = None
+        attachment_future = (executor.submit(write_appendix_attachment, attachment_path, appendix)
+                             if attachment_path else None)
+
+        _render_logcat_section(pdf, category_stats, raw_stats,
+                               os.path.basename(attachment_path) if attachment_path else None, uncategorized)
+        _render_conclusion(pdf)
         pdf.output(filepath)
-        messagebox.showinfo("Report Generated", f"Forensic report exported to {filepath}")
-    except Exception as e:
-        messagebox.showerror("Report Generation Failed", f"Failed to generate report: {str(e)}")
+        step("PDF written")
+        if attachment_future is not None:
+            attachment_future.result()
+        step("Log attachment")
+    return filepath
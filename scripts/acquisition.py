@@ -0,0 +1,208 @@
+"""
+Concurrent acquisition of the device logs.
+
+Every source (logcat dump, call log, SMS) is one `adb` invocation. They are
+started together as asyncio subprocesses and their stdout is streamed in
+chunks straight into the log file, so total acquisition time is that of the
+slowest source instead of the sum. A progress callback receives the bytes
+written and elapsed time for each source as data arrives.
+
+Call log and SMS are read with paged `content query` calls: each page asks
+for the next CONTENT_QUERY_PAGE_SIZE rows by `_id` with only the columns the
+tool uses, is written to disk once complete, and a failed page is retried
+from the last `_id` already on disk.
+"""
+import asyncio
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from config import (ADB_COMMAND, LOG_FILES, CONTENT_QUERY_PAGE_SIZE, CONTENT_QUERY_PAGE_RETRIES,
+                    CONTENT_QUERY_PROJECTIONS)
+from content_rows import iter_rows
+
+ACQUISITION_CHUNK_SIZE = 64 * 1024
+# Minimum seconds between two progress reports for the same source
+PROGRESS_INTERVAL = 0.5
+
+
+class AcquisitionSource:
+    """One adb pull: its arguments, output file and how an empty or failed pull is recorded."""
+
+    def __init__(self, name, args, path, empty_text=None, failure_text=None, check=False):
+        self.name = name
+        self.args = args
+        self.path = path
+        # Written instead of the output when adb prints nothing
+        self.empty_text = empty_text
+        # Written (formatted with the error) when adb fails; ignored if check is set
+        self.failure_text = failure_text
+        # Raise instead of recording the failure
+        self.check = check
+
+
+class ContentQuerySource(AcquisitionSource):
+    """A `content query` pulled in pages of page_size rows ordered by _id."""
+
+    def __init__(self, name, uri, projection, path, empty_text=None, failure_text=None,
+                 page_size=CONTENT_QUERY_PAGE_SIZE, retries=CONTENT_QUERY_PAGE_RETRIES):
+        super().__init__(name, ["shell", "content", "query", "--uri", uri], path, empty_text, failure_text)
+        self.projection = projection
+        self.page_size = page_size
+        self.retries = retries
+
+    def page_args(self, after_id):
+        # adb shell joins its arguments into one remote command line, hence the inner quotes
+        return self.args + ["--projection", ":".join(self.projection),
+                            "--where", f"'_id>{after_id}'",
+                            "--sort", f"'_id ASC LIMIT {self.page_size}'"]
+
+
+class AcquisitionResult:
+    """Outcome of one source: bytes written, wall time and the error, if any."""
+
+    def __init__(self, name, path, size=0, seconds=0.0, error=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+        # Paged sources only: pages written and failed page attempts that were retried
+        self.pages = 0
+        self.retries = 0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return f"AcquisitionResult({self.name!r}, size={self.size}, seconds={self.seconds:.2f}, error={self.error!r})"
+
+
+class AcquisitionError(RuntimeError):
+    """Raised when a source that must succeed (the logcat dump) fails."""
+
+
+def logcat_args(hours=24):
+    since = (datetime.now() - timedelta(hours=hours)).strftime("%m-%d %H:%M:%S.000")
+    return ["logcat", "-d", "-v", "time", "-T", since]
+
+
+def default_sources():
+    """The sources acquired by "Extract Logs", in display order."""
+    return [
+        AcquisitionSource("logcat", logcat_args(), LOG_FILES["logcat"], check=True),
+        ContentQuerySource("calls", "content://call_log/calls", CONTENT_QUERY_PROJECTIONS["calls"],
+                           LOG_FILES["calls"], "⚠️ No call logs found.", "⚠️ Failed to extract call logs: {}"),
+        ContentQuerySource("sms", "content://sms", CONTENT_QUERY_PROJECTIONS["sms"],
+                           LOG_FILES["sms"], "⚠️ No SMS logs found.", "⚠️ Failed to extract SMS logs: {}"),
+    ]
+
+
+async def _run(adb, args, on_chunk):
+    """Runs one adb command, passing its stdout to on_chunk as it arrives. Returns an error string or None."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *adb, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        while True:
+            chunk = await process.stdout.read(ACQUISITION_CHUNK_SIZE)
+            if not chunk:
+                break
+            on_chunk(chunk)
+        stderr = (await stderr_task).decode("utf-8", "replace").strip()
+        returncode = await process.wait()
+    except OSError as e:
+        return str(e)
+    if returncode != 0:
+        return f"{' '.join(adb + args)} exited with status {returncode}" + (f": {stderr}" if stderr else "")
+    return None
+
+
+async def _acquire_pages(source, adb, out, result, report):
+    """Writes the pages of a ContentQuerySource to out, retrying a failed page from the last _id written."""
+    last_id = -1
+    columns = set(source.projection)
+    while True:
+        for attempt in range(source.retries + 1):
+            chunks = []
+            error = await _run(adb, source.page_args(last_id), chunks.append)
+            if error is None:
+                break
+            result.retries += 1
+            await asyncio.sleep(0.5 * (attempt + 1))
+        if error is not None:
+            result.error = f"page after _id {last_id} failed: {error}"
+            return
+        page = b"".join(chunks)
+        ids = [row.get_int("_id") for row in iter_rows(io.BytesIO(page), columns)]
+        if not ids:
+            return
+        out.write(page)
+        result.size += len(page)
+        result.pages += 1
+        report()
+        page_last_id = max((i for i in ids if i is not None), default=None)
+        if len(ids) < source.page_size or page_last_id is None or page_last_id <= last_id:
+            return
+        last_id = page_last_id
+
+
+async def _acquire(source, adb, progress):
+    start = time.perf_counter()
+    result = AcquisitionResult(source.name, source.path)
+    directory = os.path.dirname(source.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    last_report = start
+
+    def report():
+        nonlocal last_report
+        now = time.perf_counter()
+        if progress and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            progress(source.name, result.size, now - start, False)
+
+    with open(source.path, "wb") as out:
+        if isinstance(source, ContentQuerySource):
+            await _acquire_pages(source, adb, out, result, report)
+        else:
+            def write(chunk):
+                out.write(chunk)
+                result.size += len(chunk)
+                report()
+            result.error = await _run(adb, source.args, write)
+
+    # Complete pages already on disk are kept even if a later page failed
+    paged_data_kept = isinstance(source, ContentQuerySource) and result.size > 0
+    if result.error is not None and not source.check and source.failure_text and not paged_data_kept:
+        with open(source.path, "w", encoding="utf-8") as out:
+            out.write(source.failure_text.format(result.error))
+    elif result.error is None and result.size == 0 and source.empty_text:
+        with open(source.path, "w", encoding="utf-8") as out:
+            out.write(source.empty_text)
+    result.seconds = time.perf_counter() - start
+    if progress:
+        progress(source.name, result.size, result.seconds, True)
+    return result
+
+
+async def acquire_async(sources, adb=None, progress=None):
+    """Runs every source concurrently and returns their AcquisitionResults in order."""
+    adb = list(adb or ADB_COMMAND)
+    return await asyncio.gather(*(_acquire(source, adb, progress) for source in sources))
+
+
+def acquire_logs(sources=None, adb=None, progress=None):
+    """
+    Acquires the given sources (default: logcat, calls, SMS) concurrently and returns
+    {name: AcquisitionResult}. progress(name, bytes, seconds, finished) is called from
+    the acquisition thread. Raises AcquisitionError once all sources have finished if a
+    source marked check=True failed.
+    """
+    sources = default_sources() if sources is None else sources
+    results = asyncio.run(acquire_async(sources, adb, progress))
+    for source, result in zip(sources, results):
+        if source.check and not result.ok:
+            raise AcquisitionError(f"Failed to acquire {source.name}: {result.error}")
+    return {result.name: result for result in results}
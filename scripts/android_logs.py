@@ -1,83 +1,159 @@
 import subprocess
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import deque
 import os
+from timestamp_index import build_index
+from config import ADB_COMMAND, LOG_FILES
+from evidence import remove_segments
+import instrumentation
+from scripts.acquisition import acquire_logs, default_sources
+from scripts.incremental_logcat import load_cursor, incremental_source, merge_incoming, reset_after_full_dump
 
 # Ensure logs directory exists
 os.makedirs("logs", exist_ok=True)
 
+def _source(name):
+    return next(source for source in default_sources() if source.name == name)
+
+def _timed_acquire(sources, progress):
+    with instrumentation.timed("acquisition") as span:
+        results = acquire_logs(sources, progress=progress)
+        span.bytes = sum(result.size for result in results.values())
+    return results
+
+def get_all_logs(progress=None, incremental=False):
+    """
+    Acquires logcat, call logs and SMS concurrently (see scripts/acquisition.py).
+    With incremental=True only logcat entries newer than the saved cursor are pulled
+    and appended (see scripts/incremental_logcat.py).
+    Returns (results, categorized, appended): results maps each source to its
+    AcquisitionResult, categorized holds the number of logcat lines per category, and
+    appended is True when categorized counts only lines appended to the existing logcat file.
+    The lines themselves are in the logs/logcat_types files.
+    """
+    if incremental:
+        cursor = load_cursor()
+        sources = [incremental_source(cursor)] + [s for s in default_sources() if s.name != "logcat"]
+        results = _timed_acquire(sources, progress)
+        _, categorized, appended = merge_incoming(cursor)
+        return results, categorized, appended
+    results = _timed_acquire(None, progress)
+    # The dump replaces the whole log, segments included
+    categorized = reset_after_full_dump()
+    # Index timestamps -> byte offsets so time-range queries can seek into the dump
+    build_index(LOG_FILES["logcat"])
+    return results, categorized, False
+
 def get_logcat():
     """
     Extract Android logcat logs from the past 24 hours.
     """
-    since = (datetime.now() - timedelta(hours=24)).strftime("%m-%d %H:%M:%S.000")
-    with open("logs/android_logcat.txt", "w", encoding="utf-8") as f:
-        subprocess.run(["adb", "logcat", "-d", "-v", "time", "-T", since],
-                       stdout=f, check=True)
+    acquire_logs([_source("logcat")])
+    # The dump replaces the whole log, segments included
+    remove_segments(LOG_FILES["logcat"])
+    # Index timestamps -> byte offsets so time-range queries can seek into the dump
+    build_index(LOG_FILES["logcat"])
 
 def get_call_logs():
     """
     Extract Android call logs using the adb content query command.
     """
-    try:
-        result = subprocess.run(
-            ["adb", "shell", "content", "query", "--uri", "content://call_log/calls"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            check=True
-        )
-        output = result.stdout if result.stdout else "⚠️ No call logs found."
-    except Exception as e:
-        output = f"⚠️ Failed to extract call logs: {str(e)}"
-    with open("logs/call_logs.txt", "w", encoding="utf-8") as f:
-        f.write(output)
+    acquire_logs([_source("calls")])
 
 def get_sms_logs():
     """
     Extract Android SMS logs using the adb content query command.
     """
-    try:
-        result = subprocess.run(
-            ["adb", "shell", "content", "query", "--uri", "content://sms"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            check=True
-        )
-        output = result.stdout if result.stdout else "⚠️ No SMS logs found."
-    except Exception as e:
-        output = f"⚠️ Failed to extract SMS logs: {str(e)}"
-    print("🔍 STDOUT:\n", output)
-    with open("logs/sms_logs.txt", "w", encoding="utf-8") as f:
-        f.write(output)
+    acquire_logs([_source("sms")])
+
+# Live monitoring: the adb pipe is read in large binary chunks by a reader
+# thread into a bounded ring buffer, and lines are handed to the callback in
+# batches every MONITOR_BATCH_INTERVAL seconds.
+MONITOR_CHUNK_SIZE = 64 * 1024
+MONITOR_BUFFER_LINES = 50000
+MONITOR_BATCH_INTERVAL = 0.1
 
-def monitor_logs(callback):
+class LineRingBuffer:
     """
-    Continuously monitor logs from 'adb logcat -v time'
-    and call the provided callback for each line.
+    Bounded line buffer between the pipe reader and the consumer. When the
+    consumer falls behind, the oldest lines are dropped and counted.
+    """
+
+    def __init__(self, max_lines=MONITOR_BUFFER_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+
+    def extend(self, new_lines):
+        overflow = len(self.lines) + len(new_lines) - self.lines.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.lines.extend(new_lines)
+
+    def drain(self):
+        batch = []
+        lines = self.lines
+        while lines:
+            batch.append(lines.popleft())
+        return batch
+
+    def __len__(self):
+        return len(self.lines)
+
+def _read_pipe(stream, buffer, chunk_size=MONITOR_CHUNK_SIZE):
+    """Reads a binary pipe in large chunks and pushes complete decoded lines into buffer."""
+    fd = stream.fileno()
+    pending = b""
+    while True:
+        chunk = os.read(fd, chunk_size)
+        if not chunk:
+            break
+        data = pending + chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            pending = data
+            continue
+        pending = data[cut + 1:]
+        buffer.extend(data[:cut].decode("utf-8", "replace").replace("\r", "").split("\n"))
+    if pending:
+        buffer.extend([pending.decode("utf-8", "replace").rstrip("\r")])
+
+def monitor_logs(callback, should_continue=None, batch_interval=MONITOR_BATCH_INTERVAL,
+                 max_buffered_lines=MONITOR_BUFFER_LINES):
+    """
+    Continuously monitor logs from 'adb logcat -v time' and call
+    callback(lines, dropped) with each batch of new lines, where dropped is the
+    number of lines lost to buffer overflow since the previous batch.
+    Stops when the process ends or should_continue() returns False.
     Added error-handling to avoid crashes if the callback fails.
     """
     process = subprocess.Popen(
-        ['adb', 'logcat', '-v', 'time'],
+        ADB_COMMAND + ['logcat', '-v', 'time'],
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True
+        stderr=subprocess.DEVNULL,
+        bufsize=0
     )
+    buffer = LineRingBuffer(max_buffered_lines)
+    reader = threading.Thread(target=_read_pipe, args=(process.stdout, buffer), daemon=True)
+    reader.start()
+    reported_drops = 0
     try:
         while True:
-            line = process.stdout.readline()
-            if not line:
+            time.sleep(batch_interval)
+            finished = not reader.is_alive()
+            batch = buffer.drain()
+            dropped = buffer.dropped - reported_drops
+            reported_drops += dropped
+            if batch or dropped:
+                try:
+                    callback(batch, dropped)
+                except Exception as cb_e:
+                    print("Error in callback:", cb_e)
+            if finished and not len(buffer):
                 # Means process ended or no device output
                 break
-            try:
-                callback(line.rstrip('\n'))
-            except Exception as cb_e:
-                print("Error in callback:", cb_e)
-            # Sleep briefly to avoid CPU hogging
-            time.sleep(0.01)
+            if should_continue is not None and not should_continue():
+                break
     except KeyboardInterrupt:
         pass
     except Exception as e:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `adb` that prints synthetic device output, for running the
+acquisition and live monitoring without a device:
+
+    ANDROID_FORENSIC_ADB="python scripts/fake_adb.py" python main.py
+
+Supports `logcat -d [-T since] ...` (a dump), `logcat -v time` (an endless live
+stream) and `shell content query --uri content://call_log/calls|sms` with
+optional --projection, --where '_id>N' and --sort '_id ASC LIMIT n'.
+FAKE_ADB_ROWS sets the number of lines/rows (default 1000), FAKE_ADB_DELAY
+an initial delay in seconds to simulate a slow device and FAKE_ADB_FAIL_RATE
+the probability that a content query fails.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+TAGS = ["ActivityManager", "PackageManager", "SystemServer", "AndroidRuntime", "art",
+        "WifiStateMachine", "ConnectivityService", "PowerManagerService", "CameraService"]
+MESSAGES = ["Start proc com.example.app", "GC_CONCURRENT freed 2048K", "FATAL EXCEPTION: main",
+            "java.lang.NullPointerException", "Wakelock acquired", "NetworkAgentInfo connected",
+            "ANR in com.example.app", "startService Intent { act=com.example.SYNC }"]
+LEVELS = "VDIWE"
+
+
+def logcat_line(when, rng):
+    return (f"{when:%m-%d %H:%M:%S}.{when.microsecond // 1000:03d} {rng.choice(LEVELS)}/"
+            f"{rng.choice(TAGS)}({rng.randint(100, 9999):5d}): {rng.choice(MESSAGES)}\n")
+
+
+def content_fields(row_id, when, sms):
+    rng = random.Random(row_id)
+    number = f"+1555{rng.randint(0, 49):07d}"
+    date = int(when.timestamp() * 1000)
+    if sms:
+        return {"_id": row_id, "thread_id": rng.randint(1, 50), "address": number, "date": date,
+                "date_sent": date - 1000, "type": rng.choice((1, 2)), "read": 1,
+                "body": f"Message {row_id}, see you at 5, ok?"}
+    return {"_id": row_id, "number": number, "date": date, "duration": rng.randint(0, 600),
+            "type": rng.choice((1, 2, 3)), "name": "NULL"}
+
+
+def option(args, name):
+    """Returns the value of a `content query` option with the remote-shell quotes removed."""
+    if name not in args:
+        return None
+    return args[args.index(name) + 1].strip("'\"")
+
+
+def content_query(args, rows, now, out):
+    sms = option(args, "--uri") == "content://sms"
+    projection = option(args, "--projection")
+    where = option(args, "--where")
+    sort = option(args, "--sort") or ""
+    after_id = int(where.split(">", 1)[1]) if where and where.startswith("_id>") else 0
+    limit = int(sort.rsplit("LIMIT", 1)[1]) if "LIMIT" in sort else rows
+    if random.random() < float(os.environ.get("FAKE_ADB_FAIL_RATE", "0")):
+        sys.stderr.write("fake_adb: simulated transport error\n")
+        return 1
+    row_no = 0
+    for row_id in range(max(after_id, 0) + 1, rows + 1):
+        if row_no >= limit:
+            break
+        when = now - timedelta(seconds=(rows - row_id) * 7 * 86400 / rows)
+        fields = content_fields(row_id, when, sms)
+        columns = projection.split(":") if projection else list(fields)
+        out.write(f"Row: {row_no} " + ", ".join(f"{c}={fields.get(c, 'NULL')}" for c in columns) + "\n")
+        row_no += 1
+    if row_no == 0:
+        out.write("No result found.\n")
+    return 0
+
+
+def main(args):
+    rng = random.Random(42)
+    rows = int(os.environ.get("FAKE_ADB_ROWS", "1000"))
+    time.sleep(float(os.environ.get("FAKE_ADB_DELAY", "0")))
+    out = sys.stdout
+    now = datetime.now()
+    if args[:1] == ["logcat"] and "-d" in args:
+        since = None
+        if "-T" in args:
+            since = datetime.strptime(f"{now.year}-{args[args.index('-T') + 1]}", "%Y-%m-%d %H:%M:%S.%f")
+        for i in range(rows):
+            when = now - timedelta(seconds=(rows - i) * 86400 / rows)
+            line = logcat_line(when, rng)
+            if since is None or when.replace(microsecond=when.microsecond // 1000 * 1000) >= since:
+                out.write(line)
+    elif args[:1] == ["logcat"]:
+        while True:
+            out.write(logcat_line(datetime.now(), rng))
+            out.flush()
+            time.sleep(0.01)
+    elif args[:3] == ["shell", "content", "query"]:
+        return content_query(args, rows, now, out)
+    else:
+        sys.stderr.write(f"fake_adb: unsupported command: {' '.join(args)}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,250 @@
+"""
+Incremental logcat acquisition.
+
+A cursor file records the timestamp of the newest logcat entry already on
+disk, together with hashes of the lines carrying exactly that timestamp.
+The next pull asks adb only for entries from that time on (`-T` is
+inclusive), drops the overlap, and streams the new lines, byte for byte as
+received, onto the end of logs/android_logcat.txt. The timestamp and token
+indexes, the record store and the per-category files are extended with just
+the appended lines, so nothing already on disk is read or rewritten.
+
+Once a pull would grow the file past LOGCAT_SEGMENT_BYTES, the file is first
+rolled into LOGCAT_SEGMENT_DIR as a numbered segment and the new lines start
+the next one. Every reader sees the segments and the current file as one log
+(see evidence.py), at the same offsets as before the roll, so the indexes,
+record store, category files and container are still only extended.
+"""
+import hashlib
+import json
+import os
+from array import array
+from contextlib import contextmanager, ExitStack
+from itertools import tee
+from datetime import datetime
+from config import (LOG_FILES, LOG_TYPES, LOGCAT_CURSOR_PATH, LOGCAT_INCOMING_PATH, LOGCAT_SEGMENT_BYTES,
+                    LOGCAT_TYPES_DIR)
+from classifier import logcat_classifier
+from evidence import open_log_text, plain_signature, remove_segments, roll_segment
+import instrumentation
+import sharded_scan
+import token_index
+from record_store import parse_logcat, ingest_appended, ingest_logs
+from scripts.acquisition import AcquisitionSource, logcat_args
+from timestamp_index import build_index, update_index
+
+
+# -------------------------------------------------------------------
+# Cursor
+# -------------------------------------------------------------------
+def load_cursor(path=LOGCAT_CURSOR_PATH):
+    """Returns the saved cursor dict, or None if there is none (first acquisition)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_cursor(cursor, path=LOGCAT_CURSOR_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cursor, f)
+    os.replace(tmp_path, path)
+
+
+def _line_hash(raw):
+    return hashlib.sha1(raw.rstrip(b"\r\n")).hexdigest()
+
+
+def cursor_from_file(path=LOG_FILES["logcat"]):
+    """Builds the cursor for a logcat file from its newest timestamp and the lines that carry it."""
+    last_ts = None
+    tail = []
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for _, ts, _, _, _, offset, _ in parse_logcat(f):
+                if ts is None:
+                    continue
+                if last_ts is None or ts > last_ts:
+                    last_ts, tail = ts, [offset]
+                elif ts == last_ts:
+                    tail.append(offset)
+            hashes = []
+            for offset in tail:
+                f.seek(offset)
+                hashes.append(_line_hash(f.readline()))
+    else:
+        hashes = []
+    return {"last_ts": last_ts, "tail_hashes": hashes}
+
+
+def _since_argument(last_ts):
+    when = datetime.fromtimestamp(last_ts / 1000)
+    return when.strftime("%m-%d %H:%M:%S.") + f"{last_ts % 1000:03d}"
+
+
+def incremental_source(cursor):
+    """The acquisition source for the next pull: only entries at or after the cursor, into the staging file."""
+    if cursor is None or cursor.get("last_ts") is None:
+        args = logcat_args()
+    else:
+        args = ["logcat", "-d", "-v", "time", "-T", _since_argument(cursor["last_ts"])]
+    return AcquisitionSource("logcat", args, LOGCAT_INCOMING_PATH, check=True)
+
+
+# -------------------------------------------------------------------
+# Merge
+# -------------------------------------------------------------------
+def _new_records(incoming_path, cursor):
+    """Yields (ts, raw line) for the lines of a pull that new_lines() keeps; ts is None for untimestamped lines."""
+    last_ts = cursor.get("last_ts") if cursor else None
+    seen = set(cursor.get("tail_hashes", ())) if cursor else set()
+    keeping = last_ts is None
+    with open(incoming_path, "rb") as f:
+        parsed, raws = tee(f)
+        for record, raw in zip(parse_logcat(parsed), raws):
+            ts = record[1]
+            if ts is not None:
+                keeping = last_ts is None or ts > last_ts or (ts == last_ts and _line_hash(raw) not in seen)
+            if keeping:
+                yield ts, raw if raw.endswith(b"\n") else raw + b"\n"
+
+
+def new_lines(incoming_path, cursor):
+    """
+    Yields the raw lines of a pull that are not already on disk: entries older than the
+    cursor, entries at the cursor time that were already seen, and untimestamped lines
+    (e.g. "--------- beginning of main") that follow a dropped entry are skipped.
+    """
+    for _, raw in _new_records(incoming_path, cursor):
+        yield raw
+
+
+def category_file_path(log_type):
+    return os.path.join(LOGCAT_TYPES_DIR, f"{log_type.lower()}_logs.txt")
+
+
+@contextmanager
+def category_files(append):
+    """Opens every category's logs/logcat_types file for appending (or rewriting); yields {log_type: file}."""
+    os.makedirs(LOGCAT_TYPES_DIR, exist_ok=True)
+    with ExitStack() as stack:
+        yield {log_type: stack.enter_context(open(category_file_path(log_type), "a" if append else "w",
+                                                  encoding="utf-8"))
+               for log_type in LOG_TYPES}
+
+
+def merge_incoming(cursor, logcat_path=LOG_FILES["logcat"], incoming_path=LOGCAT_INCOMING_PATH):
+    """
+    Streams the new lines of the staged pull onto the end of the logcat file, classifying
+    each into its category file as it goes, then updates the indexes, record store and
+    cursor from just those lines. Returns (count, categorized, appended): the number of
+    new lines, how many of them went to each category, and False when they started a new
+    log (first pull, or no logcat file yet).
+    """
+    signature = plain_signature(logcat_path) if cursor else None
+    # The size of the whole log, segments included: where the new lines start
+    previous_size = signature[0] if signature else 0
+    if not previous_size:
+        remove_segments(logcat_path)
+    elif os.path.getsize(logcat_path) + os.path.getsize(incoming_path) > LOGCAT_SEGMENT_BYTES:
+        # The pull (overlap included) would take the file past its bound: seal it as a segment
+        roll_segment(logcat_path)
+    # Cursor advanced past the newest appended entry, kept if nothing new arrives
+    last_ts = cursor.get("last_ts") if cursor else None
+    hashes = list(cursor.get("tail_hashes", ())) if cursor else []
+    categorized = {log_type: 0 for log_type in LOG_TYPES}
+    count = 0
+    classify = logcat_classifier.classify
+    with instrumentation.timed("categorize") as span, open(logcat_path, "ab" if previous_size else "wb") as out, \
+            category_files(append=bool(previous_size)) as files:
+        for ts, raw in _new_records(incoming_path, cursor):
+            out.write(raw)
+            count += 1
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            log_type = classify(line)
+            if log_type is not None:
+                files[log_type].write(line + "\n")
+                categorized[log_type] += 1
+            if ts is None:
+                continue
+            if last_ts is None or ts > last_ts:
+                last_ts, hashes = ts, [_line_hash(raw)]
+            elif ts == last_ts:
+                hashes.append(_line_hash(raw))
+        span.lines += count
+    os.remove(incoming_path)
+
+    if previous_size:
+        update_index(logcat_path, previous_size)
+        token_index.update_index(logcat_path, previous_size)
+        ingest_appended("logcat", previous_size)
+    else:
+        build_index(logcat_path)
+        ingest_logs(["logcat"])
+    save_cursor({"last_ts": last_ts, "tail_hashes": hashes})
+    return count, categorized, bool(previous_size)
+
+
+def reset_after_full_dump(logcat_path=LOG_FILES["logcat"]):
+    """
+    After a full (non-incremental) dump replaced the logcat file: drops the segments of the
+    log it replaced, rewrites the category files from scratch and points the cursor at the
+    dump's newest entry. Returns the number of lines per category.
+    """
+    remove_segments(logcat_path)
+    categorized = categorize_logcat(logcat_path)
+    save_cursor(cursor_from_file(logcat_path))
+    return categorized
+
+
+def _categorize_range(path, start, end):
+    """Sharded scan worker: per category, the (offset, length) pairs of the lines of path[start:end]; and the lines read."""
+    spans = {name: array("q") for name in logcat_classifier.names}
+    classify = logcat_classifier.classify
+    lines = 0
+    offset = start
+    with sharded_scan.mapped(path) as mm:
+        for raw in sharded_scan.iter_lines(mm, start, end):
+            lines += 1
+            name = classify(raw.decode("utf-8", "replace").rstrip("\r\n"))
+            if name is not None:
+                spans[name].extend((offset, len(raw)))
+            offset += len(raw)
+    return spans, lines
+
+
+def _categorize_sharded(logcat_path, files, categorized):
+    """Writes the lines of each range's categories to their files, in file order; returns the lines read."""
+    read = 0
+    with sharded_scan.mapped(logcat_path) as mm:
+        for spans, lines in sharded_scan.map_ranges(logcat_path, _categorize_range):
+            read += lines
+            for name, found in spans.items():
+                f = files[name]
+                for i in range(0, len(found), 2):
+                    f.write(mm[found[i]:found[i] + found[i + 1]].decode("utf-8", "replace").rstrip("\r\n") + "\n")
+                categorized[name] += len(found) // 2
+    return read
+
+
+def categorize_logcat(logcat_path=LOG_FILES["logcat"]):
+    """
+    Rewrites the category files from a whole logcat (its segments, or its evidence container),
+    streaming every line to its file. Returns the number of lines per category.
+    """
+    categorized = {log_type: 0 for log_type in LOG_TYPES}
+    with instrumentation.timed("categorize") as span, category_files(append=False) as files:
+        if sharded_scan.should_shard(logcat_path):
+            span.lines += _categorize_sharded(logcat_path, files, categorized)
+            return categorized
+        classify = logcat_classifier.classify
+        with open_log_text(logcat_path) as f:
+            for line in instrumentation.counted(f, "categorize"):
+                line = line.rstrip("\r\n")
+                log_type = classify(line)
+                if log_type is not None:
+                    files[log_type].write(line + "\n")
+                    categorized[log_type] += 1
+    return categorized
@@ -1,7 +1,41 @@
 from datetime import datetime, timedelta
 import os
+from timestamps import decode_iso, to_ms
+
+def _since_for_range(time_range):
+    if not time_range:
+        return None
+    now = datetime.now()
+    if "1 Hour" in time_range:
+        return now - timedelta(hours=1)
+    elif "24 Hours" in time_range:
+        return now - timedelta(days=1)
+    elif "7 Days" in time_range:
+        return now - timedelta(days=7)
+    return None
+
+def iter_filtered_lines(lines, keyword="", since=None):
+    """Yields the lines that contain keyword and are not older than since."""
+    needle = keyword.lower()
+    since_ms = to_ms(since) if since else None
+    for line in lines:
+        # Filter by keyword first
+        if needle not in line.lower():
+            continue
+        if since:
+            # Assume the timestamp is located at the beginning of the line in "YYYY-MM-DD HH:MM:SS" format.
+            if line[:19].count("-") >= 2 and ":" in line:
+                ts = decode_iso(line)
+                if ts is not None and ts >= since_ms:
+                    yield line
+            else:
+                yield line
+        else:
+            yield line
 
 def filter_logs(input_file, keyword="", time_range=None, output_file="logs/filtered_logs.txt"):
+    """Streams matching lines from input_file to output_file and returns the match count."""
+    count = 0
     try:
         # Ensure that the directory for the output file exists
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -9,42 +43,14 @@ def filter_logs(input_file, keyword="", time_range=None, output_file="logs/filte
         if not os.path.exists(input_file):
             with open(input_file, "w", encoding="utf-8") as f_temp:
                 f_temp.write("")
-        with open(input_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
 
-        if time_range:
-            now = datetime.now()
-            if "1 Hour" in time_range:
-                since = now - timedelta(hours=1)
-            elif "24 Hours" in time_range:
-                since = now - timedelta(days=1)
-            elif "7 Days" in time_range:
-                since = now - timedelta(days=7)
-            else:
-                since = None
-        else:
-            since = None
-
-        filtered = []
-        for line in lines:
-            # Filter by keyword first
-            if keyword.lower() in line.lower():
-                if time_range and since:
-                    # Assume the timestamp is located at the beginning of the line in "YYYY-MM-DD HH:MM:SS" format.
-                    if line[:19].count("-") >= 2 and ":" in line:
-                        try:
-                            ts = datetime.strptime(line[:19], "%Y-%m-%d %H:%M:%S")
-                            if ts >= since:
-                                filtered.append(line)
-                        except Exception:
-                            pass
-                    else:
-                        filtered.append(line)
-                else:
-                    filtered.append(line)
-        
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.writelines(filtered)
+        since = _since_for_range(time_range)
+        with open(input_file, "r", encoding="utf-8") as f, \
+             open(output_file, "w", encoding="utf-8") as out:
+            for line in iter_filtered_lines(f, keyword, since):
+                out.write(line)
+                count += 1
     except Exception as e:
         with open(output_file, "w", encoding="utf-8") as f:
             f.write(f"❌ Error filtering logs: {str(e)}")
+    return count
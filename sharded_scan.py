@@ -0,0 +1,97 @@
+# sharded_scan.py
+"""
+Multi-process scans of large acquired files.
+
+A file is split into byte ranges that each start at a record boundary (a
+line, or the "Row:" line of a `content query` dump) and every range is
+scanned by a worker process. The workers map the file with mmap and read
+their own range, so no line data is pickled to them; they return compact
+results (match spans, category spans, partial summaries) that the caller
+merges in range order, giving the same result as a serial scan.
+
+The scan functions themselves live with their callers (filtering,
+scripts/incremental_logcat, aggregation) and are passed to map_ranges() as
+worker(path, start, end, *args). A segmented logcat is mapped as one file
+(see evidence.map_log). Only plain files of at least
+SHARDED_SCAN_MIN_BYTES are sharded, and only on Linux, where the workers
+are forked: spawned workers (Windows) would re-run the GUI script, which
+builds its window at import time, and forking a process that has loaded
+Tk is unsafe on macOS. Everything else is scanned in-process as before.
+"""
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from config import SCAN_PROCESSES, SHARDED_SCAN_MIN_BYTES, SHARDS_PER_PROCESS
+import evidence
+import instrumentation
+
+_CONTEXT = multiprocessing.get_context("fork") if sys.platform.startswith("linux") else None
+
+
+def should_shard(path, start=0):
+    """True if path[start:] is a plain file large enough to be worth scanning in several processes."""
+    if _CONTEXT is None or SCAN_PROCESSES < 2:
+        return False
+    signature = evidence.plain_signature(path)
+    if signature is None:
+        return False
+    size = signature[0]
+    return size > start and size - start >= SHARDED_SCAN_MIN_BYTES
+
+
+def mapped(path):
+    """Maps a plain file (all its segments) read-only; use as a context manager."""
+    return evidence.map_log(path)
+
+
+def iter_lines(mm, start, end):
+    """Yields the raw lines of mm[start:end], line endings included."""
+    pos = start
+    while pos < end:
+        newline = mm.find(b"\n", pos, end)
+        stop = end if newline < 0 else newline + 1
+        yield mm[pos:stop]
+        pos = stop
+
+
+def split_ranges(mm, start, end, shards, record_prefix=None):
+    """
+    Splits mm[start:end] into at most shards (start, end) ranges of about equal size.
+    Every range but the first starts at a line start, or with record_prefix at the
+    start of a line beginning with it, so no record is cut in two.
+    """
+    needle = b"\n" + (record_prefix or b"")
+    step = max(1, (end - start) // max(1, shards))
+    bounds = [start]
+    for i in range(1, shards):
+        found = mm.find(needle, max(start + i * step, bounds[-1]) - 1, end)
+        if found < 0:
+            break
+        if found + 1 > bounds[-1]:
+            bounds.append(found + 1)
+    bounds.append(end)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _init_worker():
+    # A lock the parent's threads held at fork time would never be released here
+    instrumentation.set_enabled(False)
+
+
+def map_ranges(path, worker, args=(), start=0, record_prefix=None):
+    """
+    Runs worker(path, range_start, range_end, *args) on the ranges of path[start:] in
+    SCAN_PROCESSES processes and yields the results in file order as they become ready.
+    Closing the generator early cancels the ranges not yet started.
+    """
+    with mapped(path) as mm:
+        ranges = split_ranges(mm, start, len(mm), SCAN_PROCESSES * SHARDS_PER_PROCESS, record_prefix)
+    instrumentation.count("sharded_scan.ranges", len(ranges))
+    pool = ProcessPoolExecutor(min(SCAN_PROCESSES, len(ranges)) or 1, mp_context=_CONTEXT,
+                               initializer=_init_worker)
+    try:
+        columns = [[arg] * len(ranges) for arg in args]
+        yield from pool.map(worker, [path] * len(ranges), [a for a, _ in ranges], [b for _, b in ranges],
+                            *columns)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,106 @@
+# startup_timing.py
+"""
+Startup timing report for the GUI (`python main.py --startup-timing`).
+
+When enabled, every module import is timed the way `python -X importtime`
+does (self time and cumulative time including nested imports) and main.py
+marks the end of each startup phase. report() prints the phases followed by
+the slowest imports, so a heavy library pulled in at startup stands out.
+Everything here is a no-op unless enable() was called.
+"""
+import sys
+import time
+from importlib.abc import MetaPathFinder
+
+FLAG = "--startup-timing"
+
+_enabled = False
+_started = None
+_phases = []
+# module name -> [self seconds, cumulative seconds, depth]
+_imports = {}
+_stack = []
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module, attributing nested imports to their parent."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        name = module.__name__
+        _stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            _imports[name] = [elapsed - nested, elapsed, len(_stack)]
+
+
+class _TimingFinder(MetaPathFinder):
+    """Finds modules through the finders after it on sys.meta_path and wraps their loaders."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        finders = sys.meta_path[sys.meta_path.index(self) + 1:]
+        for finder in finders:
+            find_spec = getattr(finder, "find_spec", None)
+            spec = find_spec(fullname, path, target) if find_spec else None
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+def requested(argv=None):
+    """True if the startup timing flag is on the command line."""
+    return FLAG in (sys.argv if argv is None else argv)
+
+
+def enable():
+    """Starts timing imports from now on. Call before the imports to be measured."""
+    global _enabled, _started
+    if _enabled:
+        return
+    _enabled = True
+    _started = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+def enabled():
+    return _enabled
+
+
+def mark(phase):
+    """Records the end of a startup phase (time since enable())."""
+    if _enabled:
+        _phases.append((phase, time.perf_counter() - _started))
+
+
+def report(out=None, limit=20):
+    """Prints the phase timeline and the limit slowest imports by cumulative time."""
+    if not _enabled:
+        return
+    out = out or sys.stderr
+    print("Startup timing (seconds since launch):", file=out)
+    previous = 0.0
+    for phase, at in _phases:
+        print(f"  {at:8.3f}  (+{at - previous:.3f})  {phase}", file=out)
+        previous = at
+    slowest = sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    print(f"Slowest imports ({len(_imports)} modules imported):", file=out)
+    print("      self |  cumulative | module", file=out)
+    for name, (own, cumulative, depth) in slowest:
+        print(f"  {own * 1000:8.1f} | {cumulative * 1000:8.1f} ms | {'  ' * depth}{name}", file=out)
+    out.flush()
@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import reset_caches  # noqa: E402
+from config import LOG_FILES  # noqa: E402
+
+
+@pytest.fixture
+def case(request, tmp_path, monkeypatch):
+    """
+    A case directory made the working directory, with cold caches. Its logs are
+    {source: str or bytes}: the indirect parameter of the test if it has one, else
+    the test module's CASE_FILES.
+    """
+    files = getattr(request, "param", None) or getattr(request.module, "CASE_FILES", {})
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs")
+    for source, content in files.items():
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        with open(LOG_FILES[source], "wb") as f:
+            f.write(data)
+    reset_caches()
+    yield tmp_path
+    reset_caches()
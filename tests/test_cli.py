@@ -0,0 +1,93 @@
+import os
+import shutil
+import cli
+import evidence
+import gui
+from benchmarks.generators import generate_case
+from config import LOG_FILES, LOG_TYPES
+from scripts.incremental_logcat import category_file_path
+
+OPTIONS = {"filter": True, "log_type": "Logcat", "keyword": None, "time_range": "All Time", "severity": "Error",
+           "subtype": None, "query": None, "graphs": False, "report": False, "pack": False, "archive": False,
+           "bucket": "Hour"}
+
+
+def make_cases(tmp_path):
+    """Two cases whose logcats have the same size and mtime but fewer errors in the second."""
+    first, second = str(tmp_path / "a"), str(tmp_path / "b")
+    generate_case(first, 300)
+    shutil.copytree(first, second)
+    # Same size and mtime, different content: only the working directory tells the logs apart
+    path = os.path.join(second, LOG_FILES["logcat"])
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read().replace(b" E/", b" W/")
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return [first, second]
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_in_process_cases_do_not_share_cached_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = cli.run_cases(make_cases(tmp_path), OPTIONS, workers=1)
+    assert all(result["ok"] for result in results)
+    assert results[1]["outputs"]["filtered"]["matches"] < results[0]["outputs"]["filtered"]["matches"]
+    assert os.getcwd() == str(tmp_path)
+
+
+def test_process_pool_matches_in_process_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cases = make_cases(tmp_path)
+    serial = cli.run_cases(cases, OPTIONS, workers=1)
+    pooled = cli.run_cases(cases, OPTIONS, workers=2)
+    assert [result["case"] for result in pooled] == cases
+    assert all(result["ok"] for result in pooled)
+    assert [result["outputs"] for result in pooled] == [result["outputs"] for result in serial]
+    assert os.getcwd() == str(tmp_path)
+
+
+def test_cases_share_the_scan_processes(monkeypatch):
+    monkeypatch.setattr(cli, "SCAN_PROCESSES", 8)
+    assert [cli.scan_processes_per_case(workers) for workers in (1, 2, 3, 8, 16)] == [8, 4, 2, 1, 1]
+
+
+def test_an_archived_case_reads_its_containers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    case = str(tmp_path / "case")
+    generate_case(case, 300)
+    plain = {source: read(os.path.join(case, path)) for source, path in LOG_FILES.items()}
+    options = dict(OPTIONS, graphs=True, report=True)
+    before = cli.run_cases([case], options, workers=1)[0]
+    filtered = read(os.path.join(case, "logs/filtered_logs.txt"))
+    categories = {log_type: read(os.path.join(case, category_file_path(log_type))) for log_type in LOG_TYPES}
+    archived = cli.run_cases([case], dict(options, pack=True, archive=True), workers=1)[0]
+    assert archived["ok"], archived["error"]
+    assert set(archived["outputs"]["evidence"]) == set(LOG_FILES)
+    for source, path in LOG_FILES.items():
+        assert not os.path.exists(os.path.join(case, path))
+        assert evidence.verify(os.path.join(case, evidence.container_path(source))) == []
+    # Everything derived is rebuilt from the containers alone
+    os.remove(os.path.join(case, "logs/records.db"))
+    for log_type in LOG_TYPES:
+        os.remove(os.path.join(case, category_file_path(log_type)))
+    after = cli.run_cases([case], options, workers=1)[0]
+    assert after["ok"], after["error"]
+    for name in ("categories", "filtered"):
+        assert after["outputs"][name] == before["outputs"][name]
+    assert all(os.path.getsize(os.path.join(case, path)) for path in after["outputs"]["graphs"])
+    assert os.path.getsize(os.path.join(case, after["outputs"]["report"]))
+    assert read(os.path.join(case, "logs/filtered_logs.txt")) == filtered
+    assert {log_type: read(os.path.join(case, category_file_path(log_type))) for log_type in LOG_TYPES} == categories
+    # The viewer pages through the container
+    monkeypatch.chdir(case)
+    segment = gui._FileSegment(LOG_FILES["logcat"])
+    try:
+        assert [segment.line(i) for i in range(len(segment))] == plain["logcat"].splitlines()
+    finally:
+        segment.close()
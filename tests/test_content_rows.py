@@ -0,0 +1,54 @@
+import io
+from content_rows import iter_rows, parse_row_fields, read_rows
+
+SMS_COLUMNS = ["_id", "thread_id", "address", "date", "date_sent", "type", "read", "body"]
+DUMP = ("Row: 0 _id=1, address=+15550100, date=1714647600000, type=1, body=hi, see you at 5, ok?\n"
+        "Row: 1 _id=2, address=+15550101, date=1714647660000, type=2, body=first line\n"
+        "second line, type=3\n"
+        "Row: 2 _id=3, address=NULL, date=x, type=1, body=é\n").encode("utf-8")
+
+
+def test_separator_needs_a_new_identifier_and_equals():
+    fields, starts = parse_row_fields("a=1, b=x, y, c=3\n")
+    assert fields == {"a": "1", "b": "x, y", "c": "3"}
+    assert starts["b"] == len("a=1, b=")
+
+
+def test_repeated_name_stays_in_the_value():
+    fields, _ = parse_row_fields("type=1, body=a, type=2")
+    assert fields == {"type": "1", "body": "a, type=2"}
+
+
+def test_columns_restrict_field_names():
+    text = "_id=1, body=dinner, name=Bob, ok"
+    assert parse_row_fields(text)[0]["body"] == "dinner"
+    assert parse_row_fields(text, columns=set(SMS_COLUMNS))[0]["body"] == "dinner, name=Bob, ok"
+
+
+def test_null_and_missing_values():
+    fields, _ = parse_row_fields("a=NULL, b=")
+    assert fields == {"a": None, "b": ""}
+    assert parse_row_fields("no fields here") == ({}, {})
+
+
+def test_rows_group_continuation_lines():
+    rows = list(iter_rows(io.BytesIO(b"Error: ignored\n" + DUMP), set(SMS_COLUMNS)))
+    assert [row.row_no for row in rows] == [0, 1, 2]
+    assert rows[0]["body"] == "hi, see you at 5, ok?"
+    assert rows[1]["body"] == "first line\nsecond line, type=3"
+    assert rows[1].get_int("type") == 2
+    assert rows[2].get("address", "-") == "-"
+    assert rows[2].get_int("date") is None
+
+
+def test_row_spans_and_byte_offsets():
+    data = b"Error: ignored\n" + DUMP
+    for row in iter_rows(io.BytesIO(data)):
+        assert data[row.offset:row.offset + row.length].decode("utf-8") == row.text
+        body = row.byte_offset("body")
+        assert data[body:].decode("utf-8").startswith(row["body"])
+    assert row.byte_offset("missing") is None
+
+
+def test_read_rows_of_missing_file(tmp_path):
+    assert list(read_rows(str(tmp_path / "none.txt"))) == []
@@ -0,0 +1,141 @@
+import os
+import pytest
+import evidence
+from config import LOG_FILES
+
+
+def logcat_lines(start, count):
+    return "".join(f"05-{1 + i // 1000:02d} 10:{i // 60 % 60:02d}:{i % 60:02d}.000 I/Tag( {i:4d}): message {i}\n"
+                   for i in range(start, start + count)).encode()
+
+
+CASE_FILES = {"logcat": logcat_lines(0, 3000)}
+
+
+def read_all(path):
+    with evidence.open_container(path) as f:
+        return f.read()
+
+
+def test_round_trip_in_chunks_cut_at_lines(case):
+    source = open(LOG_FILES["logcat"], "rb").read()
+    index = evidence.write_container("logcat", chunk_bytes=4096)
+    path = evidence.container_path("logcat")
+    assert len(index.chunks) > 10
+    assert index.record_count == 3000
+    assert index.source_size == len(source)
+    assert read_all(path) == source
+    for chunk in index.chunks:
+        assert chunk.raw_offset == 0 or source[chunk.raw_offset - 1:chunk.raw_offset] == b"\n"
+        assert chunk.has_timestamps() and chunk.min_ts <= chunk.max_ts
+    assert evidence.verify(path) == []
+
+
+def test_random_access(case):
+    source = open(LOG_FILES["logcat"], "rb").read()
+    evidence.write_container("logcat", chunk_bytes=4096)
+    with evidence.open_container(evidence.container_path("logcat")) as f:
+        for offset in (0, 4095, 4096, 10000, len(source) - 5):
+            f.seek(offset)
+            assert f.read(100) == source[offset:offset + 100]
+        f.seek(-10, os.SEEK_END)
+        assert f.read() == source[-10:]
+
+
+def test_verify_reports_corrupt_chunks(case):
+    index = evidence.write_container("logcat", chunk_bytes=4096)
+    path = evidence.container_path("logcat")
+    with open(path, "r+b") as f:
+        f.seek(index.chunks[2].offset + 10)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert evidence.verify(path) == [2]
+
+
+def test_truncated_container_is_rejected(case):
+    evidence.write_container("logcat")
+    path = evidence.container_path("logcat")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    with pytest.raises(ValueError):
+        evidence.read_index(path)
+
+
+def test_time_range_scan_skips_old_chunks(case):
+    index = evidence.write_container("logcat", chunk_bytes=4096)
+    since_ms = index.chunks[-1].min_ts
+    lines = list(evidence.iter_lines_since(evidence.container_path("logcat"), since_ms, located=True))
+    source = open(LOG_FILES["logcat"], "rb").read()
+    assert lines[0][0] == index.chunks[-1].raw_offset
+    for offset, length, text in lines:
+        assert source[offset:offset + length].decode() == text
+
+
+def test_grown_logcat_is_appended(case):
+    first = evidence.pack_source("logcat", chunk_bytes=4096)
+    with open(LOG_FILES["logcat"], "ab") as f:
+        f.write(logcat_lines(3000, 500))
+    second = evidence.pack_source("logcat", chunk_bytes=4096)
+    path = evidence.container_path("logcat")
+    assert [c.sha256 for c in second.chunks[:len(first.chunks)]] == [c.sha256 for c in first.chunks]
+    assert second.record_count == 3500
+    assert read_all(path) == open(LOG_FILES["logcat"], "rb").read()
+    assert evidence.verify(path) == []
+    assert os.listdir(os.path.dirname(path)) == ["logcat.evd"]
+    # Unchanged source: the container is reused as is
+    assert evidence.pack_source("logcat").index_offset == second.index_offset
+
+
+def test_rewritten_logcat_is_repacked(case):
+    evidence.pack_source("logcat", chunk_bytes=4096)
+    with open(LOG_FILES["logcat"], "wb") as f:
+        f.write(logcat_lines(100, 4000))
+    index = evidence.pack_source("logcat", chunk_bytes=4096)
+    assert index.record_count == 4000
+    assert read_all(evidence.container_path("logcat")) == open(LOG_FILES["logcat"], "rb").read()
+
+
+def test_readers_fall_back_to_the_container(case):
+    source_path = LOG_FILES["logcat"]
+    source = open(source_path, "rb").read()
+    st = os.stat(source_path)
+    evidence.pack_logs(["logcat"])
+    os.remove(source_path)
+    assert evidence.log_exists(source_path)
+    assert evidence.log_signature(source_path) == (st.st_size, st.st_mtime_ns)
+    with evidence.open_log(source_path) as f:
+        assert f.read() == source
+    os.remove(evidence.container_path("logcat"))
+    assert not evidence.log_exists(source_path)
+    with pytest.raises(FileNotFoundError):
+        evidence.open_log(source_path)
+
+
+def test_container_map_slices_and_finds_across_chunks(case):
+    source = open(LOG_FILES["logcat"], "rb").read()
+    evidence.write_container("logcat", chunk_bytes=4096)
+    os.remove(LOG_FILES["logcat"])
+    with evidence.map_log(LOG_FILES["logcat"]) as mm:
+        assert len(mm) == len(source)
+        assert mm[4000:9000] == source[4000:9000]
+        assert mm[len(source) - 5:] == source[-5:]
+        for start in (0, 4090, 8190):
+            assert mm.find(b"\n", start) == source.find(b"\n", start)
+        assert mm.find(b"message 2999") == source.find(b"message 2999")
+        assert mm.rfind(b"\n", 0, 9000) == source.rfind(b"\n", 0, 9000)
+
+
+def test_archive_keeps_the_plain_file_if_the_container_does_not_verify(case, monkeypatch):
+    source_path = LOG_FILES["logcat"]
+    with monkeypatch.context() as m:
+        m.setattr(evidence, "verify", lambda path: [0])
+        with pytest.raises(ValueError):
+            evidence.archive_source("logcat")
+    assert os.path.exists(source_path)
+    index = evidence.archive_source("logcat")
+    assert not os.path.exists(source_path)
+    assert index.chunks
+    # Archiving again reads the container it left
+    again = evidence.archive_source("logcat")
+    assert [chunk.sha256 for chunk in again.chunks] == [chunk.sha256 for chunk in index.chunks]
@@ -0,0 +1,110 @@
+import os
+from datetime import datetime, timedelta
+import filter_cache
+import filtering
+from config import LOG_FILES
+from filter_cache import ResultBuilder, make_key
+from timestamps import to_ms
+
+NOW = datetime(2024, 5, 2, 12, 0, 0)
+
+
+def logcat_line(when, message):
+    return f"{when:%m-%d %H:%M:%S}.000 E/Tag( 1): {message}\n"
+
+
+def logcat_text():
+    lines = [logcat_line(NOW - timedelta(minutes=15 * i), f"fatal {i}" if i % 3 else f"ok {i}")
+             for i in range(200, -1, -1)]
+    # Dated by the line before it, 12.5 hours before NOW
+    lines.insert(151, "fatal without a timestamp\n")
+    return "".join(lines)
+
+
+CASE_FILES = {"logcat": logcat_text()}
+
+
+def scan(query, now):
+    """Filters the logcat as filter_logs does, returning the cached form of the result and the texts."""
+    plan = filtering.plan_filter(query=query, now=now)
+    builder = ResultBuilder(keep_timestamps=plan.relative)
+    texts = []
+    for offset, length, text, ts in filtering.iter_filtered_records(LOG_FILES["logcat"], plan, now):
+        builder.add(offset, length, ts)
+        texts.append(text)
+    return plan, builder.finish(plan.since_ms), texts
+
+
+def test_builder_round_trip(case):
+    builder = ResultBuilder()
+    for offset, length in ((0, 10), (10, 5), (300, 70000), (2 ** 33, 1)):
+        builder.add(offset, length)
+    result = builder.finish()
+    assert result.locations() == [(0, 10), (10, 5), (300, 70000), (2 ** 33, 1)]
+    assert result.count == 4
+    builder.add(0, 1)
+    assert not builder.valid
+
+
+def test_narrowing_matches_a_rescan(case):
+    plan, result, texts = scan("fatal time:24h", NOW)
+    assert "fatal without a timestamp\n" in texts
+    assert "fatal without a timestamp\n" not in scan("fatal time:24h", NOW + timedelta(hours=12))[2]
+    for hours in (1, 6, 12, 23, 30):
+        later = NOW + timedelta(hours=hours)
+        narrowed = result.narrowed(filtering.plan_filter(query="fatal time:24h", now=later).since_ms)
+        assert list(filter_cache.iter_records(LOG_FILES["logcat"], narrowed)) == scan("fatal time:24h", later)[2]
+    assert result.narrowed(plan.since_ms) is result
+
+
+def test_get_narrows_and_refuses_a_clock_going_back(case):
+    plan, result, texts = scan("fatal time:24h", NOW)
+    key = make_key(LOG_FILES["logcat"], plan, query="fatal time:24h")
+    filter_cache.put(key, result)
+    later_since = to_ms(NOW + timedelta(hours=6) - timedelta(hours=24))
+    narrowed = filter_cache.get(key, later_since)
+    assert narrowed.count < result.count
+    # The narrowed result replaces the stored one
+    assert filter_cache.get(key, later_since) is narrowed
+    assert filter_cache.get(key, plan.since_ms) is None
+
+
+def test_only_filters_that_narrow_over_time_are_cached(case):
+    path = LOG_FILES["logcat"]
+    assert make_key(path, filtering.plan_filter(query="fatal", now=NOW)) is not None
+    assert make_key(path, filtering.plan_filter(query="NOT time:1h", now=NOW)) is None
+    assert make_key(path, filtering.plan_filter(query="fatal OR time:1h", now=NOW)) is None
+    assert make_key("logs/missing.txt", filtering.plan_filter(query="fatal", now=NOW)) is None
+
+
+def test_key_changes_with_the_file(case):
+    path = LOG_FILES["logcat"]
+    plan = filtering.plan_filter(query="fatal", now=NOW)
+    key = make_key(path, plan, query="fatal")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("fatal again\n")
+    assert make_key(path, plan, query="fatal") != key
+
+
+def test_lru_is_bounded_by_bytes(case, monkeypatch):
+    monkeypatch.setattr(filter_cache, "FILTER_CACHE_BYTES", 3 * filter_cache._ENTRY_OVERHEAD + 100)
+    result = ResultBuilder().finish()
+    for name in "abc":
+        filter_cache.put((name,), result)
+    filter_cache.get(("a",))
+    filter_cache.put(("d",), result)
+    assert [key for key in filter_cache._results] == [("c",), ("a",), ("d",)]
+    filter_cache.invalidate("d")
+    assert filter_cache.get(("d",)) is None
+
+
+def test_filter_logs_reuses_the_output_file(case):
+    path = LOG_FILES["logcat"]
+    first = filtering.filter_logs(path, query="fatal", output_file="logs/out.txt")
+    expected = open("logs/out.txt", encoding="utf-8").read()
+    mtime = os.stat("logs/out.txt").st_mtime_ns
+    assert filtering.filter_logs(path, query="fatal", output_file="logs/out.txt") == first
+    assert os.stat("logs/out.txt").st_mtime_ns == mtime
+    os.remove("logs/out.txt")
+    assert filtering.filter_logs(path, query="fatal", output_file="logs/out.txt") == first
+    assert open("logs/out.txt", encoding="utf-8").read() == expected
@@ -0,0 +1,128 @@
+from datetime import datetime
+import pytest
+import filter_query
+from filter_query import parse, plan, from_controls, Literal, And, Or, Not, QueryError
+from timestamps import to_ms
+
+NOW = datetime(2024, 5, 2, 12, 0, 0)
+ERROR_LINE = "05-02 11:30:00.000 E/ActivityManager( 1234): FATAL EXCEPTION: main\n"
+INFO_LINE = "05-02 11:59:00.000 I/WindowManager(  600): see you later\n"
+OLD_LINE = "05-01 08:00:00.000 E/ActivityManager( 1234): FATAL EXCEPTION: main\n"
+SMS_ROW = ("Row: 0 _id=1, thread_id=2, address=+15550100, date=1714647600000, date_sent=1714647600000, "
+           "type=1, read=1, body=dinner at 8, name=Bob, ok?\n")
+
+
+def matches(query, line, content_rows=False, columns=None):
+    return plan(parse(query, NOW)).compile(content_rows, NOW, columns=columns)(line)
+
+
+def test_and_binds_tighter_than_or():
+    node = parse("a b OR c", NOW)
+    assert isinstance(node, Or)
+    assert isinstance(node.children[0], And)
+    assert [child.text for child in node.children[0].children] == ["a", "b"]
+    assert node.children[1].text == "c"
+
+
+def test_not_binds_tighter_than_and():
+    node = parse("NOT a b", NOW)
+    assert isinstance(node, And)
+    assert isinstance(node.children[0], Not)
+    assert node.children[1].text == "b"
+
+
+def test_dash_before_parenthesis_negates_the_group():
+    node = parse("fatal -(tag:ActivityManager OR tag:WindowManager)", NOW)
+    assert isinstance(node.children[1], Not)
+    assert isinstance(node.children[1].child, Or)
+    assert not matches("fatal -(tag:ActivityManager OR tag:WindowManager)", ERROR_LINE)
+    assert matches("-(tag:WindowManager)", ERROR_LINE)
+
+
+def test_lowercase_operators_are_words():
+    node = parse("see or you", NOW)
+    assert [child.text for child in node.children] == ["see", "or", "you"]
+
+
+def test_quoted_phrases_and_escapes():
+    assert parse('"see you"', NOW).text == "see you"
+    assert parse(r'"say \"hi\""', NOW).text == 'say "hi"'
+    assert parse(r'"back\\slash"', NOW).text == "back\\slash"
+    # Quoted operators are literals
+    assert isinstance(parse('"OR"', NOW), Literal)
+    # Only \" and \\ are escapes, so a quoted regex keeps its backslashes
+    assert matches(r'regex:"pid\(\s*\d+\)"', "pid( 1234)")
+
+
+def test_unknown_field_is_part_of_the_word():
+    node = parse("http://example.com Note:Foo", NOW)
+    assert [child.text for child in node.children] == ["http://example.com", "Note:Foo"]
+
+
+def test_known_field_with_bad_value_is_an_error():
+    with pytest.raises(QueryError):
+        parse("level:Q", NOW)
+    with pytest.raises(QueryError):
+        parse("severity:Nope", NOW)
+    with pytest.raises(QueryError):
+        parse("(fatal", NOW)
+    with pytest.raises(QueryError):
+        parse('"unbalanced', NOW)
+
+
+def test_time_all_is_elided():
+    assert parse("time:all", NOW) is None
+    assert isinstance(parse("fatal time:all", NOW), Literal)
+    assert parse("NOT time:all", NOW) is None
+    assert plan(parse("time:all", NOW)).compile(False, NOW)(OLD_LINE)
+
+
+def test_plan_orders_cheapest_first_and_reports_requirements():
+    p = plan(parse("time:24h regex:fatal tag:ActivityManager main", NOW))
+    assert [type(child).__name__ for child in p.node.children] == ["Literal", "LogcatField", "Pattern", "TimeWindow"]
+    assert p.literals == ["main"]
+    assert p.since_ms == to_ms(datetime(2024, 5, 1, 12, 0, 0))
+    assert p.relative and p.narrows_over_time
+
+
+def test_optional_time_window_is_no_lower_bound():
+    p = plan(parse("time:1h OR fatal", NOW))
+    assert p.since_ms is None
+    assert p.relative and not p.narrows_over_time
+    assert not plan(parse("NOT time:1h", NOW)).narrows_over_time
+
+
+def test_logcat_fields_and_time():
+    assert matches("level:error tag:activitymanager pid:1234", ERROR_LINE)
+    assert not matches("level:I", ERROR_LINE)
+    assert matches("time:24h", ERROR_LINE)
+    assert not matches("time:24h", OLD_LINE)
+    assert matches('after:"2024-05-02 11:00" before:2024-05-03', ERROR_LINE)
+
+
+def test_controls_are_anded_with_the_query():
+    node = from_controls(keyword="fatal", time_range="Past 24 Hours", query="tag:ActivityManager", now=NOW)
+    p = plan(node)
+    assert p.literals == ["fatal"]
+    assert p.compile(False, NOW)(ERROR_LINE)
+    assert not p.compile(False, NOW)(OLD_LINE)
+
+
+def test_since_applied_skips_only_open_ended_windows():
+    p = plan(parse("time:1h before:2024-05-02", NOW))
+    late_evening = SMS_ROW.replace("date=1714647600000", f"date={to_ms(datetime(2024, 5, 1, 23, 0))}", 1)
+    recent = SMS_ROW.replace("date=1714647600000", f"date={to_ms(datetime(2024, 5, 2, 11, 30))}", 1)
+    assert not p.compile(True, NOW)(late_evening)
+    # The record store already applied since_ms; the before: bound is still checked
+    assert p.compile(True, NOW, since_applied=True)(late_evening)
+    assert not p.compile(True, NOW, since_applied=True)(recent)
+
+
+def test_content_field_with_projection_keeps_body_intact():
+    columns = filter_query.CONTENT_QUERY_PROJECTIONS["sms"]
+    assert matches("body:bob", SMS_ROW, True, columns)
+    assert matches('body:"ok?"', SMS_ROW, True, columns)
+    assert matches("address:5550100 number:5550100", SMS_ROW, True, columns)
+    assert not matches("name:bob", SMS_ROW, True, columns)
+    # Words that are not columns never split a field, whichever projection
+    assert matches('body:"8, where=bob"', SMS_ROW.replace("name=", "where="), True)
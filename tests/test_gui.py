@@ -0,0 +1,52 @@
+import os
+import threading
+import evidence
+import gui
+from config import LOG_FILES
+
+LINES = [f"05-01 10:00:{i % 60:02d}.000 I/Tag( {i:4d}): message {i}\n" for i in range(2000)]
+CASE_FILES = {"logcat": "".join(LINES) + "no newline at the end"}
+
+
+def line_starts(data):
+    starts = [0] + [i + 1 for i, byte in enumerate(data) if byte == 10]
+    return starts if starts[-1] < len(data) else starts[:-1]
+
+
+def test_line_offsets_are_cached_until_the_file_changes(case):
+    path = LOG_FILES["logcat"]
+    data = open(path, "rb").read()
+    size, offsets = gui.line_offsets(path)
+    assert (size, list(offsets)) == (len(data), line_starts(data))
+    assert gui.line_offsets(path)[1] is offsets
+    with open(path, "ab") as f:
+        f.write(b"\nappended\n")
+    size, grown = gui.line_offsets(path)
+    assert grown is not offsets
+    assert list(grown) == line_starts(data + b"\nappended\n")
+    # An archived log has the same signature, so its cached offsets still serve
+    evidence.archive_logs(["logcat"])
+    assert not os.path.exists(path)
+    assert gui.line_offsets(path)[1] is grown
+    gui.clear_offsets_cache()
+    assert gui.line_offsets(path)[1] == grown
+
+
+def test_concurrent_viewers_scan_a_file_once(case, monkeypatch):
+    scans = []
+    scan = gui._scan_offsets
+    monkeypatch.setattr(gui, "_scan_offsets", lambda mm, size: scans.append(size) or scan(mm, size))
+    sources = [("===== Logcat Logs =====", LOG_FILES["logcat"], None), (None, LOG_FILES["sms"], "No SMS logs.")]
+    opened = []
+    threads = [threading.Thread(target=lambda: opened.append(gui._open_segments(sources))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(scans) == 1
+    for segments in opened:
+        assert [len(segment) for segment in segments] == [2, len(LINES) + 1, 1]
+        assert segments[1].line(len(LINES)) == "no newline at the end"
+        assert segments[2].line(0) == "No SMS logs."
+        for segment in segments:
+            segment.close()
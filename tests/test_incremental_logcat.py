@@ -0,0 +1,161 @@
+import os
+from datetime import datetime, timedelta
+import aggregation
+import evidence
+import filter_query
+import filtering
+import sharded_scan
+import timestamp_index
+import token_index
+from config import LOG_FILES, LOG_TYPES, LOGCAT_INCOMING_PATH
+from record_store import count_records
+from scripts import incremental_logcat
+from scripts.incremental_logcat import (category_file_path, categorize_logcat, cursor_from_file, load_cursor,
+                                        merge_incoming, new_lines, reset_after_full_dump)
+from timestamps import to_ms
+
+NOW = datetime.now().replace(microsecond=0)
+TAGS = ["ActivityManager", "dalvikvm", "WifiManager", "AndroidRuntime", "MyApp"]
+MESSAGES = ["Start proc com.example", "GC_CONCURRENT freed 512K", "socket connected", "FATAL EXCEPTION: main",
+            "tick"]
+
+
+def line(i):
+    """The i-th line of the device's log, 6 seconds after the one before; line 500 would be at NOW."""
+    when = NOW - timedelta(seconds=6 * (500 - i))
+    return f"{when:%m-%d %H:%M:%S}.000 I/{TAGS[i % 5]}( {100 + i % 7}): {MESSAGES[i % 5]} {i}\n"
+
+
+def pull(first, last):
+    """Stages the pull adb would return for entries first..last-1; returns its lines."""
+    lines = [line(i) for i in range(first, last)]
+    with open(LOGCAT_INCOMING_PATH, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    return lines
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def category_contents():
+    return {log_type: read(category_file_path(log_type)) for log_type in LOG_TYPES}
+
+
+def test_cursor_holds_the_newest_lines(case):
+    newest = line(5)
+    same_time = newest.replace("tick", "tock")
+    with open(LOG_FILES["logcat"], "w", encoding="utf-8") as f:
+        f.writelines([line(1), newest, line(3), same_time, "--------- beginning of main\n"])
+    cursor = cursor_from_file()
+    assert cursor["last_ts"] == to_ms(NOW - timedelta(seconds=6 * 495))
+    assert cursor["tail_hashes"] == [incremental_logcat._line_hash(raw.encode()) for raw in (newest, same_time)]
+
+
+def test_new_lines_drop_what_is_already_on_disk(case):
+    with open(LOG_FILES["logcat"], "w", encoding="utf-8") as f:
+        f.writelines(line(i) for i in range(5))
+    cursor = cursor_from_file()
+    late = line(4).replace("tick", "late")
+    with open(LOGCAT_INCOMING_PATH, "w", encoding="utf-8") as f:
+        # -T is inclusive: the pull repeats the newest entry, and brings one more at its time
+        f.writelines([line(3), "--------- beginning of main\n", line(4), "\tat a dropped entry\n", late,
+                      "\tat a kept entry\n", line(5)])
+        f.write(line(6).rstrip("\n"))
+    assert [raw.decode() for raw in new_lines(LOGCAT_INCOMING_PATH, cursor)] == \
+        [late, "\tat a kept entry\n", line(5), line(6)]
+
+
+def test_merge_incoming_extends_the_log_and_everything_derived(case):
+    path = LOG_FILES["logcat"]
+    first = pull(0, 300)
+    count, categorized, appended = merge_incoming(None)
+    assert (count, appended) == (300, False)
+    token_index.build_index(path)
+    # The next pull overlaps the last 20 entries
+    second = pull(280, 500)
+    count, added, appended = merge_incoming(load_cursor())
+    assert (count, appended) == (200, True)
+    assert not os.path.exists(LOGCAT_INCOMING_PATH)
+    assert read(path) == "".join(first + second[20:])
+    assert load_cursor() == cursor_from_file(path)
+    # Every derived file was extended to what a rebuild gives
+    assert timestamp_index.load_index(path) == timestamp_index.build_index(path)
+    extended = token_index.load_index(path)
+    assert extended is not None
+    token_index.clear_cache()
+    assert extended.terms == token_index.build_index(path).terms
+    assert count_records("logcat") == 500
+    appended_categories = category_contents()
+    total = categorize_logcat()
+    assert category_contents() == appended_categories
+    assert total == {log_type: categorized[log_type] + added[log_type] for log_type in LOG_TYPES}
+
+
+def test_an_empty_pull_keeps_the_cursor(case):
+    pull(0, 10)
+    merge_incoming(None)
+    cursor = load_cursor()
+    pull(9, 10)
+    assert merge_incoming(cursor)[0] == 0
+    assert load_cursor() == cursor
+
+
+def test_rolled_segments_are_read_as_one_log(case, monkeypatch):
+    path = LOG_FILES["logcat"]
+    monkeypatch.setattr(incremental_logcat, "LOGCAT_SEGMENT_BYTES", 8000)
+    pull(0, 100)
+    merge_incoming(None)
+    token_index.build_index(path)
+    for first in range(90, 400, 100):
+        pull(first, first + 110)
+        merge_incoming(load_cursor())
+    expected = "".join(line(i) for i in range(500))
+    segments = evidence.segment_paths(path)
+    assert len(segments) >= 2
+    assert os.path.getsize(path) <= 8000
+    assert "".join(read(part) for part in evidence.plain_parts(path)) == expected
+    with evidence.open_log(path) as f:
+        assert f.read().decode() == expected
+    assert evidence.log_signature(path)[0] == len(expected)
+    # The indexes were extended across the rolls, at offsets into the whole log
+    assert timestamp_index.load_index(path) == timestamp_index.build_index(path)
+    assert list(token_index.search(path, ["start proc"])) == [line(i) for i in range(0, 500, 5)]
+    assert count_records("logcat") == 500
+    assert aggregation.summarize_logcat().total == 500
+    # Filters, through the timestamp index, the token index and a plain scan
+    for criteria in [dict(keyword="FATAL"), dict(query="fatal time:30m"), dict(query="socket OR tick")]:
+        plan = filtering.plan_filter(now=NOW, **criteria)
+        ctx = filter_query.EntryContext(False, NOW, logcat=True)
+        entries = ((0, 0, text) for text in expected.splitlines(True))
+        matches = [text for _, _, text, _ in plan.select(entries, ctx)]
+        assert matches
+        assert filtering.filter_logs(path, use_cache=False, **criteria) == len(matches)
+        assert read("logs/filtered_logs.txt") == "".join(matches)
+    appended_categories = category_contents()
+    categorize_logcat()
+    assert category_contents() == appended_categories
+    # Sharded scans map every segment
+    monkeypatch.setattr(sharded_scan, "SHARDED_SCAN_MIN_BYTES", 1)
+    monkeypatch.setattr(sharded_scan, "SCAN_PROCESSES", 2)
+    monkeypatch.setattr(sharded_scan, "SHARDS_PER_PROCESS", 5)
+    categorize_logcat()
+    assert category_contents() == appended_categories
+    assert aggregation.summarize_logcat().total == 500
+    os.remove(token_index.index_path(path))
+    token_index.clear_cache()
+    assert filtering.filter_logs(path, use_cache=False, query="tick") == 100
+    assert filtering.filter_logs(path, use_cache=False, query="fatal time:30m") == 60
+    # The container holds the whole log
+    container = evidence.container_path("logcat")
+    assert evidence.pack_source("logcat").source_size == len(expected)
+    assert evidence.verify(container) == []
+    with evidence.open_container(container) as f:
+        assert f.read().decode() == expected
+    # A full dump replaces the whole log
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line(i) for i in range(500, 510))
+    reset_after_full_dump()
+    assert evidence.segment_paths(path) == []
+    assert sum(categorize_logcat().values()) <= 10
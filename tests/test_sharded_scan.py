@@ -0,0 +1,69 @@
+import pytest
+import aggregation
+import filtering
+import sharded_scan
+from benchmarks.generators import generate_case
+from config import LOG_FILES, LOG_TYPES
+from content_rows import ROW_PREFIX, iter_rows, read_rows
+from scripts.incremental_logcat import categorize_logcat, category_file_path
+
+FILTERS = [("logcat", {"keyword": "fatal"}), ("logcat", {"severity": "Error"}),
+           ("logcat", {"query": "(exception OR fatal) NOT tag:ActivityManager"}),
+           ("sms", {"keyword": "sent from my phone"}), ("sms", {"query": "see OR phone"}),
+           ("calls", {"query": "type:3"})]
+
+
+@pytest.fixture
+def generated(case, monkeypatch):
+    generate_case(str(case), 2000)
+    # Many small ranges, so range bounds fall inside multi-line SMS rows too
+    monkeypatch.setattr(sharded_scan, "SHARDED_SCAN_MIN_BYTES", 1)
+    monkeypatch.setattr(sharded_scan, "SHARDS_PER_PROCESS", 100)
+    return case
+
+
+def run(monkeypatch, processes, fn, *args, **kwargs):
+    monkeypatch.setattr(sharded_scan, "SCAN_PROCESSES", processes)
+    assert sharded_scan.should_shard(LOG_FILES["logcat"]) == (processes > 1)
+    return fn(*args, **kwargs)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("source,criteria", FILTERS)
+def test_filter_matches_serial_scan(generated, monkeypatch, source, criteria):
+    outputs = []
+    for processes in (1, 3):
+        count = run(monkeypatch, processes, filtering.filter_logs, LOG_FILES[source], use_cache=False, **criteria)
+        outputs.append((count, read("logs/filtered_logs.txt")))
+    assert outputs[0][0] > 0
+    assert outputs[1] == outputs[0]
+
+
+def test_categories_match_serial_scan(generated, monkeypatch):
+    outputs = []
+    for processes in (1, 3):
+        run(monkeypatch, processes, categorize_logcat)
+        outputs.append({log_type: read(category_file_path(log_type)) for log_type in LOG_TYPES})
+    assert any(outputs[0].values())
+    assert outputs[1] == outputs[0]
+
+
+def test_logcat_summary_matches_serial_scan(generated, monkeypatch):
+    serial = run(monkeypatch, 1, aggregation.summarize_logcat)
+    sharded = run(monkeypatch, 3, aggregation.summarize_logcat)
+    assert serial.total == 2000
+    assert vars(sharded) == vars(serial)
+
+
+def test_ranges_keep_content_rows_whole(generated):
+    path = LOG_FILES["sms"]
+    with sharded_scan.mapped(path) as mm:
+        ranges = sharded_scan.split_ranges(mm, 0, len(mm), 300, ROW_PREFIX)
+        rows = [start + row.offset for start, end in ranges
+                for row in iter_rows(sharded_scan.iter_lines(mm, start, end))]
+    assert len(ranges) > 100
+    assert rows == [row.offset for row in read_rows(path)]
@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+import evidence
+import filter_query
+import filtering
+import sharded_scan
+import timestamp_index
+import token_index
+from benchmarks.generators import generate_case
+from config import CONTENT_QUERY_PROJECTIONS, LOG_FILES
+from timestamps import to_ms
+
+NOW = datetime.now().replace(microsecond=0)
+# Lines and rows per source, spread over the day (logcat) or week (SMS) before NOW
+COUNT = 5000
+LOGCAT_QUERIES = ["fatal time:1h", "fatal time:24h", "fatal time:6h NOT time:1h", "exception OR fatal time:2h",
+                  f'fatal before:"{NOW - timedelta(hours=12):%Y-%m-%d %H:%M}"', "time:30m"]
+SMS_QUERIES = ["undated time:24h", "see time:1d", "undated"]
+# Undated lines: the first line, one about 24 hours old, one on an index block boundary, one recent,
+# and a recent one after a prefix with an impossible date
+UNDATED = {0: "--------- beginning of main\n", 15: "fatal continuation, a day old\n",
+           timestamp_index.DEFAULT_STRIDE * 10: "fatal at a block start\n",
+           COUNT - 10: "fatal continuation, recent\n", COUNT - 9: "\tat com.example.Fatal.run\n",
+           COUNT - 8: "13-45 10:00:00.000 E/Tag( 1): fatal on a bad date\n", COUNT - 7: "fatal after a bad date\n"}
+
+
+@pytest.fixture
+def dated_case(case):
+    generate_case(str(case), COUNT, anchor=NOW)
+    path = LOG_FILES["logcat"]
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    for line_no in sorted(UNDATED):
+        lines.insert(line_no, UNDATED[line_no])
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    with open(LOG_FILES["sms"], "a", encoding="utf-8") as f:
+        f.write(f"Row: {COUNT} _id={COUNT + 1}, address=+15550199, date=NULL, type=1, body=undated see you\n")
+    return case
+
+
+def plain_scan(source, query):
+    """The matches of a scan of every entry, through no index."""
+    plan = filtering.plan_filter(query=query, now=NOW)
+    content_rows = source != "logcat"
+    read = filtering.read_content_records if content_rows else filtering.read_lines
+    ctx = filter_query.EntryContext(content_rows, NOW, CONTENT_QUERY_PROJECTIONS.get(source), source == "logcat")
+    return [text for _, _, text, _ in plan.select(read(LOG_FILES[source], True), ctx)]
+
+
+def filtered(source, query):
+    plan = filtering.plan_filter(query=query, now=NOW)
+    return [text for _, _, text, _ in filtering.iter_filtered_records(LOG_FILES[source], plan, NOW,
+                                                                      {"query": query})]
+
+
+def test_undated_lines_take_the_previous_date():
+    ctx = filter_query.EntryContext(False, NOW, logcat=True)
+    plan = filtering.plan_filter(query="fatal time:1h", now=NOW)
+    recent = f"{NOW - timedelta(minutes=5):%m-%d %H:%M:%S}.000 E/Tag( 1): fatal\n"
+    old = f"{NOW - timedelta(hours=5):%m-%d %H:%M:%S}.000 E/Tag( 1): fatal\n"
+    bad = "13-45 10:00:00.000 E/Tag( 1): fatal\n"
+    lines = ["fatal before any date\n", old, "fatal after the old line\n", recent, "fatal after the recent line\n",
+             bad, "fatal after the bad date\n"]
+    matches = [text for _, _, text, _ in plan.select(((0, 0, line) for line in lines), ctx)]
+    assert matches == [recent, "fatal after the recent line\n"]
+
+
+@pytest.mark.parametrize("query", LOGCAT_QUERIES)
+def test_logcat_paths_agree_with_a_plain_scan(dated_case, monkeypatch, query):
+    expected = plain_scan("logcat", query)
+    assert expected
+    # The timestamp index seek
+    assert filtered("logcat", query) == expected
+    # The token index
+    token_index.build_indexes(["logcat"])
+    assert filtered("logcat", query) == expected
+    # Sharded ranges
+    monkeypatch.setattr(sharded_scan, "SHARDED_SCAN_MIN_BYTES", 1)
+    monkeypatch.setattr(sharded_scan, "SCAN_PROCESSES", 3)
+    os.remove(token_index.index_path(LOG_FILES["logcat"]))
+    token_index.clear_cache()
+    assert filtered("logcat", query) == expected
+    # An archived case: the container chunks
+    monkeypatch.setattr(sharded_scan, "SCAN_PROCESSES", 1)
+    evidence.write_container("logcat", chunk_bytes=64 * 1024)
+    os.remove(LOG_FILES["logcat"])
+    assert filtered("logcat", query) == expected
+
+
+def test_recent_undated_lines_are_found_through_every_index(dated_case):
+    expected = plain_scan("logcat", "fatal time:1h")
+    assert "fatal continuation, recent\n" in expected
+    assert "fatal continuation, a day old\n" not in expected
+    assert "fatal after a bad date\n" not in expected
+    token_index.build_indexes(["logcat"])
+    assert filtered("logcat", "fatal time:1h") == expected
+
+
+@pytest.mark.parametrize("query", SMS_QUERIES)
+def test_content_paths_agree_with_a_plain_scan(dated_case, query):
+    expected = plain_scan("sms", query)
+    # The record store (time windows) or a scan
+    assert filtered("sms", query) == expected
+    token_index.build_indexes(["sms"])
+    assert filtered("sms", query) == expected
+
+
+def test_update_index_matches_a_rebuild(dated_case):
+    path = LOG_FILES["logcat"]
+    timestamp_index.build_index(path)
+    previous_size = os.path.getsize(path)
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(1000):
+            f.write(f"{NOW + timedelta(seconds=i):%m-%d %H:%M:%S}.000 I/Tag( 1): appended {i}\n")
+    updated = timestamp_index.update_index(path, previous_size)
+    assert timestamp_index.load_index(path) == updated
+    assert updated == timestamp_index.build_index(path)
+    since = to_ms(NOW + timedelta(seconds=500))
+    assert timestamp_index.seek_offset(path, since) <= os.path.getsize(path) - 500 * 40
@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from timestamps import (LogcatClock, LineDecoder, decode_iso, decode_date_field, to_ms, from_ms, local_ms,
+                        clear_offset_cache)
+
+
+@pytest.fixture(autouse=True)
+def new_york(monkeypatch):
+    # A zone with DST, so hour bases must be looked up per hour
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    clear_offset_cache()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+    clear_offset_cache()
+
+
+def reference(text, year):
+    return to_ms(datetime.strptime(f"{year}-{text}", "%Y-%m-%d %H:%M:%S.%f"))
+
+
+@pytest.mark.parametrize("text", ["03-10 01:59:59.999", "03-10 03:00:00.000", "07-04 12:34:56.789",
+                                  "11-03 00:30:00.000", "11-03 01:30:00.000", "11-03 02:30:00.250", "02-29 23:59:59.001"])
+def test_logcat_clock_matches_strptime(text):
+    clock = LogcatClock(datetime(2024, 12, 1))
+    assert clock.decode(text + " I/Tag( 1): x") == reference(text, 2024)
+    assert clock.decode_bytes((text + " I/Tag( 1): x").encode()) == reference(text, 2024)
+    assert clock.epoch_ms(int(text[:2]), int(text[3:5]), int(text[6:8]), int(text[9:11]), int(text[12:14]),
+                          int(text[15:18])) == reference(text, 2024)
+
+
+def test_dst_hours_differ_from_a_fixed_offset():
+    clock = LogcatClock(datetime(2024, 12, 1))
+    before = clock.decode("03-10 01:00:00.000")
+    after = clock.decode("03-10 03:00:00.000")
+    # 02:00 does not exist that night, so the two wall-clock hours are one real hour apart
+    assert after - before == 3600 * 1000
+
+
+def test_year_is_inferred_from_now():
+    clock = LogcatClock(datetime(2024, 1, 5, 12, 0))
+    assert from_ms(clock.decode("12-31 23:00:00.000")).year == 2023
+    assert from_ms(clock.decode("01-05 08:00:00.000")).year == 2024
+    assert from_ms(clock.decode("01-06 08:00:00.000")).year == 2023
+
+
+@pytest.mark.parametrize("line", ["02-30 10:00:00.000", "13-01 10:00:00.000", "ab-cd 10:00:00.000",
+                                  "05-01 10:00:00", "05-01T10:00:00.000", "", "Row: 0 _id=1"])
+def test_logcat_clock_rejects_bad_layouts(line):
+    assert LogcatClock(datetime(2024, 12, 1)).decode(line) is None
+
+
+def test_iso_and_date_field():
+    assert decode_iso("2024-11-03 01:30:00 x") == to_ms(datetime(2024, 11, 3, 1, 30))
+    assert decode_iso("2024-07-04T12:00:05") == to_ms(datetime(2024, 7, 4, 12, 0, 5))
+    assert decode_iso("at 2024-07-04 12:00:05", 3) == to_ms(datetime(2024, 7, 4, 12, 0, 5))
+    assert decode_iso("2024-02-30 12:00:00") is None
+    assert decode_iso("2024/07/04 12:00:00") is None
+    assert decode_date_field("Row: 0 _id=1, date=1714557600000, body=x") == 1714557600000
+    assert decode_date_field("Row: 0 _id=1, date_sent=5, body=update=3") is None
+
+
+def test_line_decoder_order():
+    decoder = LineDecoder(datetime(2024, 12, 1))
+    assert decoder.decode("05-01 10:00:00.500 I/Tag( 1): 2020-01-01 00:00:00") == reference("05-01 10:00:00.500", 2024)
+    assert decoder.decode("2024-05-01 10:00:00 Alice called") == to_ms(datetime(2024, 5, 1, 10))
+    assert decoder.decode("call at 2024-05-01 10:00:00, date=1") == to_ms(datetime(2024, 5, 1, 10))
+    assert decoder.decode("Row: 0 _id=1, date=1714557600000") == 1714557600000
+    assert decoder.decode("seen 05-01 10:00:00 somewhere") == reference("05-01 10:00:00.000", 2024)
+    assert decoder.decode("no timestamp here") is None
+
+
+def test_local_ms_uses_the_offset_at_each_timestamp():
+    day_ms = 24 * 3600 * 1000
+    for when in (datetime(2024, 3, 9, 23, 59), datetime(2024, 3, 10, 0, 0), datetime(2024, 3, 10, 23, 59),
+                 datetime(2024, 11, 3, 0, 30), datetime(2024, 11, 3, 23, 59), datetime(2024, 7, 1, 0, 0)):
+        local = local_ms(to_ms(when))
+        assert datetime(1970, 1, 1) + timedelta(milliseconds=local) == when
+        assert (datetime(1970, 1, 1) + timedelta(days=local // day_ms)).date() == when.date()
+
+
+
+def test_bucket_counts_follow_dst_and_skip_implausible_timestamps():
+    from graphing import bucket_counts
+    times = [datetime(2024, 11, 2, 23, 30), datetime(2024, 11, 3, 0, 30), datetime(2024, 11, 3, 23, 30),
+             datetime(2024, 11, 4, 0, 0)]
+    starts, counts = bucket_counts([0] + [to_ms(when) for when in times], "Day")
+    assert starts == [datetime(2024, 11, 2), datetime(2024, 11, 3), datetime(2024, 11, 4)]
+    assert counts == [1, 2, 1]
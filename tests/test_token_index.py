@@ -0,0 +1,116 @@
+import pytest
+import token_index
+from config import LOG_FILES
+from token_index import encode_postings, decode_postings, build_index, load_index, search
+
+LOGCAT = ("05-01 10:00:00.000 E/ActivityManager( 1234): FATAL EXCEPTION: main\n"
+          "05-01 10:00:01.000 I/WindowManager(  600): Focus moved to com.example.app/.Main\n"
+          "05-01 10:00:02.000 W/System.err( 1234): java.lang.NullPointerException at foo.Bar\n"
+          "05-01 10:00:03.000 D/dalvikvm( 1234): GC_CONCURRENT freed 2048K\n"
+          "not a logcat line, fatal anyway\n"
+          "05-01 10:00:05.000 E/AndroidRuntime( 1234): Process: com.example.app, PID: 1234\n")
+SMS = ("Row: 0 _id=1, address=+15550100, date=1714557600000, body=See you at 5\n"
+       "Row: 1 _id=2, address=+15550101, date=1714561200000, body=first line\n"
+       "dinner tonight?\n"
+       "Row: 2 _id=3, address=+15550100, date=1714564800000, body=ok\n")
+KEYWORDS = ["fatal", "FATAL EXCEPTION", "exception", "xception: ma", "com.example", "example.app",
+            "nullpointer", "2048k", "see you", "dinner", "5550100", "line\ndinner", "at", "zzz", "e/a"]
+
+
+CASE_FILES = {"logcat": LOGCAT, "sms": SMS}
+
+
+def test_postings_round_trip():
+    ids = [0, 1, 127, 128, 300, 16384, 2 ** 40]
+    data = bytearray()
+    encode_postings(ids, data)
+    assert decode_postings(data, 0, len(data)) == ids
+    # Gaps, not ids, are encoded: close ids stay one byte each
+    data = bytearray()
+    encode_postings([1000, 1001, 1002], data)
+    assert len(data) == 4
+
+
+@pytest.mark.parametrize("source", ["logcat", "sms"])
+def test_candidates_include_every_match(case, source):
+    path = LOG_FILES[source]
+    index = build_index(path)
+    records = list(index.iter_records(range(index.record_count)))
+    assert "".join(records) == open(path, encoding="utf-8").read()
+    for keyword in KEYWORDS:
+        expected = [i for i, text in enumerate(records) if keyword.lower() in text.lower()]
+        candidates = index.candidates([keyword])
+        if candidates is None:
+            # Too short to narrow the search; the caller scans
+            assert len(max(token_index.tokenize(keyword), key=len, default="")) < token_index.MIN_FRAGMENT
+            continue
+        assert set(expected) <= set(candidates), keyword
+        assert candidates == sorted(candidates)
+
+
+def test_whole_words_narrow_exactly(case):
+    index = build_index(LOG_FILES["logcat"])
+    # "exception" inside the needle is bounded on both sides, so it must be a whole token
+    assert index.candidates([" exception "]) == [0]
+    assert index.candidates(["nullpointer", "foo"]) == [2]
+    assert index.candidates(["fatal", "process"]) == []
+
+
+def test_search_is_located_and_filters_by_time(case):
+    path = LOG_FILES["sms"]
+    build_index(path)
+    found = list(search(path, ["5550100"], located=True))
+    data = open(path, "rb").read()
+    assert [text for _, _, text, _ in found] == [data[o:o + n].decode() for o, n, _, _ in found]
+    assert [ts for _, _, _, ts in found] == [1714557600000, 1714564800000]
+    later = list(search(path, ["5550100"], since_ms=1714561200000))
+    assert later == [found[1][2]]
+
+
+def test_stale_index_is_ignored(case):
+    path = LOG_FILES["logcat"]
+    build_index(path)
+    assert search(path, ["fatal"]) is not None
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("05-01 10:00:06.000 E/Tag( 1): fatal again\n")
+    assert load_index(path) is None
+    assert search(path, ["fatal"]) is None
+
+
+def assert_same_index(index, rebuilt):
+    assert index.signature == rebuilt.signature
+    assert list(index.offsets) == list(rebuilt.offsets)
+    assert list(index.lengths) == list(rebuilt.lengths)
+    assert list(index.timestamps) == list(rebuilt.timestamps)
+    assert index.terms == rebuilt.terms
+    assert list(index.doc_freq) == list(rebuilt.doc_freq)
+    assert [index.term_postings(i) for i in range(len(index.terms))] == \
+        [rebuilt.term_postings(i) for i in range(len(rebuilt.terms))]
+
+
+def test_update_index_matches_a_rebuild(case):
+    path = LOG_FILES["logcat"]
+    build_index(path)
+    previous_size = len(LOGCAT.encode())
+    with open(path, "a", encoding="utf-8") as f:
+        # An undated line first: it takes the date of the last indexed line
+        f.write("fatal continuation\n"
+                "05-01 10:00:06.000 E/AndroidRuntime( 1234): FATAL EXCEPTION: worker\n"
+                "05-01 10:00:07.000 I/NewTag(  99): brand new words\n")
+    index = token_index.update_index(path, previous_size)
+    assert load_index(path) is index
+    assert index.timestamps[6] == index.timestamps[5]
+    assert_same_index(token_index._read_index(path), index)
+    token_index.clear_cache()
+    assert_same_index(index, build_index(path))
+
+
+def test_update_index_rebuilds_when_it_cannot_extend(case):
+    path = LOG_FILES["logcat"]
+    build_index(path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("05-01 10:00:06.000 E/Tag( 1): fatal again\n")
+    # Not the size the index was built for
+    index = token_index.update_index(path, len(LOGCAT.encode()) - 1)
+    token_index.clear_cache()
+    assert_same_index(index, build_index(path))
@@ -0,0 +1,51 @@
+import threading
+from workers import UIDispatcher, WorkerPool
+
+
+def test_superseding_job_waits_without_holding_a_worker():
+    pool = WorkerPool(UIDispatcher(), max_workers=2)
+    started, release = threading.Event(), threading.Event()
+    order = []
+    try:
+        first = pool.submit("filter", lambda: started.set() or release.wait(5) and order.append("first"))
+        assert started.wait(5)
+        second = pool.submit("filter", lambda: order.append("second"))
+        other = pool.submit("graph", lambda: order.append("other"))
+        # The second filter waits for the first, but leaves the other worker free
+        assert other.wait(5)
+        assert order == ["other"]
+        release.set()
+        assert second.wait(5)
+        assert first.cancelled() and order == ["other", "first", "second"]
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_same_key_jobs_run_one_at_a_time_and_only_the_latest_runs():
+    pool = WorkerPool(UIDispatcher(), max_workers=4)
+    started, release = threading.Event(), threading.Event()
+    running = []
+    overlaps = []
+    ran = []
+
+    def work(name):
+        if running:
+            overlaps.append(name)
+        running.append(name)
+        started.set()
+        release.wait(5)
+        running.remove(name)
+        ran.append(name)
+
+    try:
+        jobs = [pool.submit("filter", work, 0)]
+        assert started.wait(5)
+        jobs += [pool.submit("filter", work, i) for i in range(1, 5)]
+        release.set()
+        assert all(job.wait(5) for job in jobs)
+        assert overlaps == []
+        assert ran == [0, 4]
+    finally:
+        release.set()
+        pool.shutdown()
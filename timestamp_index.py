@@ -0,0 +1,159 @@
+# timestamp_index.py
+"""
+Sidecar timestamp -> byte offset index for logcat dumps.
+
+The logcat file is split into blocks of STRIDE lines; for every block the
+index keeps the block's byte offset and the newest timestamp seen up to
+the end of that block. That running maximum is sorted, so a "since" query
+bisects to the first block that can hold entries inside the window and
+skips every block before it without reading it, even if the dump is not
+perfectly ordered. The index lives next to the log as "<file>.tsidx" and
+is rebuilt when the log's size or mtime changes. A segmented logcat is
+indexed as one file (see evidence.py).
+"""
+import os
+import struct
+from array import array
+from bisect import bisect_left
+import evidence
+from record_store import parse_logcat
+
+DEFAULT_STRIDE = 256
+INDEX_SUFFIX = ".tsidx"
+
+_MAGIC = b"TSIX"
+_VERSION = 1
+# magic, version, stride, source size, source mtime_ns, block count
+_HEADER = struct.Struct("<4sIIqqq")
+_NO_TIMESTAMP = -(2 ** 63)
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def _signature(path):
+    signature = evidence.plain_signature(path)
+    if signature is None:
+        raise FileNotFoundError(path)
+    return signature
+
+
+def _scan_blocks(f, offsets, max_ts, stride, start_line=0, start_offset=0):
+    """Appends a block entry every stride lines from start_line, then restores the running maximum."""
+    first_block = len(offsets)
+    for line_no, ts, _, _, _, offset, _ in parse_logcat(f, start_line, start_offset):
+        if line_no % stride == 0:
+            offsets.append(offset)
+            max_ts.append(_NO_TIMESTAMP)
+        if ts is not None and ts > max_ts[-1]:
+            max_ts[-1] = ts
+    # Turn per-block maxima into a running maximum so it can be bisected
+    for i in range(max(1, first_block), len(max_ts)):
+        if max_ts[i] < max_ts[i - 1]:
+            max_ts[i] = max_ts[i - 1]
+
+
+def _write_index(path, stride, offsets, max_ts):
+    size, mtime_ns = _signature(path)
+    tmp_path = index_path(path) + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, _VERSION, stride, size, mtime_ns, len(offsets)))
+        offsets.tofile(out)
+        max_ts.tofile(out)
+    os.replace(tmp_path, index_path(path))
+
+
+def build_index(path, stride=DEFAULT_STRIDE):
+    """Scans a logcat file once and writes its sidecar index. Returns the (offsets, max_ts) arrays."""
+    offsets = array("q")
+    max_ts = array("q")
+    with evidence.open_plain(path) as f:
+        _scan_blocks(f, offsets, max_ts, stride)
+    _write_index(path, stride, offsets, max_ts)
+    return offsets, max_ts
+
+
+def update_index(path, previous_size):
+    """
+    Extends the index of a logcat file that grew by appending to it since it was indexed at
+    previous_size. Only the last indexed block and the appended bytes are scanned; anything
+    else (no index, different prefix size) falls back to build_index.
+    """
+    try:
+        with open(index_path(path), "rb") as f:
+            magic, version, stride, size, _, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION or size != previous_size or count == 0:
+                return build_index(path)
+            offsets = array("q")
+            max_ts = array("q")
+            offsets.fromfile(f, count)
+            max_ts.fromfile(f, count)
+    except (FileNotFoundError, EOFError, struct.error):
+        return build_index(path)
+    # Re-scan the last block, which may have been partial, together with the new lines
+    last_block = len(offsets) - 1
+    start_offset = offsets[last_block]
+    del offsets[last_block:]
+    del max_ts[last_block:]
+    with evidence.open_plain(path) as f:
+        f.seek(start_offset)
+        _scan_blocks(f, offsets, max_ts, stride, last_block * stride, start_offset)
+    _write_index(path, stride, offsets, max_ts)
+    return offsets, max_ts
+
+
+def load_index(path):
+    """Returns the (offsets, max_ts) arrays of a still-valid sidecar index, or None."""
+    try:
+        with open(index_path(path), "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, _, size, mtime_ns, count = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION or (size, mtime_ns) != _signature(path):
+                return None
+            offsets = array("q")
+            max_ts = array("q")
+            offsets.fromfile(f, count)
+            max_ts.fromfile(f, count)
+            return offsets, max_ts
+    except (FileNotFoundError, EOFError, struct.error):
+        return None
+
+
+def get_index(path):
+    """Loads the sidecar index of a logcat file, building it first if it is missing or stale."""
+    return load_index(path) or build_index(path)
+
+
+def seek_offset(path, since_ms):
+    """Returns the byte offset from which every entry at or after since_ms is found."""
+    if since_ms is None:
+        return 0
+    offsets, max_ts = get_index(path)
+    block = bisect_left(max_ts, since_ms)
+    if block >= len(offsets):
+        return _signature(path)[0]
+    return offsets[block]
+
+
+def iter_lines_since(path, since_ms, located=False):
+    """
+    Yields decoded lines of a logcat file starting at the first index block that can
+    contain entries at or after since_ms (with located, as (offset, length, text)).
+    Callers still apply their own time check.
+    """
+    signature = evidence.plain_signature(path)
+    if signature is None or signature[0] == 0:
+        return
+    start = seek_offset(path, since_ms)
+    with evidence.map_log(path) as mm:
+        end = len(mm)
+        pos = start
+        while pos < end:
+            newline = mm.find(b"\n", pos)
+            stop = end if newline < 0 else newline + 1
+            text = mm[pos:stop].decode("utf-8", "replace")
+            yield (pos, stop - pos, text) if located else text
+            pos = stop
@@ -0,0 +1,211 @@
+# timestamps.py
+"""
+Timestamp decoding shared by the parsers, filters and graphs.
+
+Every decoder returns int epoch milliseconds (local time), or None when
+the text has no timestamp in the expected place. The formats the tool
+meets have fixed layouts, so they are read by slicing at fixed offsets
+instead of regex searches and strptime:
+
+    logcat   "MM-DD HH:MM:SS.mmm ..."  at the start of a `-v time` line
+    ISO      "YYYY-MM-DD HH:MM:SS"     (a "T" separator is accepted too)
+    content  "date=<epoch ms>"         the date column of a content query row
+
+Logcat lines carry no year. A LogcatClock infers it once per calendar
+day (the latest year that does not put the day in the future) and caches
+the epoch of every local hour it has seen, so decoding a line costs a
+dict lookup and three small int() calls. Use one clock per file or scan.
+LineDecoder handles text of unknown format: the fixed layouts at the start
+of the line first, then a search for each format anywhere in it.
+
+local_ms() shifts epoch ms to local wall-clock ms with the UTC offset in
+effect at that instant, for binning by local hour or day across DST changes.
+Timestamps outside PLAUSIBLE_MIN_MS..PLAUSIBLE_MAX_MS (a date=0 row, a
+garbled field) are left out of graphs and per-day counts.
+"""
+import re
+import time
+from datetime import datetime
+
+_DATE_FIELD_RE = re.compile(r'(?:^|[ ,])date=(\d+)')
+_ISO_SEARCH_RE = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')
+_LOGCAT_SEARCH_RE = re.compile(r'\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+_LOGCAT_PREFIX_RE = re.compile(r'\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.')
+
+# 2000-01-01 and 2100-01-01 UTC
+PLAUSIBLE_MIN_MS = 946684800000
+PLAUSIBLE_MAX_MS = 4102444800000
+
+# UTC offsets only change on quarter hours, so the offset is cached per quarter hour
+OFFSET_STEP_MS = 15 * 60 * 1000
+_MAX_CACHED_OFFSETS = 100000
+# Quarter hours since the epoch -> local UTC offset in ms
+_offsets = {}
+
+
+def to_ms(when):
+    """Epoch milliseconds of a naive local datetime."""
+    return int(when.timestamp() * 1000)
+
+
+def from_ms(ms):
+    """Naive local datetime of epoch milliseconds."""
+    return datetime.fromtimestamp(ms / 1000)
+
+
+def utc_offset_ms(ms):
+    """The local UTC offset (DST-aware) in effect at epoch ms, in ms."""
+    step = ms // OFFSET_STEP_MS
+    offset = _offsets.get(step)
+    if offset is None:
+        if len(_offsets) >= _MAX_CACHED_OFFSETS:
+            _offsets.clear()
+        try:
+            offset = time.localtime(step * OFFSET_STEP_MS // 1000).tm_gmtoff * 1000
+        except (ValueError, OverflowError, OSError):
+            offset = 0
+        _offsets[step] = offset
+    return offset
+
+
+def local_ms(ms):
+    """Epoch ms shifted to local wall-clock time: local_ms(ms) // DAY_MS is the local day number."""
+    return ms + utc_offset_ms(ms)
+
+
+def clear_offset_cache():
+    """Forgets the cached UTC offsets (after the local time zone changed)."""
+    _offsets.clear()
+
+
+def _hour_base(year, month, day, hour):
+    """
+    Epoch ms of a local wall-clock hour (DST-aware), or -1 for an invalid date. The hour
+    repeated when clocks go back is its first occurrence, as in to_ms().
+    """
+    try:
+        return int(datetime(year, month, day, hour).timestamp()) * 1000
+    except (ValueError, OverflowError, OSError):
+        return -1
+
+
+# has_logcat_prefix(line): a match (truthy) if line starts with the "MM-DD HH:MM:SS." of a
+# logcat `-v time` line, else None. Called for every line a filter reads, so kept to one C call.
+has_logcat_prefix = _LOGCAT_PREFIX_RE.match
+
+
+class LogcatClock:
+    """Converts logcat "MM-DD HH:MM:SS.mmm" timestamps to epoch ms with the year inferred once per day."""
+
+    def __init__(self, now=None):
+        self.now = now or datetime.now()
+        # "MM-DD HH" slice (str or bytes) -> epoch ms of that hour, -1 if invalid
+        self._bases = {}
+
+    def _base(self, month, day, hour):
+        year = self.now.year
+        try:
+            if datetime(year, month, day) > self.now:
+                year -= 1
+        except ValueError:
+            return -1
+        return _hour_base(year, month, day, hour)
+
+    def epoch_ms(self, month, day, hour, minute, second, millis):
+        """Epoch ms of already split fields, or None for an invalid date."""
+        key = (month, day, hour)
+        base = self._bases.get(key)
+        if base is None:
+            base = self._bases[key] = self._base(month, day, hour)
+        if base < 0:
+            return None
+        return base + (minute * 60 + second) * 1000 + millis
+
+    def _decode(self, line, dash, space, colon, dot):
+        if (line[2:3] != dash or line[5:6] != space or line[8:9] != colon or line[11:12] != colon
+                or line[14:15] != dot):
+            return None
+        key = line[:8]
+        base = self._bases.get(key)
+        try:
+            if base is None:
+                base = self._bases[key] = self._base(int(line[:2]), int(line[3:5]), int(line[6:8]))
+            if base < 0:
+                return None
+            return base + (int(line[9:11]) * 60 + int(line[12:14])) * 1000 + int(line[15:18])
+        except ValueError:
+            return None
+
+    def decode(self, line):
+        """Epoch ms of the "MM-DD HH:MM:SS.mmm" timestamp a logcat line starts with, or None."""
+        return self._decode(line, "-", " ", ":", ".")
+
+    def decode_bytes(self, line):
+        """decode() for an undecoded (bytes) line."""
+        return self._decode(line, b"-", b" ", b":", b".")
+
+
+class _IsoClock:
+    """Converts "YYYY-MM-DD HH:MM:SS" timestamps to epoch ms, caching the epoch of every hour."""
+
+    def __init__(self):
+        self._bases = {}
+
+    def decode(self, text, pos=0):
+        if (text[pos + 4:pos + 5] != "-" or text[pos + 7:pos + 8] != "-" or text[pos + 10:pos + 11] not in (" ", "T")
+                or text[pos + 13:pos + 14] != ":" or text[pos + 16:pos + 17] != ":"):
+            return None
+        key = text[pos:pos + 10] + text[pos + 11:pos + 13]
+        base = self._bases.get(key)
+        try:
+            if base is None:
+                base = self._bases[key] = _hour_base(int(text[pos:pos + 4]), int(text[pos + 5:pos + 7]),
+                                                     int(text[pos + 8:pos + 10]), int(text[pos + 11:pos + 13]))
+            if base < 0:
+                return None
+            return base + (int(text[pos + 14:pos + 16]) * 60 + int(text[pos + 17:pos + 19])) * 1000
+        except ValueError:
+            return None
+
+
+_iso_clock = _IsoClock()
+
+
+def decode_iso(text, pos=0):
+    """Epoch ms of a "YYYY-MM-DD HH:MM:SS" timestamp at text[pos:], or None."""
+    return _iso_clock.decode(text, pos)
+
+
+def decode_date_field(text):
+    """Epoch ms in the "date=" column of a content query row, or None."""
+    match = _DATE_FIELD_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+class LineDecoder:
+    """Finds the timestamp of a line of unknown format."""
+
+    def __init__(self, now=None):
+        self.clock = LogcatClock(now)
+
+    def decode(self, line):
+        """Epoch ms of the first timestamp found in line (ISO, date= column, then logcat), or None."""
+        ts = self.clock.decode(line)
+        if ts is None:
+            ts = decode_iso(line)
+        if ts is not None:
+            return ts
+        # Not at the start of the line: search for each format in turn
+        match = _ISO_SEARCH_RE.search(line)
+        if match:
+            ts = decode_iso(line, match.start())
+            if ts is not None:
+                return ts
+        ts = decode_date_field(line)
+        if ts is not None:
+            return ts
+        match = _LOGCAT_SEARCH_RE.search(line)
+        if match:
+            # The search pattern has no milliseconds; decode "MM-DD HH:MM:SS" as if it had .000
+            return self.clock.decode(match.group() + ".000")
+        return None
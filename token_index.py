@@ -0,0 +1,436 @@
+# token_index.py
+"""
+Sidecar inverted index for keyword searches over the acquired files.
+
+Every record (a logcat line, or a whole `content query` row with its
+continuation lines) is split into lowercase word tokens: tags, package
+name parts, phone numbers, words. Each distinct token maps to the sorted
+ids of the records that contain it, stored as varint-encoded gaps. The
+index also keeps every record's byte offset, length and timestamp, so
+matching records are read straight from the log without scanning it.
+A logcat line without a `-v time` prefix is recorded with the date of the
+closest line before it that has one, as the filter dates it (see filter_query).
+
+A keyword query can only match a record holding every word of the
+keyword (possibly as part of a longer word, since the keyword may start
+or end mid-word), so the posting lists of those words are intersected,
+rarest first, and only the surviving records are read and checked with
+the ordinary substring test. The index lives next to the log as
+"<file>.tkidx" and is only used while the log's size and mtime match;
+a stale or missing index makes searches fall back to a full scan until
+build_index() runs again after the next extraction. A logcat extended by
+incremental acquisition has its index extended with just the appended
+lines (update_index).
+"""
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+from config import LOG_FILES
+from content_rows import iter_rows
+from evidence import open_log, log_signature
+from record_store import parse_logcat, source_for_path
+from timestamps import has_logcat_prefix
+import instrumentation
+
+INDEX_SUFFIX = ".tkidx"
+# Fragments shorter than this are too common to narrow a search and are left to the scan
+MIN_FRAGMENT = 2
+# Posting lists more than this many times longer than the current candidates are not
+# decoded; the substring check on the few candidates is cheaper than the intersection
+INTERSECT_RATIO = 8
+
+_MAGIC = b"TKIX"
+# 2: undated logcat lines carry the date of the line before them
+_VERSION = 2
+# magic, version, source size, source mtime_ns, record count, term count, vocabulary bytes, posting bytes
+_HEADER = struct.Struct("<4sIqqqqqq")
+# After the header: record offsets, lengths and timestamps, then per-term posting
+# offsets (one extra for the end) and document frequencies
+_ARRAY_TYPECODES = ("q", "I", "q", "q", "I")
+_NO_TIMESTAMP = -(2 ** 63)
+_TOKEN_RE = re.compile(r"\w+")
+
+# path -> TokenIndex of the signature it was loaded for
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def tokenize(text):
+    """Returns the lowercase word tokens of text."""
+    return _TOKEN_RE.findall(text.lower())
+
+# -------------------------------------------------------------------
+# Posting lists: sorted record ids as varint-encoded gaps
+# -------------------------------------------------------------------
+def encode_postings(ids, out, previous=0):
+    """
+    Appends the sorted ids to the bytearray out as LEB128 varint gaps. previous is the
+    last id already encoded in out for the same list, when extending one.
+    """
+    for record_id in ids:
+        gap = record_id - previous
+        previous = record_id
+        while gap >= 0x80:
+            out.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        out.append(gap)
+
+
+def decode_postings(data, start, end):
+    """Returns the list of record ids encoded in data[start:end]."""
+    ids = []
+    previous = 0
+    value = 0
+    shift = 0
+    for byte in data[start:end]:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        else:
+            previous += value | (byte << shift)
+            ids.append(previous)
+            value = 0
+            shift = 0
+    return ids
+
+# -------------------------------------------------------------------
+# Building
+# -------------------------------------------------------------------
+def _logcat_records(f, start_offset=0, carried=None):
+    """
+    Yields (offset, length, ts, text) for every line of a binary logcat file, or of its
+    tail when f is at start_offset; carried is the date of the lines before it.
+    """
+    current = [b""]
+
+    def tee():
+        for raw in f:
+            current[0] = raw
+            yield raw
+
+    for _, ts, _, _, _, offset, length in parse_logcat(tee(), start_offset=start_offset):
+        text = current[0].decode("utf-8", "replace")
+        if has_logcat_prefix(text):
+            carried = ts
+        else:
+            ts = carried
+        yield offset, length, ts, text
+
+
+def _content_records(f):
+    """Yields (offset, length, ts, text) for every row of a binary `content query` dump."""
+    for row in iter_rows(f):
+        yield row.offset, row.length, row.get_int("date"), row.text
+
+
+def _add_records(records, first_id, offsets, lengths, timestamps, postings):
+    """
+    Appends the location and date of each (offset, length, ts, text) record to the arrays
+    and its id, from first_id on, to the postings of its terms ({term: array("I")}).
+    """
+    for record_id, (offset, length, ts, text) in enumerate(records, first_id):
+        offsets.append(offset)
+        lengths.append(length)
+        timestamps.append(_NO_TIMESTAMP if ts is None else ts)
+        for term in set(_TOKEN_RE.findall(text.lower())):
+            ids = postings.get(term)
+            if ids is None:
+                # 4 bytes per posting; a list would hold an 8-byte pointer and an int object
+                postings[term] = array("I", (record_id,))
+            else:
+                ids.append(record_id)
+
+
+def _write_index(path, signature, offsets, lengths, timestamps, terms, posting_offsets, doc_freq, data):
+    """Writes the sidecar index of path and returns it as the cached TokenIndex."""
+    vocabulary = "\n".join(terms).encode("utf-8")
+    tmp_path = index_path(path) + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, _VERSION, signature[0], signature[1], len(offsets), len(terms),
+                               len(vocabulary), len(data)))
+        for values in (offsets, lengths, timestamps, posting_offsets, doc_freq):
+            values.tofile(out)
+        out.write(vocabulary)
+        out.write(data)
+    os.replace(tmp_path, index_path(path))
+    index = TokenIndex(path, signature, offsets, lengths, timestamps, terms, posting_offsets, doc_freq, data)
+    with _cache_lock:
+        _cache[path] = index
+    return index
+
+
+def build_index(path):
+    """
+    Tokenizes every record of an acquired file (plain or packed) and writes its sidecar
+    index. Returns the TokenIndex, or None if the file is not an acquired source or is missing.
+    """
+    source = source_for_path(path)
+    signature = log_signature(path)
+    if source is None or signature is None:
+        return None
+    records = _logcat_records if source == "logcat" else _content_records
+    offsets = array("q")
+    lengths = array("I")
+    timestamps = array("q")
+    postings = {}
+    with instrumentation.timed("token_index.build", nbytes=signature[0]) as span:
+        with open_log(path) as f:
+            _add_records(records(f), 0, offsets, lengths, timestamps, postings)
+        span.lines = len(offsets)
+        terms = sorted(postings)
+        posting_offsets = array("q", [0])
+        doc_freq = array("I")
+        data = bytearray()
+        for term in terms:
+            ids = postings.pop(term)
+            encode_postings(ids, data)
+            posting_offsets.append(len(data))
+            doc_freq.append(len(ids))
+        return _write_index(path, signature, offsets, lengths, timestamps, terms, posting_offsets, doc_freq, data)
+
+
+def _ends_with_newline(path, size):
+    with open_log(path) as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def update_index(path, previous_size):
+    """
+    Extends the index of a logcat file that grew by appending to it since it was indexed at
+    previous_size: only the appended lines are read and tokenized, and the posting lists of
+    the terms they contain are extended. Anything else (no index, different size, a last
+    line that was still incomplete) falls back to build_index.
+    """
+    signature = log_signature(path)
+    index = _read_index(path)
+    if (source_for_path(path) != "logcat" or signature is None or index is None or previous_size <= 0
+            or index.signature[0] != previous_size or signature[0] < previous_size
+            or not _ends_with_newline(path, previous_size)):
+        return build_index(path)
+    offsets, lengths, timestamps = index.offsets, index.lengths, index.timestamps
+    carried = timestamps[-1] if timestamps and timestamps[-1] != _NO_TIMESTAMP else None
+    appended = {}
+    with instrumentation.timed("token_index.update", nbytes=signature[0] - previous_size) as span:
+        with open_log(path) as f:
+            f.seek(previous_size)
+            _add_records(_logcat_records(f, previous_size, carried), index.record_count,
+                         offsets, lengths, timestamps, appended)
+        span.lines = len(offsets) - index.record_count
+        # Existing lists are copied as encoded; the appended ids, all larger, go on their end
+        terms = sorted(set(index.terms).union(appended))
+        posting_offsets = array("q", [0])
+        doc_freq = array("I")
+        data = bytearray()
+        for term in terms:
+            term_id = index._term_ids.get(term)
+            previous = 0
+            count = 0
+            if term_id is not None:
+                start, end = index.posting_offsets[term_id], index.posting_offsets[term_id + 1]
+                data += index.postings[start:end]
+                count = index.doc_freq[term_id]
+            ids = appended.pop(term, None)
+            if ids is not None:
+                if term_id is not None:
+                    previous = index.term_postings(term_id)[-1]
+                encode_postings(ids, data, previous)
+                count += len(ids)
+            posting_offsets.append(len(data))
+            doc_freq.append(count)
+        return _write_index(path, signature, offsets, lengths, timestamps, terms, posting_offsets, doc_freq, data)
+
+
+def build_indexes(sources=None):
+    """Builds the index of every acquired source. Returns {source: TokenIndex or None}."""
+    return {source: build_index(LOG_FILES[source]) for source in (sources or LOG_FILES)}
+
+
+def ensure_indexes(sources=None):
+    """
+    Like build_indexes, but keeps every index that is still valid, such as that of a logcat
+    extended by incremental acquisition (see update_index).
+    """
+    return {source: load_index(LOG_FILES[source]) or build_index(LOG_FILES[source])
+            for source in (sources or LOG_FILES)}
+
+# -------------------------------------------------------------------
+# Loading and querying
+# -------------------------------------------------------------------
+class TokenIndex:
+    """A loaded token index: record locations, vocabulary and encoded posting lists."""
+
+    def __init__(self, path, signature, offsets, lengths, timestamps, terms, posting_offsets, doc_freq, postings):
+        self.path = path
+        self.signature = signature
+        self.offsets = offsets
+        self.lengths = lengths
+        self.timestamps = timestamps
+        self.terms = terms
+        self.posting_offsets = posting_offsets
+        self.doc_freq = doc_freq
+        self.postings = postings
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        # The vocabulary as one string, so terms containing a fragment are found with str.find
+        self._vocabulary = "\n".join(terms)
+        self._term_starts = array("q")
+        position = 0
+        for term in terms:
+            self._term_starts.append(position)
+            position += len(term) + 1
+
+    @property
+    def record_count(self):
+        return len(self.offsets)
+
+    def term_postings(self, term_id):
+        return decode_postings(self.postings, self.posting_offsets[term_id], self.posting_offsets[term_id + 1])
+
+    def terms_containing(self, fragment):
+        """Returns the ids of the terms that contain fragment."""
+        found = []
+        vocabulary = self._vocabulary
+        position = vocabulary.find(fragment)
+        while position >= 0:
+            term_id = bisect_right(self._term_starts, position) - 1
+            found.append(term_id)
+            # Continue after this term; a term is only listed once
+            position = vocabulary.find(fragment, self._term_starts[term_id] + len(self.terms[term_id]) + 1)
+        return found
+
+    def _word_groups(self, needle):
+        """
+        For every usable word of the lowercase needle, the ids of the terms a matching record
+        must contain one of. A word bounded by non-word characters on both sides must be a
+        whole token; one touching the start or end of the needle may be part of a longer token.
+        """
+        groups = []
+        for match in _TOKEN_RE.finditer(needle):
+            word = match.group()
+            if match.start() > 0 and match.end() < len(needle):
+                term_id = self._term_ids.get(word)
+                groups.append([] if term_id is None else [term_id])
+            elif len(word) >= MIN_FRAGMENT:
+                groups.append(self.terms_containing(word))
+        return groups
+
+    def _union(self, term_ids):
+        if len(term_ids) == 1:
+            return self.term_postings(term_ids[0])
+        ids = set()
+        for term_id in term_ids:
+            ids.update(self.term_postings(term_id))
+        return sorted(ids)
+
+    def candidates(self, keywords):
+        """
+        Returns the sorted ids of the records that can contain every one of keywords
+        (case-insensitive), or None if no keyword has a word long enough to narrow the search.
+        """
+        groups = [group for keyword in keywords for group in self._word_groups(keyword.lower())]
+        if not groups:
+            return None
+        # Rarest word first: its postings bound the candidates every other word can only shrink
+        sized = sorted((sum(self.doc_freq[t] for t in term_ids), term_ids) for term_ids in groups)
+        candidates = self._union(sized[0][1])
+        for estimate, term_ids in sized[1:]:
+            if not candidates or estimate > INTERSECT_RATIO * len(candidates):
+                break
+            allowed = set(self._union(term_ids))
+            candidates = [record_id for record_id in candidates if record_id in allowed]
+        return candidates
+
+    def iter_records(self, record_ids, since_ms=None, located=False):
+        """
+        Yields the decoded text of the given records, in file order (with located, as
+        (offset, length, text, ts), ts being None for a record without a date). With
+        since_ms, records older than since_ms or without a date are skipped unread.
+        """
+        with open_log(self.path) as f:
+            position = 0
+            for record_id in record_ids:
+                ts = self.timestamps[record_id]
+                if since_ms is not None and ts < since_ms:
+                    continue
+                offset = self.offsets[record_id]
+                if offset != position:
+                    f.seek(offset)
+                length = self.lengths[record_id]
+                text = f.read(length).decode("utf-8", "replace")
+                yield (offset, length, text, None if ts == _NO_TIMESTAMP else ts) if located else text
+                position = offset + length
+
+
+def _read_index(path):
+    """Reads the sidecar of path, whatever file signature it was built for; None if unreadable."""
+    try:
+        with open(index_path(path), "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, size, mtime_ns, records, term_count, vocabulary_size, data_size = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                return None
+            arrays = []
+            for typecode, count in zip(_ARRAY_TYPECODES, (records, records, records, term_count + 1, term_count)):
+                values = array(typecode)
+                values.fromfile(f, count)
+                arrays.append(values)
+            vocabulary = f.read(vocabulary_size).decode("utf-8")
+            data = f.read(data_size)
+            if len(data) != data_size:
+                return None
+    except (FileNotFoundError, EOFError, struct.error, UnicodeDecodeError):
+        return None
+    offsets, lengths, timestamps, posting_offsets, doc_freq = arrays
+    terms = vocabulary.split("\n") if term_count else []
+    return TokenIndex(path, (size, mtime_ns), offsets, lengths, timestamps, terms, posting_offsets, doc_freq, data)
+
+
+def load_index(path):
+    """Returns the TokenIndex of path if its sidecar is still valid, or None."""
+    signature = log_signature(path)
+    if signature is None:
+        return None
+    with _cache_lock:
+        index = _cache.get(path)
+    if index is not None and index.signature == signature:
+        return index
+    index = _read_index(path)
+    if index is None or index.signature != signature:
+        return None
+    with _cache_lock:
+        _cache[path] = index
+    return index
+
+
+def search(path, keywords, since_ms=None, located=False):
+    """
+    Returns an iterator over the records of path that can contain every one of keywords,
+    in file order, optionally only those at or after since_ms. Callers still apply the
+    keyword test. With located, the records are (offset, length, text, ts) tuples.
+    Returns None when there is no valid index or the keyword cannot narrow the search,
+    in which case the caller scans the file.
+    """
+    index = load_index(path)
+    if index is None:
+        return None
+    with instrumentation.timed("token_index.lookup"):
+        record_ids = index.candidates(keywords)
+    if record_ids is None:
+        return None
+    instrumentation.count("token_index.candidates", len(record_ids))
+    return index.iter_records(record_ids, since_ms, located)
+
+
+def clear_cache():
+    """Drops the loaded indexes; the next search reloads them from disk."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,183 @@
+# workers.py
+"""
+Background jobs for the GUI.
+
+Tk widgets (and the matplotlib canvas) may only be touched from the main
+thread. WorkerPool runs heavy work on a bounded thread pool; everything a
+job wants to show is posted to a UIDispatcher, whose queue the main thread
+drains with root.after in batches. Jobs are submitted under a key: a new
+job with the same key supersedes the previous one, which is cancelled (or
+asked to stop via job.should_continue()) and whose pending UI updates and
+result are discarded. Jobs with the same key never run concurrently, so a
+superseded filter cannot keep writing the file its successor rewrites: the
+new job is only handed to the pool once the previous one has finished, so
+it does not hold a pool thread while it waits.
+"""
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import instrumentation
+from config import WORKER_THREADS, UI_DISPATCH_INTERVAL_MS, UI_DISPATCH_BATCH
+
+
+class UIDispatcher:
+    """Thread-safe queue of callables executed on the Tk main thread."""
+
+    def __init__(self):
+        self._calls = queue.SimpleQueue()
+
+    def call(self, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) on the UI thread. Safe to call from any thread."""
+        self._calls.put((fn, args, kwargs))
+
+    def drain(self, limit=UI_DISPATCH_BATCH):
+        """Runs up to limit pending calls. Must be called from the UI thread."""
+        if instrumentation.enabled:
+            instrumentation.gauge("ui_dispatch.queue_depth", self._calls.qsize())
+        for _ in range(limit):
+            try:
+                fn, args, kwargs = self._calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                traceback.print_exc()
+
+    def start(self, root, interval_ms=UI_DISPATCH_INTERVAL_MS):
+        """Starts draining the queue from root's event loop every interval_ms."""
+        def tick():
+            if not root.winfo_exists():
+                return
+            self.drain()
+            root.after(interval_ms, tick)
+        root.after(interval_ms, tick)
+
+
+class Job:
+    """Handle of one submitted job. Workers poll should_continue(); UI code may cancel()."""
+
+    def __init__(self, key, dispatcher):
+        self.key = key
+        self.dispatcher = dispatcher
+        self.future = None
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._finish_callbacks = []
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def should_continue(self):
+        return not self._cancelled.is_set()
+
+    def post(self, fn, *args, **kwargs):
+        """Schedules a UI update that is dropped if the job is cancelled before it runs."""
+        def run():
+            if not self.cancelled():
+                fn(*args, **kwargs)
+        self.dispatcher.call(run)
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def when_finished(self, callback):
+        """Calls callback() once the job has finished or will never run, at once if it already has."""
+        with self._lock:
+            if not self._finished.is_set():
+                self._finish_callbacks.append(callback)
+                return
+        callback()
+
+    def _finish(self):
+        with self._lock:
+            if self._finished.is_set():
+                return
+            self._finished.set()
+            callbacks, self._finish_callbacks = self._finish_callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class WorkerPool:
+    """Bounded thread pool with keyed supersession and results delivered on the UI thread."""
+
+    def __init__(self, dispatcher, max_workers=WORKER_THREADS):
+        self.dispatcher = dispatcher
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worker")
+        self._lock = threading.Lock()
+        self._current = {}
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, pass_job=False):
+        """
+        Runs fn(*args) on the pool, or fn(job, *args) with pass_job=True. A running or
+        queued job with the same key is cancelled first. on_done(result) and
+        on_error(exc) run on the UI thread, and only if the job was not superseded.
+        """
+        job = Job(key, self.dispatcher)
+        with self._lock:
+            previous = self._current.get(key)
+            self._current[key] = job
+        if previous is not None:
+            previous.cancel()
+
+        def run():
+            try:
+                if job.cancelled():
+                    return
+                call_args = (job,) + args if pass_job else args
+                with instrumentation.timed(f"job.{key}"):
+                    result = instrumentation.profile_call(fn, *call_args)
+            except Exception as e:
+                traceback.print_exc()
+                if on_error is not None:
+                    job.post(on_error, e)
+            else:
+                if on_done is not None:
+                    job.post(on_done, result)
+            finally:
+                with self._lock:
+                    if self._current.get(key) is job:
+                        del self._current[key]
+                job._finish()
+
+        def start():
+            if job.cancelled():
+                job._finish()
+                return
+            try:
+                job.future = self._executor.submit(run)
+            except RuntimeError:
+                # The pool was shut down while the job waited for its predecessor
+                job._finish()
+                return
+            # A job cancelled while still queued never runs, so mark it finished for its successor
+            job.future.add_done_callback(lambda future: future.cancelled() and job._finish())
+
+        if previous is not None:
+            previous.when_finished(start)
+        else:
+            start()
+        return job
+
+    def cancel(self, key):
+        """Cancels the current job submitted under key, if any."""
+        with self._lock:
+            job = self._current.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._current.values())
+            self._current.clear()
+        for job in jobs:
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)